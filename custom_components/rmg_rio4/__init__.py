@@ -4,19 +4,132 @@ Connexion via TCP sur port 22023 avec reconnexion automatique
 """
 import asyncio
 import logging
+import random
+import socket
+import time
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Optional, List, Callable
+from functools import partial
+from typing import Optional, List, Callable, Dict, Iterable, Tuple
+
+import voluptuous as vol
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, ServiceCall, callback
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.entity import Entity
 from homeassistant.components.switch import SwitchEntity
 from homeassistant.const import Platform
 
+from .capture import DIRECTION_IN, DIRECTION_OUT, WireRecorder
+from .command_queue import PRIORITY_HEALTH, PRIORITY_POLL, PRIORITY_USER, CommandQueue
+from .fleet import CircuitBreaker, FleetManager, full_jitter_backoff
+from .inputs import DEFAULT_DEBOUNCE_MS, DEFAULT_PUBLISH_INTERVAL, DigitalInputTracker
+from .metrics import ConnectionMetrics
+from .protocol import (
+    DIO,
+    RELAY,
+    CHANNEL_KEYS,
+    MAX_PULSE_DURATION,
+    MIN_PULSE_DURATION,
+    ChannelKey,
+    READ_CHUNK_SIZE,
+    AuthenticationError,
+    HandshakeError,
+    LineFramer,
+    Rio4Session,
+    channel_name,
+    encode_command,
+    expected_reply,
+    output_command,
+    parse_channel,
+)
+from .state_writer import StateWriteBatcher
+from .timers import MAX_TIMER_DURATION
+from .watchdog import StalenessWatchdog
+
 _LOGGER = logging.getLogger(__name__)
 
 DOMAIN = "rmg_rio4"
-PLATFORMS = [Platform.SWITCH]
+PLATFORMS = [Platform.SWITCH, Platform.BINARY_SENSOR, Platform.SENSOR]
+
+# Clé du gestionnaire de flotte partagé dans hass.data[DOMAIN]
+DATA_FLEET = "fleet"
+# Sessions authentifiées par le config flow, en attente de reprise par async_setup_entry
+DATA_HANDOVER = "handover"
+SESSION_HANDOVER_TTL = 30  # Fermeture d'une session non reprise (secondes)
+
+# Options: affichage optimiste de l'état commandé, réconcilié par l'acquittement
+CONF_OPTIMISTIC = "optimistic"
+DEFAULT_OPTIMISTIC = True
+
+# Options: DIO câblées en entrée à fréquence élevée (anti-rebond, comptage, fréquence)
+CONF_INPUTS = "inputs"
+CONF_DEBOUNCE_MS = "debounce_ms"
+CONF_PUBLISH_INTERVAL = "publish_interval"
+CONF_RAW_COUNT_INPUTS = "raw_count_inputs"  # Entrées comptant les fronts bruts (sans anti-rebond)
+
+# Options: capture du trafic brut dans <config>/rmg_rio4_<entry_id>.cap (rotative)
+CONF_CAPTURE = "capture"
+
+# Configuration uniquement via l'interface (entrées de configuration)
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+# Services communs à toutes les entrées, routés par le registre des entités
+SERVICE_PULSE_RELAY = "pulse_relay"
+SERVICE_RECONNECT = "reconnect"
+SERVICE_SET_OUTPUTS = "set_outputs"
+SERVICE_START_TIMER = "start_timer"
+SERVICE_CANCEL_TIMER = "cancel_timer"
+SERVICE_EXTEND_TIMER = "extend_timer"
+ATTR_ENTITY_ID = "entity_id"
+ATTR_DURATION = "duration"
+ATTR_OUTPUTS = "outputs"  # {entity_id: "ON" | "OFF" | "PULSE <durée>"}
+ATTR_STATE = "state"
+
+PULSE_RELAY_SCHEMA = vol.Schema({
+    vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
+    vol.Optional(ATTR_DURATION, default=0.5): vol.All(
+        vol.Coerce(float), vol.Range(min=MIN_PULSE_DURATION, max=MAX_PULSE_DURATION)
+    ),
+})
+RECONNECT_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
+})
+SET_OUTPUTS_SCHEMA = vol.Schema({
+    vol.Required(ATTR_OUTPUTS): {cv.entity_id: cv.string},
+})
+# Durées des sorties temporisées: secondes, "HH:MM:SS" ou sélecteur de durée
+TIMER_DURATION = vol.All(
+    cv.time_period,
+    vol.Range(min=timedelta(seconds=1), max=timedelta(seconds=MAX_TIMER_DURATION)),
+)
+START_TIMER_SCHEMA = vol.Schema({
+    vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
+    vol.Required(ATTR_DURATION): TIMER_DURATION,
+    vol.Optional(ATTR_STATE, default="ON"): vol.All(vol.Upper, vol.In(["ON", "OFF"])),
+})
+CANCEL_TIMER_SCHEMA = vol.Schema({
+    vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
+})
+EXTEND_TIMER_SCHEMA = vol.Schema({
+    vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
+    vol.Required(ATTR_DURATION): TIMER_DURATION,
+})
+
+# Messages de statut du serveur, journalisés sans autre traitement
+_STATUS_MESSAGES = frozenset(("SERVER=SHUTDOWN", "UPDATE=STARTED", "REBOOT=STARTED"))
+_OUTPUT_STATES = frozenset(("ON", "OFF"))
+
+# États du superviseur de connexion (RelayBoxConnection.state)
+STATE_DISCONNECTED = "disconnected"
+STATE_CONNECTING = "connecting"
+STATE_AUTHENTICATING = "authenticating"
+STATE_SYNCING = "syncing"
+STATE_LIVE = "live"
+STATE_BACKOFF = "backoff"
+STATE_CLOSED = "closed"
 
 
 class RelayBoxConnection:
@@ -27,101 +140,401 @@ class RelayBoxConnection:
     - Reconnexion automatique avec backoff exponentiel
     - Surveillance de santé de connexion (ping)
     - Gestion d'état des entités (disponible/indisponible)
+    
+    Cycle de vie: une seule tâche superviseur pilote la machine d'état
+    connecting -> authenticating -> syncing -> live -> backoff -> connecting
+    et possède les tâches de la session (lecture, heartbeat): au plus une de
+    chaque à tout instant, annulées et attendues avant toute reconnexion.
     """
     
-    def __init__(self, host: str, port: int, username: str, password: str):
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str,
+        password: str,
+        heartbeat_interval: float = 30,
+        heartbeat_timeout: float = 5,
+        heartbeat_max_misses: int = 2,
+    ):
         self.host = host
         self.port = port
         self.username = username
         self.password = password
         self.reader: Optional[asyncio.StreamReader] = None
         self.writer: Optional[asyncio.StreamWriter] = None
+        self._connected_event = asyncio.Event()
+        # Compteurs, histogrammes et historique de connexion (diagnostics, capteurs)
+        self.metrics = ConnectionMetrics()
+        self._disconnect_reason: Optional[str] = None
+        # Capture optionnelle du trafic brut (diagnostic terrain, rejeu avec tools/replay.py)
+        self.recorder: Optional[WireRecorder] = None
+        self._connected = False
         self.connected = False
+        
+        # Trames sortantes: une seule tâche d'écriture alimentée par une file à priorités
+        self._queue = CommandQueue()
+        self._writer_task: Optional[asyncio.Task] = None
+        self._offline_command_ttl = 15  # Conservation max d'une commande hors connexion
         self.callbacks: List[Callable] = []
         
+        # Table de dispatch: (type, numéro) -> callbacks de l'entité abonnée
+        self._channel_callbacks: Dict[ChannelKey, List[Callable]] = {}
+        
+        # Superviseur et tâches filles de la session en cours
+        self.state = STATE_DISCONNECTED
+        self._supervisor_task: Optional[asyncio.Task] = None
+        self._listener_task: Optional[asyncio.Task] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()  # Interrompt l'attente du backoff (reconnexion forcée)
+        self._handover_session: Optional[Rio4Session] = None  # Session remise par le config flow
+        
         # Paramètres de reconnexion
-        self._reconnect_task: Optional[asyncio.Task] = None
-        self._monitor_task: Optional[asyncio.Task] = None
-        self._reconnect_interval = 5  # Commence à 5 secondes
+        self._reconnect_interval = 5  # Base du backoff: 5 secondes
         self._max_reconnect_interval = 300  # Maximum 5 minutes
+        self._first_reconnect_jitter = 1.0  # Étalement de la première tentative
         self._reconnect_attempts = 0
         self._max_reconnect_attempts = 999  # Tentatives quasi-illimitées
         self._last_successful_connection: Optional[datetime] = None
         self._connection_stable_time = 30  # Connexion stable après 30s
-        self._ping_interval = 30  # Ping toutes les 30 secondes
+        self._ping_interval = heartbeat_interval  # Heartbeat toutes les 30 secondes
+        
+        # Heartbeat aller-retour: RELAY1? doit recevoir RELAY1= avant heartbeat_timeout,
+        # le pair est déclaré mort après heartbeat_max_misses échecs consécutifs
+        self._heartbeat_timeout = heartbeat_timeout
+        self._heartbeat_max_misses = heartbeat_max_misses
+        self._heartbeat_misses = 0
+        self.last_heartbeat_rtt: Optional[float] = None
+        
+        # Keepalive TCP: détection d'un pair disparu par l'OS en ~idle + intvl * cnt
+        self._keepalive_idle = 10
+        self._keepalive_interval = 5
+        self._keepalive_count = 3
+        
+        # Commandes en attente d'acquittement: canal -> [(état attendu, future)]
+        self._pending_acks: Dict[ChannelKey, List[Tuple[Optional[str], asyncio.Future]]] = {}
+        self._ack_timeout = 2.0  # Délai max par défaut pour recevoir l'écho d'une commande
+        self._snapshot_timeout = 3.0  # Délai max pour recevoir l'état de tous les canaux
+        self.last_ack_latency: Optional[float] = None  # Dernier aller-retour (secondes)
+        self.ack_latencies = deque(maxlen=100)  # Derniers allers-retours (secondes)
+        
+        # Découpage des trames reçues (tampon d'octets borné)
+        self._framer = LineFramer()
         
-        # Entités enregistrées pour notification d'état
+        # Dernier état connu de chaque canal et canaux vus depuis la connexion
+        self.states: Dict[ChannelKey, str] = {}
+        self._seen_channels = set()
+        self._snapshot_event = asyncio.Event()  # Tous les canaux ont été vus
+        self._snapshot_grace = 0.5  # Attente max du snapshot poussé avant interrogation
+        
+        # DIO en mode entrée: anti-rebond et comptage dans la boucle de lecture,
+        # publication vers les entités au plus une fois par intervalle
+        self.inputs: Dict[ChannelKey, DigitalInputTracker] = {}
+        self._input_callbacks: Dict[ChannelKey, List[Callable]] = {}
+        self._input_settle_handles: Dict[ChannelKey, asyncio.TimerHandle] = {}
+        self._input_publish_handle: Optional[asyncio.TimerHandle] = None
+        self._input_publish_interval = DEFAULT_PUBLISH_INTERVAL
+        self._last_input_publish = 0.0
+        
+        # Entités enregistrées pour notification d'état, et par canal (fraîcheur)
         self.entities: List = []
+        self._channel_entities: Dict[ChannelKey, List] = {}
+        # Fraîcheur des canaux: un seul timer monotone par connexion
+        self.watchdog = StalenessWatchdog(self._on_channel_staleness, self._probe_channels)
+        self._probe_task: Optional[asyncio.Task] = None
+        # Écritures d'état regroupées: une écriture par entité et par fenêtre/snapshot
+        self.state_writes = StateWriteBatcher()
+        
+        # Gestionnaire de flotte (connexions échelonnées, surveillance partagée)
+        # et disjoncteur de l'hôte (partagé par la flotte entre entrées du même hôte)
+        self.fleet = None
+        self.breaker = CircuitBreaker()
+        
+        # Fermeture volontaire en cours: aucune reconnexion ne doit être déclenchée
+        self._closing = False
+        
+    @property
+    def connected(self) -> bool:
+        """True si la connexion est authentifiée et utilisable"""
+        return self._connected
+    
+    @connected.setter
+    def connected(self, value: bool):
+        if self.recorder is not None and value != self._connected:
+            self.recorder.event("connected" if value else f"disconnected:{self._disconnect_reason}")
+        self._connected = value
+        # Réveille la tâche d'écriture qui attend une connexion
+        if value:
+            self._connected_event.set()
+            self.metrics.record_connected()
+        else:
+            self._connected_event.clear()
+            self.metrics.record_disconnected(self._disconnect_reason)
+            self._disconnect_reason = None
+    
+    def _set_disconnected(self, reason: str):
+        """Marque la connexion comme perdue en mémorisant la cause (diagnostics)
+        
+        Le transport est coupé: la lecture se termine aussitôt, ce qui met fin à
+        la session et rend la main au superviseur.
+        """
+        self._disconnect_reason = reason
+        self.connected = False
+        if self.writer is not None:
+            self.writer.transport.abort()
+    
+    def _set_state(self, state: str):
+        if state != self.state:
+            _LOGGER.debug(f"🔁 {self.host}: {self.state} -> {state}")
+            self.state = state
+    
+    async def connect(self) -> bool:
+        """Démarre le superviseur et attend le résultat de la première tentative
+        
+        En cas d'échec le superviseur s'arrête: c'est à l'appelant de réessayer.
+        Après un succès, il reconnecte seul jusqu'à disconnect().
+        """
+        if self._supervisor_task is not None and not self._supervisor_task.done():
+            return self.connected
+        self._closing = False
+        started = asyncio.get_running_loop().create_future()
+        self._supervisor_task = asyncio.create_task(self._supervise(started))
+        return await asyncio.shield(started)
+    
+    def start(self, session: Optional[Rio4Session] = None):
+        """Démarre le superviseur en arrière-plan, sans attendre la connexion
+        
+        Les tentatives se succèdent avec backoff jusqu'au succès; les entités
+        restent indisponibles entre-temps. session: session déjà authentifiée
+        (validée par le config flow), adoptée par la première tentative.
+        """
+        if self._supervisor_task is not None and not self._supervisor_task.done():
+            if session is not None:
+                asyncio.create_task(session.close())
+            return
+        self._closing = False
+        self._handover_session = session
+        self._supervisor_task = asyncio.create_task(self._supervise())
+    
+    async def _supervise(self, started: Optional[asyncio.Future] = None):
+        """Tâche superviseur: une session à la fois, reconnexion avec backoff
         
-    async def connect(self):
-        """Établit la connexion TCP et authentifie avec gestion robuste d'erreurs"""
+        started reçoit le résultat de la première tentative; sans started
+        (start(), reconnexion forcée), un premier échec est suivi de nouvelles
+        tentatives comme après une perte de connexion.
+        """
+        try:
+            while True:
+                success = await self._connect_once()
+                if started is not None and not started.done():
+                    started.set_result(success)
+                    if not success:
+                        return
+                elif self._reconnect_attempts:
+                    self.metrics.record_reconnect_attempt(success)
+                
+                if success:
+                    if self._reconnect_attempts:
+                        _LOGGER.info("✅ Reconnexion réussie au RMG Rio 4")
+                    self._reconnect_attempts = 0
+                    # Retourne quand la connexion est perdue
+                    await self._run_session()
+                    if self._closing:
+                        return
+                    _LOGGER.warning("🔌 Session terminée - reconnexion")
+                    await self._cleanup_connection()
+                    await self._mark_entities_unavailable()
+                    # Étaler la première tentative: tous les boîtiers coupés au même instant
+                    # (redémarrage d'un switch) ne doivent pas se reconnecter ensemble
+                    delay = random.uniform(0, self._first_reconnect_jitter)
+                else:
+                    if self._reconnect_attempts >= self._max_reconnect_attempts:
+                        _LOGGER.error(f"❌ Abandon après {self._max_reconnect_attempts} tentatives")
+                        return
+                    # Délai aléatoire entre 0 et le backoff exponentiel plafonné
+                    delay = full_jitter_backoff(
+                        max(0, self._reconnect_attempts - 1),
+                        self._reconnect_interval,
+                        self._max_reconnect_interval,
+                    )
+                    if self._reconnect_attempts:
+                        _LOGGER.warning(f"❌ Reconnexion #{self._reconnect_attempts} échouée")
+                    else:
+                        _LOGGER.warning(f"❌ {self.host} injoignable, nouvelles tentatives en arrière-plan")
+                        # Les états restaurés au démarrage ne sont plus présentés comme disponibles
+                        await self._mark_entities_unavailable()
+                    _LOGGER.info(f"⏰ Prochaine tentative dans {delay:.1f}s")
+                
+                await self._backoff(delay)
+                # Disjoncteur ouvert: l'hôte a trop échoué, on attend sans tenter
+                retry_in = self.breaker.retry_in()
+                while retry_in > 0:
+                    _LOGGER.warning(f"⚡ Disjoncteur ouvert pour {self.host}, nouvel essai dans {retry_in:.0f}s")
+                    await self._backoff(retry_in)
+                    retry_in = self.breaker.retry_in()
+                
+                self._reconnect_attempts += 1
+                _LOGGER.info(f"🔄 Tentative de reconnexion #{self._reconnect_attempts}...")
+        finally:
+            self._set_state(STATE_CLOSED if self._closing else STATE_DISCONNECTED)
+            if started is not None and not started.done():
+                started.set_result(False)
+    
+    async def _backoff(self, delay: float):
+        """Attente avant la prochaine tentative, écourtée par force_reconnect()"""
+        self._set_state(STATE_BACKOFF)
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._wake.clear()
+    
+    async def _run_session(self):
+        """Session authentifiée: lecture et heartbeat, annulés et attendus à la sortie"""
+        self._listener_task = asyncio.create_task(self._listen())
+        children = [self._listener_task]
+        if self.fleet is None:
+            # Sinon la surveillance est assurée par la boucle partagée de la flotte
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+            children.append(self._heartbeat_task)
+        try:
+            # Compléter le snapshot poussé par le boîtier si des canaux manquent
+            self._set_state(STATE_SYNCING)
+            await self.sync_states()
+            if self.connected:
+                self._set_state(STATE_LIVE)
+                if self.fleet is not None:
+                    # États de fin dus et temporisations en cours (boîtier redémarré?)
+                    self.fleet.timers.resume(self)
+            await self._listener_task
+        finally:
+            if self._probe_task is not None:
+                children.append(self._probe_task)
+            for task in children:
+                task.cancel()
+            await asyncio.gather(*children, return_exceptions=True)
+            self._listener_task = self._heartbeat_task = self._probe_task = None
+    
+    async def _connect_once(self) -> bool:
+        """Une tentative de connexion, dans un créneau de la flotte si elle y est rattachée"""
+        self._set_state(STATE_CONNECTING)
+        start = time.monotonic()
+        session, self._handover_session = self._handover_session, None
+        if session is not None and not session.is_open:
+            _LOGGER.debug("Session validée fermée entre-temps, nouvelle connexion")
+            session = None
+        if session is not None:
+            # Session déjà authentifiée: ni handshake ni créneau de la flotte
+            success = await self._connect(session)
+        elif self.fleet is None:
+            success = await self._connect()
+        else:
+            async with self.fleet.connect_slot():
+                success = await self._connect()
+        
+        if success:
+            self.breaker.record_success()
+            if self.fleet is not None:
+                self.fleet.record_connected(self, time.monotonic() - start)
+        else:
+            self.breaker.record_failure()
+        return success
+    
+    async def _connect(self, session: Optional[Rio4Session] = None):
+        """Établit la connexion TCP et authentifie, ou adopte une session déjà authentifiée"""
         try:
-            _LOGGER.info(f"🔌 Connexion à {self.host}:{self.port}...")
-            
             # Nettoyer les anciennes connexions
             await self._cleanup_connection()
+            self._seen_channels.clear()
+            self._snapshot_event.clear()
             
-            # Établir la connexion TCP
-            self.reader, self.writer = await asyncio.wait_for(
-                asyncio.open_connection(self.host, self.port),
-                timeout=10.0
-            )
-            _LOGGER.debug(f"Socket TCP établi vers {self.host}:{self.port}")
+            if session is None:
+                _LOGGER.info(f"🔌 Connexion à {self.host}:{self.port}...")
+                # Le LineFramer est partagé avec la session: la fin d'une ligne reçue
+                # pendant l'authentification reste disponible pour _listen
+                self._framer.reset()
+                session = await Rio4Session.open(self.host, self.port, framer=self._framer)
+                if self.recorder is not None:
+                    session.on_receive = partial(self.recorder.record, DIRECTION_IN)
+                    session.on_send = partial(self.recorder.record, DIRECTION_OUT)
+                self.reader, self.writer = session.reader, session.writer
+                _LOGGER.debug(f"Socket TCP établi vers {self.host}:{self.port}")
+                self._set_state(STATE_AUTHENTICATING)
+                try:
+                    await session.login(self.username, self.password)
+                finally:
+                    self.metrics.bytes_in += session.bytes_in
+                    self.metrics.bytes_out += session.bytes_out
+            else:
+                _LOGGER.info(f"🤝 Reprise de la session validée par la configuration ({self.host}:{self.port})")
+                self.reader, self.writer = session.reader, session.writer
+                self._framer = session.framer
+                self.metrics.bytes_in += session.bytes_in
+                self.metrics.bytes_out += session.bytes_out
+            self._configure_socket(self.writer.get_extra_info("socket"))
             
-            # Attendre le LOGINREQUEST du serveur
-            try:
-                data = await asyncio.wait_for(self.reader.read(100), timeout=5.0)
-                message = data.decode('utf-8').strip()
-                _LOGGER.debug(f"Reçu: {message}")
-                
-                if "LOGINREQUEST?" in message:
-                    # Envoyer les identifiants
-                    login_string = f"{self.username};{self.password}\r"
-                    self.writer.write(login_string.encode('utf-8'))
-                    await self.writer.drain()
-                    _LOGGER.debug(f"Identifiants envoyés: {self.username};***")
-                    
-                    # Attendre la réponse d'authentification
-                    response = await asyncio.wait_for(self.reader.read(100), timeout=5.0)
-                    auth_message = response.decode('utf-8').strip()
-                    _LOGGER.debug(f"Authentification: {auth_message}")
-                    
-                    if "AUTHENTICATION=Successful" in auth_message:
-                        self.connected = True
-                        self._last_successful_connection = datetime.now()
-                        _LOGGER.info("✅ Authentification réussie au RMG Rio 4")
-                        
-                        # Reset des paramètres de reconnexion
-                        self._reconnect_attempts = 0
-                        self._reconnect_interval = 5
-                        
-                        # Démarrer l'écoute des messages et la surveillance
-                        asyncio.create_task(self._listen())
-                        await self._mark_entities_available()
-                        
-                        return True
-                    else:
-                        _LOGGER.error(f"❌ Échec de l'authentification: {auth_message}")
-                        await self._cleanup_connection()
-                        return False
-                else:
-                    _LOGGER.error(f"Réponse inattendue du serveur: {message}")
-                    await self._cleanup_connection()
-                    return False
-                    
-            except asyncio.TimeoutError:
-                _LOGGER.error("⏰ Timeout en attendant LOGINREQUEST")
-                await self._cleanup_connection()
-                return False
-                    
+            self.connected = True
+            self._last_successful_connection = datetime.now()
+            _LOGGER.info("✅ Authentification réussie au RMG Rio 4")
+            
+            # Reset du heartbeat
+            self._heartbeat_misses = 0
+            
+            # Retenir les écritures d'état jusqu'à la fin du snapshot: chaque
+            # entité est écrite une seule fois (disponibilité + état)
+            self.state_writes.hold()
+            await self._mark_entities_available()
+            
+            # Le boîtier pousse l'état des canaux juste après l'authentification:
+            # traiter les lignes déjà reçues dans le même paquet
+            while session.lines:
+                await self._process_message(session.lines.popleft())
+            
+            # L'écoute et le heartbeat sont démarrés par le superviseur
+            return True
+        
         except asyncio.TimeoutError:
-            _LOGGER.error(f"⏰ Timeout de connexion vers {self.host}:{self.port}")
-            await self._cleanup_connection()
-            return False
+            _LOGGER.error(f"⏰ Timeout de connexion ou d'authentification vers {self.host}:{self.port}")
+        except AuthenticationError as e:
+            _LOGGER.error(f"❌ Échec de l'authentification: {e}")
+        except HandshakeError as e:
+            _LOGGER.error(f"❌ {e}")
         except Exception as e:
             _LOGGER.error(f"❌ Erreur de connexion: {e}")
-            await self._cleanup_connection()
-            return False
+        await self._cleanup_connection()
+        return False
+    
+    def _configure_socket(self, sock):
+        """Active TCP_NODELAY et le keepalive TCP (lien mort détecté en secondes)"""
+        if sock is None:
+            return
+        try:
+            # Commandes courtes et interactives: pas d'attente de Nagle avant l'envoi
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            # Options disponibles selon l'OS (Linux, macOS...)
+            if hasattr(socket, "TCP_KEEPIDLE"):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, self._keepalive_idle)
+            elif hasattr(socket, "TCP_KEEPALIVE"):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPALIVE, self._keepalive_idle)
+            if hasattr(socket, "TCP_KEEPINTVL"):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, self._keepalive_interval)
+            if hasattr(socket, "TCP_KEEPCNT"):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, self._keepalive_count)
+            if hasattr(socket, "TCP_USER_TIMEOUT"):
+                # Données non acquittées par le pair: abandon dans le même délai
+                sock.setsockopt(
+                    socket.IPPROTO_TCP, socket.TCP_USER_TIMEOUT, int(self.dead_peer_bound * 1000)
+                )
+        except OSError as e:
+            _LOGGER.debug(f"Options keepalive non appliquées: {e}")
+    
+    @property
+    def dead_peer_bound(self) -> float:
+        """Délai maximal avant de déclarer mort un pair qui ne répond plus (secondes)"""
+        interval = self.fleet.health_interval if self.fleet is not None else self._ping_interval
+        return interval * self._heartbeat_max_misses + self._heartbeat_timeout
     
     async def _cleanup_connection(self):
         """Nettoie la connexion actuelle"""
@@ -138,170 +551,107 @@ class RelayBoxConnection:
     
     async def _listen(self):
         """Écoute en continu les messages du serveur avec gestion robuste des erreurs"""
-        buffer = ""
+        # Le LineFramer n'est pas réinitialisé: il peut contenir la fin d'une ligne
+        # reçue pendant l'authentification
         _LOGGER.debug("👂 Démarrage écoute des messages serveur")
         
-        # Démarrer la surveillance de connexion
-        await self._start_connection_monitoring()
-        
         try:
             while self.connected and self.reader:
                 try:
-                    data = await asyncio.wait_for(self.reader.read(1024), timeout=60.0)
+                    data = await asyncio.wait_for(
+                        self.reader.read(READ_CHUNK_SIZE), timeout=self.dead_peer_bound
+                    )
                     
                     if not data:
                         _LOGGER.warning("📡 Connexion fermée par le serveur")
-                        self.connected = False
+                        self._set_disconnected("closed_by_peer")
                         break
                     
-                    buffer += data.decode('utf-8')
-                    
-                    # Traiter les lignes complètes (séparées par \r ou \n)
-                    while '\r' in buffer or '\n' in buffer:
-                        if '\r' in buffer:
-                            line, buffer = buffer.split('\r', 1)
-                        else:
-                            line, buffer = buffer.split('\n', 1)
-                        
-                        line = line.strip()
-                        if line:
-                            await self._process_message(line)
+                    await self._feed(data)
                 
                 except asyncio.TimeoutError:
-                    # Timeout normal - on continue d'écouter
-                    _LOGGER.debug("⏰ Timeout écoute (normal)")
-                    continue
+                    # Le heartbeat produit une réponse à chaque intervalle: un silence
+                    # plus long signifie que le pair est mort (connexion à moitié ouverte)
+                    _LOGGER.warning(f"⏰ Aucune donnée depuis {self.dead_peer_bound:.0f}s, pair considéré mort")
+                    self._set_disconnected("read_timeout")
+                    break
                     
                 except (ConnectionResetError, ConnectionAbortedError, OSError) as e:
                     _LOGGER.warning(f"📡 Connexion interrompue: {e}")
-                    self.connected = False
+                    self._set_disconnected(f"connection_error: {e}")
                     break
                     
         except asyncio.CancelledError:
             _LOGGER.debug("🛑 Écoute des messages annulée")
+            raise
         except Exception as e:
             _LOGGER.error(f"❌ Erreur lors de l'écoute: {e}")
-            self.connected = False
-        finally:
-            # Arrêter la surveillance
-            if self._monitor_task and not self._monitor_task.done():
-                self._monitor_task.cancel()
-            
-            # Si la connexion a été fermée de façon inattendue, déclencher une reconnexion
-            if not self.connected:
-                _LOGGER.warning("🔌 Écoute terminée - déclenchement reconnexion")
-                asyncio.create_task(self._trigger_reconnect())
-    
-    async def _ensure_connection(self):
-        """Assure que la connexion est active, sinon tente de reconnecter"""
-        if not self.connected or not self.writer or self.writer.is_closing():
-            _LOGGER.warning("🔌 Connexion fermée, tentative de reconnexion...")
-            await self._trigger_reconnect()
-            return self.connected
-        return True
+            self._set_disconnected(f"listen_error: {e}")
     
-    async def _trigger_reconnect(self):
-        """Déclenche une reconnexion si pas déjà en cours"""
-        if self._reconnect_task and not self._reconnect_task.done():
-            return  # Une reconnexion est déjà en cours
-            
-        self._reconnect_task = asyncio.create_task(self._reconnect_loop())
+    async def _feed(self, data: bytes):
+        """Traite un bloc d'octets reçu (lecture du socket ou rejeu d'une capture)"""
+        if self.recorder is not None:
+            self.recorder.record(DIRECTION_IN, data)
+        # Traiter les lignes complètes (séparées par \r, \n ou \r\n)
+        lines = self._framer.feed(data)
+        self.metrics.bytes_in += len(data)
+        self.metrics.frames_parsed += len(lines)
+        for line in lines:
+            await self._process_message(line)
     
-    async def _reconnect_loop(self):
-        """Boucle de reconnexion avec stratégie de backoff exponentiel"""
-        await self._mark_entities_unavailable()
-        
-        while self._reconnect_attempts < self._max_reconnect_attempts:
-            try:
-                self._reconnect_attempts += 1
-                _LOGGER.info(f"🔄 Tentative de reconnexion #{self._reconnect_attempts}...")
-                
-                # Nettoyer l'ancienne connexion
-                await self._cleanup_connection()
-                
-                # Nouvelle tentative de connexion
-                success = await self.connect()
-                
-                if success:
-                    _LOGGER.info("✅ Reconnexion réussie au RMG Rio 4")
-                    
-                    # Démarrer la surveillance de connexion
-                    await self._start_connection_monitoring()
-                    
-                    # Demander les états initiaux après reconnexion
-                    await asyncio.sleep(1)
-                    await self.request_initial_states(4, 4)
-                    
-                    return True
-                else:
-                    raise Exception("Échec de connexion")
-                    
-            except Exception as e:
-                # Calculer le délai avec backoff exponentiel
-                delay = min(
-                    self._reconnect_interval * (2 ** min(self._reconnect_attempts - 1, 6)), 
-                    self._max_reconnect_interval
-                )
-                
-                _LOGGER.warning(f"❌ Reconnexion #{self._reconnect_attempts} échouée: {e}")
-                _LOGGER.info(f"⏰ Prochaine tentative dans {delay}s")
-                
-                # Attendre avant la prochaine tentative
-                await asyncio.sleep(delay)
-        
-        _LOGGER.error(f"❌ Abandon après {self._max_reconnect_attempts} tentatives")
-        return False
-    
-    async def _start_connection_monitoring(self):
-        """Démarre la surveillance de santé de connexion"""
-        if self._monitor_task and not self._monitor_task.done():
-            self._monitor_task.cancel()
-        
-        self._monitor_task = asyncio.create_task(self._monitor_connection_health())
-    
-    async def _monitor_connection_health(self):
-        """Surveille la santé de la connexion en arrière-plan"""
+    async def _heartbeat_loop(self):
+        """Heartbeat propre à la connexion (hors flotte), tâche fille de la session"""
         _LOGGER.debug("🩺 Surveillance de connexion démarrée")
         
-        while self.connected:
-            try:
+        try:
+            while self.connected:
                 await asyncio.sleep(self._ping_interval)
-                
-                if not await self._ping_device():
-                    _LOGGER.warning("💔 Ping échoué, connexion peut-être fermée")
-                    self.connected = False
+                if not await self.check_health():
                     break
-                else:
-                    _LOGGER.debug("💓 Ping réussi - connexion stable")
-                    
-            except asyncio.CancelledError:
-                _LOGGER.debug("🛑 Surveillance de connexion annulée")
-                break
-            except Exception as e:
-                _LOGGER.error(f"Erreur surveillance connexion: {e}")
-                self.connected = False
-                break
+        except asyncio.CancelledError:
+            _LOGGER.debug("🛑 Surveillance de connexion annulée")
+            raise
+        except Exception as e:
+            _LOGGER.error(f"Erreur surveillance connexion: {e}")
+            self._set_disconnected(f"monitor_error: {e}")
+    
+    async def check_health(self) -> bool:
+        """Heartbeat aller-retour, retourne False si le pair est déclaré mort
         
-        # La connexion est fermée, déclencher une reconnexion
-        if not self.connected:
-            _LOGGER.warning("🚨 Connexion fermée détectée par surveillance")
-            await self._trigger_reconnect()
+        Appelé par la surveillance propre à la connexion ou par celle de la flotte.
+        """
+        if await self._ping_device():
+            self._heartbeat_misses = 0
+            _LOGGER.debug(f"💓 Heartbeat {self.host}: {self.last_heartbeat_rtt * 1000:.1f} ms")
+            return True
+        
+        self._heartbeat_misses += 1
+        if self._heartbeat_misses < self._heartbeat_max_misses:
+            _LOGGER.warning(
+                f"💔 Heartbeat sans réponse de {self.host} "
+                f"({self._heartbeat_misses}/{self._heartbeat_max_misses})"
+            )
+            return True
+        
+        _LOGGER.warning(f"🚨 {self.host} ne répond plus, connexion considérée morte")
+        self._heartbeat_misses = 0
+        # Coupe le transport: la lecture se termine et le superviseur reconnecte
+        self._set_disconnected("heartbeat_timeout")
+        return False
     
     async def _ping_device(self):
-        """Test de ping pour vérifier que l'appareil répond"""
+        """Heartbeat: envoie RELAY1? et attend la réponse RELAY1= du boîtier"""
         try:
             if not self.writer or self.writer.is_closing():
                 return False
-                
-            # Envoyer une commande simple pour tester
-            start_time = datetime.now()
-            success = await self.send_command("RELAY1?", skip_connection_check=True)
             
-            if not success:
+            start = time.monotonic()
+            if not await self.send_command_ack(
+                "RELAY1?", timeout=self._heartbeat_timeout, priority=PRIORITY_HEALTH
+            ):
                 return False
             
-            # Le ping est considéré réussi si la commande s'envoie sans erreur
-            # La réponse sera traitée normalement par _listen()
+            self.last_heartbeat_rtt = time.monotonic() - start
             return True
                 
         except Exception as e:
@@ -309,29 +659,43 @@ class RelayBoxConnection:
             return False
     
     async def _process_message(self, message: str):
-        """Traite les messages reçus du boîtier"""
-        _LOGGER.debug(f"Message reçu: {message}")
+        """Traite les messages reçus du boîtier (appelé pour chaque trame)"""
+        # Chemin critique: journalisation paresseuse, formatée seulement en debug
+        _LOGGER.debug("Message reçu: %s", message)
         
         # Ignorer certains messages de statut
-        if message in ["SERVER=SHUTDOWN", "UPDATE=STARTED", "REBOOT=STARTED"]:
+        if message in _STATUS_MESSAGES:
             _LOGGER.info(f"Message de statut serveur: {message}")
             return
         
         # Parser les états des relais et DIOs (RELAY1=OFF, DIO1=OFF, etc.)
         if "=" in message and (message.startswith("RELAY") or message.startswith("DIO")):
             try:
-                device, state = message.split("=", 1)
+                device, _, state = message.partition("=")
                 device = device.strip()
                 state = state.strip()
                 
                 # Vérifier que l'état est valide ou si c'est une erreur de type
-                if state in ["ON", "OFF"] or "ERROR" in state:
-                    # Notifier tous les callbacks enregistrés
-                    for callback in self.callbacks:
-                        try:
-                            await callback(device, state)
-                        except Exception as e:
-                            _LOGGER.error(f"Erreur dans callback pour {device}={state}: {e}")
+                if state in _OUTPUT_STATES or "ERROR" in state:
+                    key = parse_channel(device)
+                    if key is not None and "ERROR" not in state:
+                        self._record_state(key, state)
+                        if key in self.inputs:
+                            # Entrée à fréquence élevée: pas de notification par front
+                            self._feed_input(key, state)
+                            if key in self._pending_acks:
+                                self._resolve_acks(key, state)
+                            return
+                    
+                    # Notifier directement les abonnés du canal, puis les abonnés globaux
+                    for listener in self._channel_callbacks.get(key, ()):
+                        await self._run_callback(listener, device, state)
+                    for listener in self.callbacks:
+                        await self._run_callback(listener, device, state)
+                    
+                    # Acquitter les commandes qui attendaient cet écho
+                    if key in self._pending_acks:
+                        self._resolve_acks(key, state)
                 else:
                     _LOGGER.warning(f"État invalide reçu: {message}")
             except Exception as e:
@@ -339,131 +703,467 @@ class RelayBoxConnection:
         elif "ERROR=" in message:
             _LOGGER.error(f"Erreur du serveur: {message}")
         else:
-            _LOGGER.debug(f"Message non traité: {message}")
+            _LOGGER.debug("Message non traité: %s", message)
+    
+    def _record_state(self, key: ChannelKey, state: str):
+        """Mémorise l'état d'un canal et détecte un snapshot complet"""
+        self.states[key] = state
+        self.watchdog.touch(key)
+        if key not in self._seen_channels:
+            self._seen_channels.add(key)
+            if not self._snapshot_event.is_set() and not self.missing_channels():
+                _LOGGER.debug("📸 État de tous les canaux reçu")
+                self._snapshot_event.set()
+                self.state_writes.release()
+    
+    @property
+    def snapshot_complete(self) -> bool:
+        """True si tous les canaux ont été vus depuis la dernière connexion"""
+        return self._snapshot_event.is_set()
+    
+    def missing_channels(self) -> List[ChannelKey]:
+        """Canaux dont l'état n'a pas encore été reçu depuis la connexion"""
+        return [key for key in CHANNEL_KEYS.values() if key not in self._seen_channels]
+    
+    def _resolve_acks(self, key: ChannelKey, state: str):
+        """Résout les commandes en attente sur un canal selon l'état reçu"""
+        for expected, future in self._pending_acks[key]:
+            if future.done():
+                continue
+            if "ERROR" in state:
+                # Ex: TYPE DI ERROR, la commande a été refusée par le boîtier
+                future.set_result(False)
+            elif expected is None or expected == state:
+                future.set_result(True)
+            # Sinon: notification d'un autre état, on continue d'attendre
+    
+    async def _run_callback(self, callback, device: str, state: str):
+        """Exécute un callback d'état en isolant ses erreurs"""
+        try:
+            await callback(device, state)
+        except Exception as e:
+            _LOGGER.error(f"Erreur dans callback pour {device}={state}: {e}")
     
     def register_callback(self, callback):
-        """Enregistre un callback pour les mises à jour d'état"""
+        """Enregistre un callback recevant les mises à jour de tous les canaux"""
         self.callbacks.append(callback)
     
-    def register_entity(self, entity):
-        """Enregistre une entité pour la gestion d'état disponible/indisponible"""
+    def register_channel_callback(self, kind: str, number: int, callback):
+        """Enregistre un callback pour les mises à jour d'un seul canal (RELAY/DIO n)"""
+        self._channel_callbacks.setdefault((kind, number), []).append(callback)
+    
+    def configure_inputs(
+        self,
+        numbers: Iterable[int],
+        debounce: float = DEFAULT_DEBOUNCE_MS / 1000,
+        publish_interval: float = DEFAULT_PUBLISH_INTERVAL,
+        raw_count: Iterable[int] = (),
+    ):
+        """Déclare les DIO câblées en entrée (à appeler avant connect)
+        
+        raw_count: entrées dont chaque front brut est compté (impulsions courtes)
+        """
+        raw_count = set(raw_count)
+        self.inputs = {
+            (DIO, number): DigitalInputTracker(debounce, count_raw=number in raw_count)
+            for number in numbers
+        }
+        self._input_publish_interval = publish_interval
+    
+    def register_input_callback(self, number: int, callback):
+        """Enregistre un callback (synchrone) recevant le DigitalInputTracker publié"""
+        self._input_callbacks.setdefault((DIO, number), []).append(callback)
+    
+    def _feed_input(self, key: ChannelKey, state: str):
+        """Front reçu sur une entrée: état (et comptage) après stabilisation"""
+        tracker = self.inputs[key]
+        if not tracker.feed(state, asyncio.get_running_loop().time()):
+            return
+        self._arm_input_settle(key)
+        self._schedule_input_publish()
+    
+    def _arm_input_settle(self, key: ChannelKey):
+        """Programme la stabilisation d'une entrée (un seul timer par entrée)"""
+        if key in self._input_settle_handles:
+            return  # Le timer en place se reprogramme si l'entrée a encore bougé
+        when = self.inputs[key].settle_at()
+        if when is not None:
+            self._input_settle_handles[key] = asyncio.get_running_loop().call_at(
+                when, self._settle_input, key
+            )
+    
+    def _settle_input(self, key: ChannelKey):
+        del self._input_settle_handles[key]
+        if self.inputs[key].settle(asyncio.get_running_loop().time()):
+            self._schedule_input_publish()
+        else:
+            self._arm_input_settle(key)
+    
+    def _schedule_input_publish(self):
+        """Publication immédiate si la précédente est assez ancienne, sinon différée"""
+        if self._input_publish_handle is not None:
+            return
+        loop = asyncio.get_running_loop()
+        when = max(loop.time(), self._last_input_publish + self._input_publish_interval)
+        self._input_publish_handle = loop.call_at(when, self._publish_inputs)
+    
+    def _publish_inputs(self):
+        """Publie état, compteur et fréquence de chaque entrée vers les entités"""
+        self._input_publish_handle = None
+        now = asyncio.get_running_loop().time()
+        self._last_input_publish = now
+        active = False
+        for key, tracker in self.inputs.items():
+            active |= tracker.roll_window(now)
+            for input_callback in self._input_callbacks.get(key, ()):
+                try:
+                    input_callback(tracker)
+                except Exception as e:
+                    _LOGGER.error(f"Erreur dans callback d'entrée {channel_name(key)}: {e}")
+        if active:
+            # Une publication de plus pour faire retomber la fréquence à 0 au repos
+            self._schedule_input_publish()
+    
+    def _cancel_input_timers(self):
+        for handle in self._input_settle_handles.values():
+            handle.cancel()
+        self._input_settle_handles.clear()
+        if self._input_publish_handle is not None:
+            self._input_publish_handle.cancel()
+            self._input_publish_handle = None
+    
+    def register_entity(self, entity, channel: Optional[ChannelKey] = None):
+        """Enregistre une entité pour la gestion d'état disponible/indisponible
+        
+        channel: canal affiché par l'entité, réécrite quand ce canal devient périmé ou frais
+        """
         if entity not in self.entities:
             self.entities.append(entity)
+            if channel is not None:
+                self._channel_entities.setdefault(channel, []).append(entity)
+    
+    def is_stale(self, key: ChannelKey) -> bool:
+        """True si le canal n'a donné aucune nouvelle depuis watchdog.stale_after"""
+        return self.watchdog.is_stale(key)
+    
+    def _on_channel_staleness(self, key: ChannelKey, stale: bool):
+        """Le watchdog a expiré (ou rafraîchi) un canal: réécrire ses entités"""
+        if stale:
+            _LOGGER.warning(f"⌛ {channel_name(key)} périmé: aucun état reçu depuis {self.watchdog.stale_after:.0f}s")
+        for entity in self._channel_entities.get(key, ()):
+            self.state_writes.schedule(entity)
+    
+    def _probe_channels(self, keys: List[ChannelKey]):
+        """Interroge les canaux inactifs avant qu'ils ne deviennent périmés"""
+        if not self.connected or (self._probe_task and not self._probe_task.done()):
+            return
+        self._probe_task = asyncio.create_task(self.query_states(keys))
     
     async def _mark_entities_available(self):
-        """Marque toutes les entités comme disponibles"""
+        """Marque toutes les entités comme disponibles (écritures regroupées)"""
         for entity in self.entities:
+            # Les entités sans set_available calculent available d'après la connexion
             if hasattr(entity, 'set_available'):
                 entity.set_available(True)
-                if hasattr(entity, 'async_write_ha_state'):
-                    entity.async_write_ha_state()
+            if hasattr(entity, 'async_write_ha_state'):
+                self.state_writes.schedule(entity)
     
     async def _mark_entities_unavailable(self):
-        """Marque toutes les entités comme indisponibles"""
+        """Marque toutes les entités comme indisponibles (écritures regroupées)"""
         for entity in self.entities:
+            # Les entités sans set_available calculent available d'après la connexion
             if hasattr(entity, 'set_available'):
                 entity.set_available(False)
-                if hasattr(entity, 'async_write_ha_state'):
-                    entity.async_write_ha_state()
+            if hasattr(entity, 'async_write_ha_state'):
+                self.state_writes.schedule(entity)
     
-    async def request_initial_states(self, num_relays=4, num_dios=4):
-        """Demande les états initiaux de tous les relais et DIOs"""
+    async def sync_states(self) -> bool:
+        """Complète le snapshot poussé après authentification
+        
+        Attend brièvement les lignes d'état encore en transit, puis n'interroge
+        que les canaux qui n'ont pas été reçus.
+        """
         if not self.connected:
-            return
+            return False
+        if not self.snapshot_complete:
+            try:
+                await asyncio.wait_for(self._snapshot_event.wait(), timeout=self._snapshot_grace)
+            except asyncio.TimeoutError:
+                pass
         
+        missing = self.missing_channels()
+        if not missing:
+            return True
+        _LOGGER.debug(f"Interrogation des canaux manquants: {', '.join(map(channel_name, missing))}")
+        return await self.query_states(missing)
+    
+    async def request_initial_states(self, num_relays=4, num_dios=4) -> bool:
+        """Demande les états initiaux de tous les relais et DIOs"""
+        channels = [(RELAY, i) for i in range(1, num_relays + 1)]
+        channels += [(DIO, i) for i in range(1, num_dios + 1)]
+        return await self.query_states(channels)
+    
+    async def query_states(
+        self, channels: Iterable[ChannelKey], timeout: Optional[float] = None
+    ) -> bool:
+        """Interroge plusieurs canaux en une seule écriture et attend toutes les réponses
+        
+        Retourne dès que chaque canal a répondu (True), ou False si l'échéance
+        est dépassée avant d'avoir reçu toutes les réponses.
+        """
+        channels = list(channels)
+        if not self.connected or not channels:
+            return not channels
+        
+        waiters = [(key, self._add_ack_waiter(key, None)) for key in channels]
         try:
-            # Demander l'état de chaque relais
-            for i in range(1, num_relays + 1):
-                await self.send_command(f"RELAY{i}?")
-                await asyncio.sleep(0.1)  # Petit délai pour éviter le spam
-            
-            # Demander l'état de chaque DIO
-            for i in range(1, num_dios + 1):
-                await self.send_command(f"DIO{i}?")
-                await asyncio.sleep(0.1)
-                
-            _LOGGER.debug("États initiaux demandés")
+            sent = await self.send_commands(
+                [f"{channel_name(key)}?" for key in channels],
+                skip_connection_check=True,
+                priority=PRIORITY_POLL,
+            )
+            if not sent:
+                return False
+            await asyncio.wait_for(
+                asyncio.gather(*(future for _, (_, future) in waiters)),
+                timeout=timeout if timeout is not None else self._snapshot_timeout,
+            )
+            _LOGGER.debug("États de %d canaux reçus", len(channels))
+            return True
+        except asyncio.TimeoutError:
+            missing = [channel_name(key) for key, (_, future) in waiters if not future.done()]
+            _LOGGER.warning(f"⏰ États non reçus à temps: {', '.join(missing)}")
+            return False
         except Exception as e:
-            _LOGGER.error(f"Erreur lors de la demande des états initiaux: {e}")
+            _LOGGER.error(f"Erreur lors de la demande des états: {e}")
+            return False
+        finally:
+            for key, waiter in waiters:
+                self._remove_ack_waiter(key, waiter)
     
-    async def send_command(self, command: str, skip_connection_check: bool = False):
+    async def send_command(
+        self, command: str, skip_connection_check: bool = False, priority: int = PRIORITY_USER
+    ):
         """Envoie une commande avec gestion automatique de reconnexion"""
-        max_retries = 3
+        return await self.send_commands([command], skip_connection_check, priority)
+    
+    async def send_commands(
+        self,
+        commands: List[str],
+        skip_connection_check: bool = False,
+        priority: int = PRIORITY_USER,
+    ):
+        """Envoie plusieurs commandes en une seule écriture TCP
         
-        for attempt in range(max_retries):
+        Retourne True une fois la trame écrite par la tâche d'écriture, False si
+        elle a expiré avant qu'une connexion soit disponible.
+        """
+        written = await asyncio.shield(self._enqueue(commands, priority, skip_connection_check))
+        if written is None:
+            _LOGGER.error(f"❌ Commande non envoyée (pas de connexion): {' | '.join(commands)}")
+            self.metrics.commands_failed += len(commands)
+            return False
+        return True
+    
+    def _enqueue(
+        self, commands: List[str], priority: int, skip_connection_check: bool = False
+    ) -> asyncio.Future:
+        """Confie une trame à la tâche d'écriture unique et retourne sa future"""
+        # Une commande d'état (ON/OFF/PULSE) est fusionnable avec la précédente du canal
+        channel = None
+        if len(commands) == 1:
+            reply = expected_reply(commands[0])
+            if reply is not None and reply[1] is not None:
+                channel = reply[0]
+        
+        if skip_connection_check:
+            # Trafic interne (heartbeat, interrogations): jamais conservé hors connexion
+            ttl = self._ack_timeout
+        else:
+            # Commande utilisateur: conservée pendant la reconnexion, puis expirée
+            ttl = self._offline_command_ttl
+            if not self.connected:
+                # Le superviseur est déjà en train de reconnecter
+                _LOGGER.warning("🔌 Connexion fermée, commande mise en attente de reconnexion")
+        
+        item = self._queue.put(commands, priority, channel, ttl)
+        if self._writer_task is None or self._writer_task.done():
+            self._writer_task = asyncio.create_task(self._writer_loop())
+        return item.future
+    
+    def _is_writable(self) -> bool:
+        return self.connected and self.writer is not None and not self.writer.is_closing()
+    
+    async def _writer_loop(self):
+        """Tâche d'écriture unique: seule à écrire sur le socket après l'authentification"""
+        queue = self._queue
+        while True:
+            await queue.wait()
+            
+            if not self._is_writable():
+                if self.connected:
+                    # Transport fermé sans que la lecture l'ait encore détecté
+                    self._set_disconnected("transport_closed")
+                # Attendre la connexion, au plus jusqu'à la prochaine expiration
+                next_expiry = queue.next_expiry()
+                timeout = max(0.0, next_expiry - time.monotonic()) if next_expiry else None
+                try:
+                    await asyncio.wait_for(self._connected_event.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                queue.expire()
+                continue
+            
+            # Toutes les trames prêtes partent dans une seule écriture, par priorité
+            batch = queue.pop_batch()
+            if not batch:
+                continue
+            commands = [command for item in batch for command in item.commands]
+            payload = b"".join(map(encode_command, commands))
+            if self.recorder is not None:
+                self.recorder.record(DIRECTION_OUT, payload)
             try:
-                # Vérifier/assurer la connexion sauf si explicitement ignoré
-                if not skip_connection_check:
-                    if not await self._ensure_connection():
-                        if attempt < max_retries - 1:
-                            await asyncio.sleep(0.5)
-                            continue
-                        _LOGGER.error("❌ Impossible d'établir la connexion pour envoyer la commande")
-                        return False
-                
-                # Vérifier que la connexion est toujours valide
-                if not self.writer or self.writer.is_closing():
-                    raise ConnectionError("Writer fermé")
-                
-                # Envoyer la commande
-                command_with_cr = f"{command}\r"
-                self.writer.write(command_with_cr.encode('utf-8'))
+                self.writer.write(payload)
                 await self.writer.drain()
-                _LOGGER.debug(f"📤 Commande envoyée: {command}")
+            except (ConnectionError, OSError, AttributeError) as e:
+                _LOGGER.warning(f"⚠️ Erreur envoi commande: {e}")
+                self._set_disconnected(f"write_error: {e}")
+                for item in reversed(batch):
+                    queue.push_front(item)
+                continue
+            
+            self.metrics.bytes_out += len(payload)
+            self.metrics.commands_sent += len(commands)
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                _LOGGER.debug("📤 Commande envoyée: %s", " | ".join(commands))
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_result(item.commands)
+    
+    async def send_command_ack(
+        self, command: str, timeout: Optional[float] = None, priority: int = PRIORITY_USER
+    ) -> bool:
+        """Envoie une commande et attend l'écho d'état du boîtier (RELAY1 ON -> RELAY1=ON)
+        
+        Retourne True si l'écho attendu arrive avant l'échéance, False en cas
+        d'échec d'envoi, de refus du boîtier (ERROR) ou de timeout. L'échéance
+        court à partir de l'écriture: l'attente d'une reconnexion est bornée par
+        l'expiration de la file. Une commande supplantée par une plus récente sur
+        le même canal (ON, OFF, ON -> ON) retourne True sans attendre d'écho.
+        Les commandes sans écho d'état se comportent comme send_command.
+        """
+        skip_connection_check = priority != PRIORITY_USER
+        reply = expected_reply(command)
+        if reply is None:
+            return await self.send_command(command, skip_connection_check, priority)
+        
+        key, expected = reply
+        # Enregistrer l'attente avant l'envoi: l'écho peut arriver avant la fin du drain
+        waiter = self._add_ack_waiter(key, expected)
+        start = time.monotonic()
+        
+        try:
+            written = await asyncio.shield(self._enqueue([command], priority, skip_connection_check))
+            if written is None:
+                _LOGGER.error(f"❌ Commande non envoyée (pas de connexion): {command}")
+                self.metrics.commands_failed += 1
+                return False
+            if written != [command]:
+                _LOGGER.debug("🔀 Commande %s supplantée par %s", command, written[0])
                 return True
-                
-            except (ConnectionError, OSError, BrokenPipeError, AttributeError) as e:
-                _LOGGER.warning(f"⚠️ Erreur envoi commande (tentative {attempt + 1}): {e}")
-                
-                # Marquer la connexion comme fermée
-                self.connected = False
-                
-                if attempt < max_retries - 1:
-                    await asyncio.sleep(0.5)
-                    continue
-                else:
-                    # Déclencher une reconnexion en arrière-plan pour les prochaines commandes
-                    asyncio.create_task(self._trigger_reconnect())
-                    return False
+            
+            acked = await asyncio.wait_for(
+                waiter[1], timeout=timeout if timeout is not None else self._ack_timeout
+            )
+        except asyncio.TimeoutError:
+            _LOGGER.warning(f"⏰ Pas d'acquittement du boîtier pour: {command}")
+            self.metrics.commands_failed += 1
+            return False
+        finally:
+            self._remove_ack_waiter(key, waiter)
         
-        return False
+        if acked:
+            self.last_ack_latency = time.monotonic() - start
+            self.ack_latencies.append(self.last_ack_latency)
+            self.metrics.record_ack(self.last_ack_latency)
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                _LOGGER.debug("📥 Acquittement %s en %.1f ms", command, self.last_ack_latency * 1000)
+        else:
+            _LOGGER.warning(f"❌ Commande refusée par le boîtier: {command}")
+            self.metrics.commands_failed += 1
+        return acked
+    
+    def _add_ack_waiter(self, key: ChannelKey, expected: Optional[str]):
+        """Enregistre l'attente d'un état (None = tout état) sur un canal"""
+        waiter = (expected, asyncio.get_running_loop().create_future())
+        self._pending_acks.setdefault(key, []).append(waiter)
+        return waiter
+    
+    def _remove_ack_waiter(self, key: ChannelKey, waiter):
+        """Retire une attente terminée (acquittée, refusée ou expirée)"""
+        waiters = self._pending_acks.get(key)
+        if waiters is not None:
+            waiters.remove(waiter)
+            if not waiters:
+                del self._pending_acks[key]
     
     async def disconnect(self):
         """Ferme proprement la connexion et annule toutes les tâches"""
         _LOGGER.info("🔌 Fermeture connexion RMG Rio 4")
         
-        # Marquer comme déconnecté
-        self.connected = False
+        # Marquer comme déconnecté, sans reconnexion automatique
+        self._closing = True
+        self._set_disconnected("closed")
         
-        # Annuler les tâches de surveillance et reconnexion
-        if self._monitor_task and not self._monitor_task.done():
-            self._monitor_task.cancel()
+        # Arrêter le superviseur: il annule et attend les tâches de la session
+        if self._supervisor_task and not self._supervisor_task.done():
+            self._supervisor_task.cancel()
             try:
-                await self._monitor_task
+                await self._supervisor_task
             except asyncio.CancelledError:
                 pass
+        self._supervisor_task = None
+        self._set_state(STATE_CLOSED)
         
-        if self._reconnect_task and not self._reconnect_task.done():
-            self._reconnect_task.cancel()
+        # Arrêter la tâche d'écriture et abandonner les commandes en attente
+        if self._writer_task and not self._writer_task.done():
+            self._writer_task.cancel()
             try:
-                await self._reconnect_task
+                await self._writer_task
             except asyncio.CancelledError:
                 pass
+        self._queue.clear()
+        self._cancel_input_timers()
+        self.watchdog.cancel()
+        if self._handover_session is not None:
+            await self._handover_session.close()
+            self._handover_session = None
         
         # Fermer la connexion TCP
         await self._cleanup_connection()
         
-        # Marquer toutes les entités comme indisponibles
+        # Marquer toutes les entités comme indisponibles, écrit immédiatement
         await self._mark_entities_unavailable()
+        self.state_writes.release()
+        # Plus aucune écriture ni minuterie après la fermeture
+        self.state_writes.cancel()
+        
+        if self.recorder is not None:
+            await self.recorder.close()
         
         _LOGGER.info("✅ Connexion fermée proprement")
     
     def force_reconnect(self):
         """Force une reconnexion immédiate (pour service de reconnexion manuelle)"""
         _LOGGER.info("🔄 Reconnexion forcée demandée")
-        self.connected = False
         self._reconnect_attempts = 0  # Reset le compteur
-        asyncio.create_task(self._trigger_reconnect())
+        if self._supervisor_task is None or self._supervisor_task.done():
+            # Superviseur arrêté (échec initial ou abandon): en relancer un
+            self.start()
+            return
+        # Session en cours: la couper; backoff en cours: l'écourter
+        self._set_disconnected("forced_reconnect")
+        self._wake.set()
 
 
 class RelaySwitch(SwitchEntity):
@@ -477,14 +1177,13 @@ class RelaySwitch(SwitchEntity):
         self._attr_name = f"Relais {relay_number}"
         self._attr_unique_id = f"relay_box_{relay_name}"
         
-        # Enregistrer le callback pour les mises à jour
-        connection.register_callback(self._update_callback)
+        # Enregistrer le callback pour les mises à jour de ce relais
+        connection.register_channel_callback(RELAY, relay_number, self._update_callback)
     
     async def _update_callback(self, device: str, state: str):
-        """Callback appelé quand un état change"""
-        if device == self._relay_name:
-            self._is_on = (state == "ON")
-            self.async_write_ha_state()
+        """Callback appelé quand l'état du relais change"""
+        self._is_on = (state == "ON")
+        self._connection.state_writes.schedule(self)
     
     @property
     def is_on(self):
@@ -507,6 +1206,246 @@ class RelaySwitch(SwitchEntity):
         await self._connection.send_command(command)
 
 
+def _async_get_fleet(hass: HomeAssistant) -> FleetManager:
+    """Retourne le gestionnaire de flotte partagé par toutes les entrées"""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_FLEET not in domain_data:
+        domain_data[DATA_FLEET] = FleetManager()
+    return domain_data[DATA_FLEET]
+
+
+def _handover_key(data: dict) -> tuple:
+    return (data["host"], data.get("port", 22023), data["username"], data["password"])
+
+
+@callback
+def async_hand_over_session(hass: HomeAssistant, data: dict, session: Rio4Session):
+    """Conserve une session validée par le config flow pour async_setup_entry
+    
+    L'entrée créée reprend la session et son snapshot au lieu de refaire le
+    handshake; une session non reprise est fermée après SESSION_HANDOVER_TTL.
+    """
+    handover = hass.data.setdefault(DOMAIN, {}).setdefault(DATA_HANDOVER, {})
+    key = _handover_key(data)
+    previous = handover.pop(key, None)
+    if previous is not None:
+        previous[1].cancel()
+        hass.async_create_task(previous[0].close())
+    
+    @callback
+    def _expire():
+        if key in handover and handover[key][0] is session:
+            del handover[key]
+            hass.async_create_task(session.close())
+    
+    handover[key] = (session, hass.loop.call_later(SESSION_HANDOVER_TTL, _expire))
+
+
+@callback
+def _async_take_session(hass: HomeAssistant, data: dict) -> Optional[Rio4Session]:
+    """Retire la session remise pour ces paramètres de connexion, s'il y en a une"""
+    item = hass.data.get(DOMAIN, {}).get(DATA_HANDOVER, {}).pop(_handover_key(data), None)
+    if item is None:
+        return None
+    session, handle = item
+    handle.cancel()
+    return session
+
+
+def channel_unique_id(entry_id: str, key: ChannelKey) -> str:
+    """unique_id d'une entité de canal, propre à l'entrée (ex: <entry_id>_relay_1)"""
+    return f"{entry_id}_{key[0].lower()}_{key[1]}"
+
+
+def channel_from_unique_id(unique_id: str) -> Optional[ChannelKey]:
+    """Retrouve le canal depuis un unique_id produit par channel_unique_id"""
+    parts = unique_id.rsplit("_", 2)
+    if len(parts) != 3:
+        return None
+    return parse_channel(f"{parts[1].upper()}{parts[2]}")
+
+
+def _async_resolve_entity(
+    hass: HomeAssistant, entity_id: str
+) -> Optional[Tuple[RelayBoxConnection, ChannelKey]]:
+    """Retourne la connexion et le canal pilotés par une entité
+    
+    Le registre des entités donne l'entrée de configuration (donc la connexion)
+    et le unique_id (donc le canal): aucune déduction depuis l'entity_id.
+    """
+    registry_entry = er.async_get(hass).async_get(entity_id)
+    if registry_entry is None or registry_entry.platform != DOMAIN:
+        return None
+    connection = hass.data.get(DOMAIN, {}).get(registry_entry.config_entry_id)
+    key = channel_from_unique_id(registry_entry.unique_id)
+    if not isinstance(connection, RelayBoxConnection) or key is None:
+        return None
+    return connection, key
+
+
+async def _async_set_outputs(hass: HomeAssistant, outputs: Dict[str, str]):
+    """Regroupe les commandes par boîtier: une écriture par boîtier, boîtiers en parallèle"""
+    groups: Dict[RelayBoxConnection, List[str]] = {}
+    for entity_id, state in outputs.items():
+        target = _async_resolve_entity(hass, entity_id)
+        if target is None:
+            _LOGGER.error(f"Entité {entity_id} non trouvée")
+            continue
+        connection, key = target
+        try:
+            command = output_command(key, state)
+        except ValueError as e:
+            _LOGGER.error(f"❌ {entity_id}: {e}")
+            continue
+        groups.setdefault(connection, []).append(command)
+    
+    if not groups:
+        return
+    results = await asyncio.gather(
+        *(connection.send_commands(commands) for connection, commands in groups.items()),
+        return_exceptions=True,
+    )
+    for (connection, commands), result in zip(groups.items(), results):
+        if result is True:
+            _LOGGER.info(f"✅ {connection.host}: {' | '.join(commands)}")
+        else:
+            _LOGGER.error(f"❌ Échec des commandes vers {connection.host}: {' | '.join(commands)}")
+
+
+def _async_group_targets(
+    hass: HomeAssistant, entity_ids: List[str]
+) -> Dict[RelayBoxConnection, List[ChannelKey]]:
+    """Canaux ciblés regroupés par boîtier"""
+    groups: Dict[RelayBoxConnection, List[ChannelKey]] = {}
+    for entity_id in entity_ids:
+        target = _async_resolve_entity(hass, entity_id)
+        if target is None:
+            _LOGGER.error(f"Entité {entity_id} non trouvée")
+            continue
+        groups.setdefault(target[0], []).append(target[1])
+    return groups
+
+
+async def _async_start_timers(
+    hass: HomeAssistant, entity_ids: List[str], duration: float, state: str
+):
+    """Démarre les temporisations: une trame par boîtier, boîtiers en parallèle"""
+    timers = _async_get_fleet(hass).timers
+    groups = _async_group_targets(hass, entity_ids)
+    if not groups:
+        return
+    results = await asyncio.gather(
+        *(timers.start(connection, keys, duration, state) for connection, keys in groups.items()),
+        return_exceptions=True,
+    )
+    for connection, result in zip(groups, results):
+        if isinstance(result, Exception):
+            _LOGGER.error(f"❌ Sortie temporisée refusée pour {connection.host}: {result}")
+        elif result is not True:
+            # La temporisation reste programmée: son état est réappliqué à la reconnexion
+            _LOGGER.error(f"❌ Sortie temporisée non envoyée à {connection.host} (pas de connexion)")
+
+
+async def async_setup(hass: HomeAssistant, config: dict) -> bool:
+    """Enregistre une seule fois les services communs à toutes les entrées"""
+    
+    async def handle_pulse_relay(call: ServiceCall):
+        """Gère l'appel du service pulse_relay (une ou plusieurs cibles)"""
+        duration = call.data[ATTR_DURATION]
+        await _async_set_outputs(
+            hass, {entity_id: f"PULSE {duration}" for entity_id in call.data[ATTR_ENTITY_ID]}
+        )
+    
+    async def handle_reconnect(call: ServiceCall):
+        """Gère l'appel du service de reconnexion forcée"""
+        _LOGGER.info("🔄 Service de reconnexion appelé")
+        if ATTR_ENTITY_ID in call.data:
+            # Boîtiers des entités ciblées uniquement
+            targets = [_async_resolve_entity(hass, entity_id) for entity_id in call.data[ATTR_ENTITY_ID]]
+            connections = {target[0] for target in targets if target is not None}
+        else:
+            connections = {
+                c for c in hass.data.get(DOMAIN, {}).values() if isinstance(c, RelayBoxConnection)
+            }
+        for connection in connections:
+            connection.force_reconnect()
+    
+    async def handle_set_outputs(call: ServiceCall):
+        """Gère l'appel du service set_outputs"""
+        await _async_set_outputs(hass, call.data[ATTR_OUTPUTS])
+    
+    async def handle_start_timer(call: ServiceCall):
+        """Gère l'appel du service start_timer (durée longue, tenue par Home Assistant)"""
+        await _async_start_timers(
+            hass,
+            call.data[ATTR_ENTITY_ID],
+            call.data[ATTR_DURATION].total_seconds(),
+            call.data[ATTR_STATE],
+        )
+    
+    async def handle_cancel_timer(call: ServiceCall):
+        """Gère l'appel du service cancel_timer (les sorties restent dans leur état)"""
+        timers = _async_get_fleet(hass).timers
+        for connection, keys in _async_group_targets(hass, call.data[ATTR_ENTITY_ID]).items():
+            for key in keys:
+                if not timers.cancel(connection, key):
+                    _LOGGER.warning(f"Aucune temporisation en cours sur {connection.host} {channel_name(key)}")
+    
+    async def handle_extend_timer(call: ServiceCall):
+        """Gère l'appel du service extend_timer"""
+        timers = _async_get_fleet(hass).timers
+        seconds = call.data[ATTR_DURATION].total_seconds()
+        for connection, keys in _async_group_targets(hass, call.data[ATTR_ENTITY_ID]).items():
+            for key in keys:
+                remaining = timers.extend(connection, key, seconds)
+                if remaining is None:
+                    _LOGGER.warning(f"Aucune temporisation en cours sur {connection.host} {channel_name(key)}")
+                else:
+                    _LOGGER.info(f"⏱️ {connection.host} {channel_name(key)}: encore {remaining:.0f}s")
+    
+    hass.services.async_register(
+        DOMAIN, SERVICE_PULSE_RELAY, handle_pulse_relay, schema=PULSE_RELAY_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_RECONNECT, handle_reconnect, schema=RECONNECT_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_SET_OUTPUTS, handle_set_outputs, schema=SET_OUTPUTS_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_START_TIMER, handle_start_timer, schema=START_TIMER_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_CANCEL_TIMER, handle_cancel_timer, schema=CANCEL_TIMER_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_EXTEND_TIMER, handle_extend_timer, schema=EXTEND_TIMER_SCHEMA
+    )
+    return True
+
+
+async def async_migrate_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Migre les entrées de configuration des versions précédentes"""
+    if entry.version == 1:
+        # v1: unique_id identiques d'un boîtier à l'autre (rmg_rio4_relay_1),
+        # v2: unique_id propres à l'entrée (<entry_id>_relay_1)
+        @callback
+        def _migrate_unique_id(registry_entry: er.RegistryEntry) -> Optional[dict]:
+            old_prefix = f"{DOMAIN}_"
+            if not registry_entry.unique_id.startswith(old_prefix):
+                return None
+            key = channel_from_unique_id(registry_entry.unique_id)
+            if key is None:
+                return None
+            return {"new_unique_id": channel_unique_id(entry.entry_id, key)}
+        
+        await er.async_migrate_entries(hass, entry.entry_id, _migrate_unique_id)
+        hass.config_entries.async_update_entry(entry, version=2)
+        _LOGGER.info(f"Entrée {entry.title} migrée en version 2")
+    
+    return True
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Configuration de l'intégration"""
     host = entry.data["host"]
@@ -514,67 +1453,46 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     username = entry.data["username"]
     password = entry.data["password"]
     
-    # Créer la connexion
+    # Créer la connexion et la rattacher à la flotte (connexions échelonnées)
     connection = RelayBoxConnection(host, port, username, password)
-    
-    # Se connecter
-    if not await connection.connect():
-        _LOGGER.error("Impossible de se connecter au boîtier")
-        return False
+    connection.configure_inputs(
+        [int(number) for number in entry.options.get(CONF_INPUTS, [])],
+        entry.options.get(CONF_DEBOUNCE_MS, DEFAULT_DEBOUNCE_MS) / 1000,
+        entry.options.get(CONF_PUBLISH_INTERVAL, DEFAULT_PUBLISH_INTERVAL),
+        [int(number) for number in entry.options.get(CONF_RAW_COUNT_INPUTS, [])],
+    )
+    if entry.options.get(CONF_CAPTURE, False):
+        connection.recorder = WireRecorder(hass.config.path(f"{DOMAIN}_{entry.entry_id}.cap"))
+    _async_get_fleet(hass).add(connection)
     
     # Stocker la connexion
-    hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][entry.entry_id] = connection
     
-    # Demander les états initiaux (le serveur envoie automatiquement les états à la connexion)
-    # Mais on peut en demander d'autres si besoin
-    await asyncio.sleep(1)  # Laisser le temps de recevoir les états automatiques
-    await connection.request_initial_states(4, 4)  # Rio 4 = toujours 4 relais et 4 DIO
+    # Connexion en arrière-plan: le démarrage de Home Assistant n'attend aucun
+    # boîtier. Les entités sont créées indisponibles et le deviennent dès le
+    # snapshot reçu; un boîtier injoignable est réessayé avec backoff.
+    # Juste après le config flow, la session qu'il a validée est reprise telle quelle.
+    connection.start(_async_take_session(hass, entry.data))
     
     # Charger les plateformes (switch, etc.)
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     
-    # Services de l'intégration
-    async def handle_pulse_relay(call):
-        """Gère l'appel du service pulse_relay"""
-        entity_id = call.data.get("entity_id")
-        duration = call.data.get("duration", 0.5)
-        
-        # Récupérer l'entité
-        entity = hass.states.get(entity_id)
-        if not entity:
-            _LOGGER.error(f"Entité {entity_id} non trouvée")
-            return
-        
-        # Extraire le numéro de relais depuis l'entity_id
-        # Format attendu: switch.relais_1, switch.relais_2, etc.
-        relay_number = entity_id.split("_")[-1]
-        relay_name = f"RELAY{relay_number}"
-        
-        # Envoyer la commande PULSE
-        command = f"{relay_name} PULSE {duration}"
-        success = await connection.send_command(command)
-        if success:
-            _LOGGER.info(f"✅ Commande PULSE envoyée: {command}")
-        else:
-            _LOGGER.error(f"❌ Échec commande PULSE: {command}")
-    
-    async def handle_reconnect(call):
-        """Gère l'appel du service de reconnexion forcée"""
-        _LOGGER.info("🔄 Service de reconnexion appelé")
-        connection.force_reconnect()
-    
-    # Enregistrer les services
-    hass.services.async_register(DOMAIN, "pulse_relay", handle_pulse_relay)
-    hass.services.async_register(DOMAIN, "reconnect", handle_reconnect)
+    # Recharger l'entrée quand les options changent
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
     
     return True
 
 
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry):
+    """Recharge l'entrée après une modification des options"""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Déchargement de l'intégration"""
     connection = hass.data[DOMAIN][entry.entry_id]
     await connection.disconnect()
+    await _async_get_fleet(hass).remove(connection)
     
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     
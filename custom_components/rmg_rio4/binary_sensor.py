@@ -0,0 +1,84 @@
+"""
+Plateforme Binary Sensor pour l'intégration RMG Rio 4: DIO câblées en entrée
+"""
+import logging
+
+from homeassistant.components.binary_sensor import BinarySensorEntity
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from . import DOMAIN
+from .inputs import DigitalInputTracker
+from .protocol import DIO
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Configure une entité par DIO déclarée en entrée dans les options"""
+    connection = hass.data[DOMAIN][entry.entry_id]
+    async_add_entities(
+        RMGInput(connection, entry.entry_id, number) for _, number in connection.inputs
+    )
+
+
+class RMGInput(BinarySensorEntity):
+    """Entrée digitale RMG Rio 4: état anti-rebond publié à fréquence limitée"""
+
+    _attr_should_poll = False
+
+    def __init__(self, connection, entry_id: str, dio_number: int):
+        """Initialise l'entrée"""
+        self._connection = connection
+        self._dio_number = dio_number
+        self._tracker: DigitalInputTracker = connection.inputs[(DIO, dio_number)]
+
+        # Attributs Home Assistant
+        self._attr_name = f"Entrée {dio_number}"
+        self._attr_unique_id = f"{entry_id}_input_{dio_number}"
+        self._attr_icon = "mdi:import"
+        self._attr_device_info = {
+            "identifiers": {(DOMAIN, connection.host)},
+            "name": "RMG Rio 4",
+            "manufacturer": "RMG",
+            "model": "Rio 4",
+            "sw_version": "1.1.4",
+        }
+
+        connection.register_input_callback(dio_number, self._publish_callback)
+        # Réécrite à la déconnexion, à la reconnexion et quand le canal est périmé
+        connection.register_entity(self, (DIO, dio_number))
+
+    def _publish_callback(self, tracker: DigitalInputTracker):
+        """Appelé à chaque publication (au plus une fois par intervalle)"""
+        self._connection.state_writes.schedule(self)
+
+    @property
+    def is_on(self):
+        """Retourne l'état anti-rebond de l'entrée"""
+        if self._tracker.state is None:
+            return None
+        return self._tracker.state == "ON"
+
+    @property
+    def available(self) -> bool:
+        """Retourne si l'entité est disponible"""
+        return (
+            self._connection.connected
+            and self._tracker.state is not None
+            and not self._connection.is_stale((DIO, self._dio_number))
+        )
+
+    @property
+    def extra_state_attributes(self):
+        """Retourne des attributs supplémentaires"""
+        return {
+            "dio_number": self._dio_number,
+            "edges": self._tracker.edges,
+            "frequency_hz": round(self._tracker.frequency, 2),
+        }
@@ -0,0 +1,181 @@
+"""
+Enregistrement du trafic brut d'une connexion RMG Rio 4 (capture rotative compacte)
+Module sans dépendance Home Assistant, réutilisable par les outils (tools/replay.py)
+
+Format d'un fichier de capture:
+- En-tête: MAGIC puis l'heure murale de début (double, secondes epoch)
+- Enregistrements: décalage depuis le début (double, s), sens (octet),
+  longueur (uint32) puis les octets tels que lus ou écrits sur le socket
+"""
+import asyncio
+import logging
+import os
+import struct
+import time
+from typing import Iterator, List, Optional, Tuple
+
+_LOGGER = logging.getLogger(__name__)
+
+MAGIC = b"RIO4CAP1"
+_HEADER = struct.Struct("<d")
+_RECORD = struct.Struct("<dBI")
+
+# Sens d'un enregistrement
+DIRECTION_IN = 0  # Octets reçus du boîtier
+DIRECTION_OUT = 1  # Octets envoyés au boîtier
+DIRECTION_EVENT = 2  # Événement de connexion (texte: connected, disconnected:<cause>)
+
+# Rotation: taille maximale d'un fichier et nombre de fichiers conservés (.1, .2...)
+DEFAULT_MAX_BYTES = 1024 * 1024
+DEFAULT_BACKUP_COUNT = 3
+# Les enregistrements sont regroupés en mémoire puis écrits hors de la boucle
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+
+class WireRecorder:
+    """Capture horodatée des trames entrantes et sortantes d'une connexion
+
+    record() ne fait qu'ajouter à un tampon mémoire (chemin critique de la
+    lecture); les écritures disque se font dans l'exécuteur, au plus une fois
+    par flush_interval, avec rotation façon RotatingFileHandler.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        backup_count: int = DEFAULT_BACKUP_COUNT,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.records = 0
+        self.dropped = 0  # Enregistrements perdus sur erreur d'écriture
+        self._buffer = bytearray()
+        self._buffered = 0
+        self._file_start: Optional[float] = None  # time.time() de l'en-tête du fichier courant
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def record(self, direction: int, data: bytes):
+        """Ajoute un enregistrement horodaté au tampon"""
+        self._buffer += _RECORD.pack(time.time(), direction, len(data))
+        self._buffer += data
+        self._buffered += 1
+        self.records += 1
+        if self._flush_handle is None and self._flush_task is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self.flush_interval, self._start_flush
+            )
+
+    def event(self, name: str):
+        """Enregistre un événement de connexion (rejoué comme tel)"""
+        self.record(DIRECTION_EVENT, name.encode("utf-8"))
+
+    def _start_flush(self):
+        self._flush_handle = None
+        self._flush_task = asyncio.create_task(self.flush())
+
+    async def flush(self):
+        """Écrit le tampon sur disque (dans l'exécuteur)"""
+        data, count = bytes(self._buffer), self._buffered
+        self._buffer.clear()
+        self._buffered = 0
+        try:
+            if data:
+                await asyncio.get_running_loop().run_in_executor(None, self._write, data)
+        except OSError as e:
+            self.dropped += count
+            _LOGGER.warning(f"Capture {self.path}: écriture impossible ({e})")
+        finally:
+            self._flush_task = None
+            if self._buffer and self._flush_handle is None:
+                self._flush_handle = asyncio.get_running_loop().call_later(
+                    self.flush_interval, self._start_flush
+                )
+
+    async def close(self):
+        """Écrit les derniers enregistrements et arrête les écritures différées"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._flush_task is not None:
+            await self._flush_task
+        await self.flush()
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+    def _write(self, data: bytes):
+        """Exécuteur: ajoute les enregistrements, décalages relatifs à l'en-tête du fichier"""
+        view = memoryview(data)
+        offset = 0
+        out = bytearray()
+        while offset < len(view):
+            timestamp, direction, length = _RECORD.unpack_from(view, offset)
+            end = offset + _RECORD.size + length
+            if self._file_start is None or not os.path.exists(self.path):
+                self._open_new(timestamp)
+            elif os.path.getsize(self.path) + len(out) + (end - offset) > self.max_bytes:
+                self._append(out)
+                out.clear()
+                self._rotate()
+                self._open_new(timestamp)
+            out += _RECORD.pack(timestamp - self._file_start, direction, length)
+            out += view[offset + _RECORD.size:end]
+            offset = end
+        self._append(out)
+
+    def _append(self, data: bytes):
+        if data:
+            with open(self.path, "ab") as f:
+                f.write(data)
+
+    def _open_new(self, start: float):
+        if os.path.exists(self.path) and self._file_start is None:
+            # Capture existante (redémarrage): on commence un nouveau fichier
+            self._rotate()
+        with open(self.path, "wb") as f:
+            f.write(MAGIC + _HEADER.pack(start))
+        self._file_start = start
+
+    def _rotate(self):
+        if self.backup_count <= 0:
+            os.remove(self.path)
+            return
+        for i in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+
+def capture_files(path: str) -> List[str]:
+    """Fichiers d'une capture rotative, du plus ancien au plus récent"""
+    files = []
+    i = 1
+    while os.path.exists(f"{path}.{i}"):
+        files.insert(0, f"{path}.{i}")
+        i += 1
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def read_capture(path: str) -> Iterator[Tuple[float, int, bytes]]:
+    """Enregistrements (heure murale, sens, octets) d'un fichier de capture"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"Fichier de capture invalide: {path}")
+    (start,) = _HEADER.unpack_from(data, len(MAGIC))
+    offset = len(MAGIC) + _HEADER.size
+    while offset + _RECORD.size <= len(data):
+        delta, direction, length = _RECORD.unpack_from(data, offset)
+        offset += _RECORD.size
+        if offset + length > len(data):
+            break  # Enregistrement tronqué (arrêt brutal pendant l'écriture)
+        yield start + delta, direction, data[offset:offset + length]
+        offset += length
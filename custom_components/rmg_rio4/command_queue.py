@@ -0,0 +1,138 @@
+"""
+File d'attente des trames sortantes vers un boîtier RMG Rio 4
+Module sans dépendance Home Assistant, réutilisable par les outils et benchmarks
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from .protocol import ChannelKey
+
+# Voies de priorité: les commandes utilisateur passent avant les heartbeats,
+# eux-mêmes avant les interrogations d'état
+PRIORITY_USER = 0
+PRIORITY_HEALTH = 1
+PRIORITY_POLL = 2
+
+
+class OutboundCommand:
+    """Une ou plusieurs commandes écrites en une seule trame
+
+    future reçoit la liste des commandes réellement écrites, ou None si la
+    trame a expiré ou a été abandonnée (déconnexion volontaire).
+    """
+
+    __slots__ = ("commands", "priority", "channel", "expires_at", "future")
+
+    def __init__(self, commands: List[str], priority: int, channel: Optional[ChannelKey],
+                 expires_at: float, future: asyncio.Future):
+        self.commands = commands
+        self.priority = priority
+        self.channel = channel
+        self.expires_at = expires_at
+        self.future = future
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+
+class CommandQueue:
+    """File d'attente à voies de priorité avec fusion des commandes supplantées
+
+    Une commande d'état (ON/OFF/PULSE) sur un canal qui a déjà une commande en
+    attente la remplace sur place: ON, OFF, ON en rafale n'écrit que ON.
+    """
+
+    def __init__(self):
+        self._lanes: List[Deque[OutboundCommand]] = [deque(), deque(), deque()]
+        self._by_channel: Dict[ChannelKey, OutboundCommand] = {}
+        self._not_empty = asyncio.Event()
+        self.coalesced = 0  # Nombre de commandes fusionnées avec une commande plus récente
+
+    def __len__(self) -> int:
+        return sum(len(lane) for lane in self._lanes)
+
+    def put(self, commands: List[str], priority: int, channel: Optional[ChannelKey],
+            ttl: float) -> OutboundCommand:
+        """Ajoute une trame, ou met à jour la commande en attente du même canal"""
+        expires_at = time.monotonic() + ttl
+        if channel is not None:
+            pending = self._by_channel.get(channel)
+            if pending is not None and not pending.future.done():
+                # Commande supplantée: seule la plus récente sera écrite
+                self.coalesced += 1
+                pending.commands = commands
+                pending.expires_at = max(pending.expires_at, expires_at)
+                if priority < pending.priority:
+                    self._lanes[pending.priority].remove(pending)
+                    pending.priority = priority
+                    self._lanes[priority].append(pending)
+                return pending
+
+        item = OutboundCommand(
+            commands, priority, channel, expires_at,
+            asyncio.get_running_loop().create_future(),
+        )
+        self._lanes[priority].append(item)
+        if channel is not None:
+            self._by_channel[channel] = item
+        self._not_empty.set()
+        return item
+
+    def push_front(self, item: OutboundCommand):
+        """Remet en tête de sa voie une trame dont l'écriture a échoué"""
+        self._lanes[item.priority].appendleft(item)
+        if item.channel is not None and item.channel not in self._by_channel:
+            self._by_channel[item.channel] = item
+        self._not_empty.set()
+
+    async def wait(self):
+        """Attend qu'au moins une trame soit disponible"""
+        await self._not_empty.wait()
+
+    def pop_batch(self, max_items: int = 64) -> List[OutboundCommand]:
+        """Retire les trames prêtes, par ordre de priorité, en écartant les expirées"""
+        batch = []
+        for lane in self._lanes:
+            while lane and len(batch) < max_items:
+                item = lane.popleft()
+                if item.channel is not None and self._by_channel.get(item.channel) is item:
+                    del self._by_channel[item.channel]
+                if item.future.done():
+                    continue  # Appelant parti (annulation)
+                if item.expired:
+                    item.future.set_result(None)
+                    continue
+                batch.append(item)
+        if not len(self):
+            self._not_empty.clear()
+        return batch
+
+    def expire(self):
+        """Résout les trames expirées (attente d'une connexion)"""
+        for lane in self._lanes:
+            for item in [i for i in lane if i.expired or i.future.done()]:
+                lane.remove(item)
+                if item.channel is not None and self._by_channel.get(item.channel) is item:
+                    del self._by_channel[item.channel]
+                if not item.future.done():
+                    item.future.set_result(None)
+        if not len(self):
+            self._not_empty.clear()
+
+    def next_expiry(self) -> Optional[float]:
+        """Instant (time.monotonic) de la prochaine expiration"""
+        expiries = [item.expires_at for lane in self._lanes for item in lane]
+        return min(expiries) if expiries else None
+
+    def clear(self):
+        """Abandonne toutes les trames en attente"""
+        for lane in self._lanes:
+            for item in lane:
+                if not item.future.done():
+                    item.future.set_result(None)
+            lane.clear()
+        self._by_channel.clear()
+        self._not_empty.clear()
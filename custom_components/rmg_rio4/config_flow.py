@@ -9,10 +9,23 @@ import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.const import CONF_HOST, CONF_PORT, CONF_USERNAME, CONF_PASSWORD
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
+import homeassistant.helpers.config_validation as cv
 
-from . import DOMAIN
+from . import (
+    CONF_CAPTURE,
+    CONF_DEBOUNCE_MS,
+    CONF_INPUTS,
+    CONF_OPTIMISTIC,
+    CONF_PUBLISH_INTERVAL,
+    CONF_RAW_COUNT_INPUTS,
+    DEFAULT_OPTIMISTIC,
+    DOMAIN,
+    async_hand_over_session,
+)
+from .inputs import DEFAULT_DEBOUNCE_MS, DEFAULT_PUBLISH_INTERVAL
+from .protocol import NUM_DIOS, AuthenticationError, HandshakeError, open_session
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -28,56 +41,29 @@ DATA_SCHEMA = vol.Schema({
 async def validate_connection(
     hass: HomeAssistant, data: dict[str, Any]
 ) -> dict[str, Any]:
-    """Valide que nous pouvons nous connecter au boîtier"""
+    """Valide que nous pouvons nous connecter au boîtier
     
+    La session authentifiée n'est pas fermée: elle est remise à l'entrée créée,
+    qui la reprend sans refaire le handshake.
+    """
     host = data[CONF_HOST]
-    port = data[CONF_PORT]
-    username = data[CONF_USERNAME]
-    password = data[CONF_PASSWORD]
-    
-    try:
-        # Tenter une connexion de test
-        reader, writer = await asyncio.wait_for(
-            asyncio.open_connection(host, port),
-            timeout=10.0
-        )
-        
-        # Attendre le LOGINREQUEST du serveur
-        login_request = await asyncio.wait_for(reader.read(100), timeout=5.0)
-        message = login_request.decode('utf-8').strip()
-        
-        if "LOGINREQUEST?" not in message:
-            raise Exception("Réponse inattendue du serveur")
-        
-        # Envoyer les identifiants
-        login_string = f"{username};{password}\r"
-        writer.write(login_string.encode('utf-8'))
-        await writer.drain()
-        
-        # Vérifier l'authentification
-        response = await asyncio.wait_for(reader.read(100), timeout=5.0)
-        auth_message = response.decode('utf-8').strip()
-        
-        # Fermer la connexion de test
-        writer.close()
-        await writer.wait_closed()
-        
-        if "AUTHENTICATION=Successful" not in auth_message:
-            raise Exception("Authentification échouée")
-        
-        return {"title": f"RMG Rio 4 ({host})"}
-        
-    except asyncio.TimeoutError:
-        raise Exception("Timeout lors de la connexion")
-    except Exception as e:
-        _LOGGER.error(f"Erreur de validation: {e}")
-        raise
+    session = await open_session(host, data[CONF_PORT], data[CONF_USERNAME], data[CONF_PASSWORD])
+    async_hand_over_session(hass, data, session)
+    return {"title": f"RMG Rio 4 ({host})"}
 
 
 class RelayBoxConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Gère le flux de configuration"""
     
-    VERSION = 1
+    VERSION = 2
+    
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> config_entries.OptionsFlow:
+        """Retourne le flux d'options"""
+        return RelayBoxOptionsFlow(config_entry)
     
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
@@ -95,16 +81,68 @@ class RelayBoxConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 
             except asyncio.TimeoutError:
                 errors["base"] = "timeout"
-            except Exception as e:
+            except AuthenticationError as e:
+                _LOGGER.error(f"Erreur de validation: {e}")
+                errors["base"] = "invalid_auth"
+            except (HandshakeError, OSError) as e:
+                _LOGGER.error(f"Erreur de validation: {e}")
+                errors["base"] = "cannot_connect"
+            except Exception:
                 _LOGGER.exception("Erreur de configuration")
-                if "Authentification" in str(e):
-                    errors["base"] = "invalid_auth"
-                else:
-                    errors["base"] = "cannot_connect"
+                errors["base"] = "cannot_connect"
         
         # Afficher le formulaire
         return self.async_show_form(
             step_id="user",
             data_schema=DATA_SCHEMA,
             errors=errors,
-        )
\ No newline at end of file
+        )
+
+
+class RelayBoxOptionsFlow(config_entries.OptionsFlow):
+    """Gère les options d'une entrée existante"""
+    
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialise le flux d'options"""
+        self._config_entry = config_entry
+    
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Gère l'étape unique des options"""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+        
+        options = self._config_entry.options
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema({
+                vol.Optional(
+                    CONF_OPTIMISTIC,
+                    default=options.get(CONF_OPTIMISTIC, DEFAULT_OPTIMISTIC),
+                ): bool,
+                # DIO câblées en entrée: binary_sensor + compteur au lieu d'un switch
+                vol.Optional(
+                    CONF_INPUTS,
+                    default=options.get(CONF_INPUTS, []),
+                ): cv.multi_select({str(i): f"DIO {i}" for i in range(1, NUM_DIOS + 1)}),
+                vol.Optional(
+                    CONF_DEBOUNCE_MS,
+                    default=options.get(CONF_DEBOUNCE_MS, DEFAULT_DEBOUNCE_MS),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=1000)),
+                # Impulsions plus courtes que l'anti-rebond: chaque front brut est compté
+                vol.Optional(
+                    CONF_RAW_COUNT_INPUTS,
+                    default=options.get(CONF_RAW_COUNT_INPUTS, []),
+                ): cv.multi_select({str(i): f"DIO {i}" for i in range(1, NUM_DIOS + 1)}),
+                vol.Optional(
+                    CONF_PUBLISH_INTERVAL,
+                    default=options.get(CONF_PUBLISH_INTERVAL, DEFAULT_PUBLISH_INTERVAL),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0.1, max=60)),
+                # Capture rotative du trafic brut, à rejouer avec tools/replay.py
+                vol.Optional(
+                    CONF_CAPTURE,
+                    default=options.get(CONF_CAPTURE, False),
+                ): bool,
+            }),
+        )
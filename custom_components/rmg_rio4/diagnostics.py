@@ -0,0 +1,58 @@
+"""
+Diagnostics de l'intégration RMG Rio 4 (téléchargeables depuis la page de l'appareil)
+"""
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+
+from . import DATA_FLEET, DOMAIN
+from .protocol import channel_name
+
+TO_REDACT = {CONF_PASSWORD, CONF_USERNAME}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Retourne les diagnostics d'une entrée: connexion, métriques, historique"""
+    connection = hass.data[DOMAIN][entry.entry_id]
+    fleet = hass.data[DOMAIN].get(DATA_FLEET)
+
+    return {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "connection": {
+            "host": connection.host,
+            "port": connection.port,
+            "connected": connection.connected,
+            "state": connection.state,
+            "snapshot_complete": connection.snapshot_complete,
+            "states": {channel_name(key): state for key, state in connection.states.items()},
+            "breaker": connection.breaker.state,
+            "reconnect_attempts": connection._reconnect_attempts,
+            "heartbeat_misses": connection._heartbeat_misses,
+            "last_heartbeat_rtt_ms": (
+                round(connection.last_heartbeat_rtt * 1000, 1)
+                if connection.last_heartbeat_rtt is not None else None
+            ),
+            "queued_commands": len(connection._queue),
+            "coalesced_commands": connection._queue.coalesced,
+            "framer_overflows": connection._framer.overflows,
+            "capture": (
+                {
+                    "path": connection.recorder.path,
+                    "records": connection.recorder.records,
+                    "dropped": connection.recorder.dropped,
+                }
+                if connection.recorder is not None else None
+            ),
+        },
+        "metrics": connection.metrics.as_dict(),
+        "reconnect_history": connection.metrics.history_list(),
+        "fleet": fleet.stats() if fleet is not None else None,
+    }
@@ -0,0 +1,222 @@
+"""
+Coordination des connexions de plusieurs boîtiers RMG Rio 4 d'une même instance
+Module sans dépendance Home Assistant, réutilisable par les outils et benchmarks
+"""
+import asyncio
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Set
+
+from .timers import OutputTimers
+
+_LOGGER = logging.getLogger(__name__)
+
+# Nombre maximum de connexions TCP + authentifications simultanées
+DEFAULT_MAX_CONCURRENT_CONNECTS = 8
+# Délai minimum entre deux démarrages de connexion (lissage des rafales)
+DEFAULT_CONNECT_STAGGER = 0.01
+# Intervalle de la surveillance de santé partagée
+DEFAULT_HEALTH_INTERVAL = 30
+# Disjoncteur: nombre d'échecs consécutifs avant ouverture, puis durée d'ouverture
+DEFAULT_BREAKER_THRESHOLD = 5
+DEFAULT_BREAKER_RESET_TIMEOUT = 120
+
+
+def full_jitter_backoff(attempt: int, base: float, cap: float) -> float:
+    """Délai de backoff exponentiel "full jitter": uniforme entre 0 et min(cap, base * 2^n)
+
+    Des boîtiers déconnectés au même instant (redémarrage d'un switch) ne
+    retentent ainsi jamais ensemble.
+    """
+    return random.uniform(0, min(cap, base * (2 ** min(attempt, 16))))
+
+
+class CircuitBreaker:
+    """Disjoncteur par hôte
+    
+    - Fermé: les tentatives de connexion sont autorisées
+    - Ouvert après N échecs consécutifs: aucune tentative pendant reset_timeout
+    - Semi-ouvert ensuite: une tentative d'essai, qui referme ou rouvre le disjoncteur
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_BREAKER_THRESHOLD,
+        reset_timeout: float = DEFAULT_BREAKER_RESET_TIMEOUT,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "open" if self.retry_in() > 0 else "half_open"
+
+    def retry_in(self) -> float:
+        """Secondes avant la prochaine tentative autorisée (0 = autorisée)"""
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def record_success(self):
+        self.failures = 0
+        self._opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self._opened_at is not None or self.failures >= self.failure_threshold:
+            # Ouverture, ou échec de la tentative d'essai en semi-ouvert
+            self._opened_at = time.monotonic()
+
+
+class FleetManager:
+    """Gestionnaire partagé des connexions de tous les boîtiers
+
+    Fonctionnalités:
+    - Connexions échelonnées avec concurrence bornée (pas de rafale de handshakes),
+      y compris pour les reconnexions
+    - Un disjoncteur par hôte (host:port) partagé par toutes les entrées vers ce boîtier
+    - Une seule boucle de surveillance de santé pour tous les boîtiers
+    - Mesure du temps de connexion de la flotte complète
+    - Sorties temporisées de tous les boîtiers sur une seule roue temporelle
+    """
+
+    def __init__(
+        self,
+        max_concurrent_connects: int = DEFAULT_MAX_CONCURRENT_CONNECTS,
+        connect_stagger: float = DEFAULT_CONNECT_STAGGER,
+        health_interval: float = DEFAULT_HEALTH_INTERVAL,
+    ):
+        self.connect_stagger = connect_stagger
+        self.health_interval = health_interval
+        self.connections: Set = set()
+
+        self._connect_semaphore = asyncio.Semaphore(max_concurrent_connects)
+        self._stagger_lock = asyncio.Lock()
+        self._next_connect_start = 0.0
+        self._connecting = 0
+        self.peak_connecting = 0  # Maximum de handshakes simultanés observé
+        self._health_task: Optional[asyncio.Task] = None
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        # Conservées au retrait d'une connexion: le rechargement d'une entrée
+        # ne doit pas laisser une sortie temporisée active indéfiniment
+        self.timers = OutputTimers(self.connection_for)
+
+        # Statistiques de connexion
+        self._cycle_start: Optional[float] = None  # Début de la vague de connexion en cours
+        self._connect_durations: Dict = {}  # Connexion -> durée du dernier connect (s)
+        self.last_fleet_connect_time: Optional[float] = None
+
+    def add(self, connection):
+        """Rattache une connexion à la flotte"""
+        connection.fleet = self
+        connection.breaker = self.breaker(f"{connection.host}:{connection.port}")
+        self.connections.add(connection)
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def remove(self, connection):
+        """Détache une connexion de la flotte (arrête la surveillance si plus aucune)"""
+        self.connections.discard(connection)
+        self._connect_durations.pop(connection, None)
+        connection.fleet = None
+        if not self.connections:
+            await self.async_shutdown()
+
+    def connection_for(self, endpoint: str):
+        """Connexion d'un hôte (host:port), de préférence connectée, ou None"""
+        found = None
+        for connection in self.connections:
+            if f"{connection.host}:{connection.port}" == endpoint:
+                if connection.connected:
+                    return connection
+                found = connection
+        return found
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        """Retourne le disjoncteur partagé d'un hôte (host:port)"""
+        if endpoint not in self._breakers:
+            self._breakers[endpoint] = CircuitBreaker()
+        return self._breakers[endpoint]
+
+    async def async_shutdown(self):
+        """Arrête la surveillance partagée"""
+        if self._health_task and not self._health_task.done():
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+        self._health_task = None
+
+    @asynccontextmanager
+    async def connect_slot(self):
+        """Réserve un créneau de connexion: échelonnement puis concurrence bornée"""
+        loop = asyncio.get_running_loop()
+        if self._cycle_start is None:
+            self._cycle_start = time.monotonic()
+
+        # Échelonner les démarrages: chaque connexion démarre au moins
+        # connect_stagger secondes après la précédente
+        async with self._stagger_lock:
+            delay = self._next_connect_start - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_connect_start = loop.time() + self.connect_stagger
+
+        async with self._connect_semaphore:
+            self._connecting += 1
+            self.peak_connecting = max(self.peak_connecting, self._connecting)
+            try:
+                yield
+            finally:
+                self._connecting -= 1
+
+    def record_connected(self, connection, duration: float):
+        """Enregistre une connexion réussie et détecte la fin de la vague de connexion"""
+        self._connect_durations[connection] = duration
+        if self._cycle_start is not None and all(c.connected for c in self.connections):
+            self.last_fleet_connect_time = time.monotonic() - self._cycle_start
+            self._cycle_start = None
+            _LOGGER.info(
+                f"🚀 Flotte connectée: {len(self.connections)} boîtier(s) "
+                f"en {self.last_fleet_connect_time:.2f}s"
+            )
+
+    async def _health_loop(self):
+        """Surveillance de santé partagée: un seul timer pour tous les boîtiers"""
+        _LOGGER.debug("🩺 Surveillance de flotte démarrée")
+        try:
+            while True:
+                await asyncio.sleep(self.health_interval)
+                connected = [c for c in self.connections if c.connected]
+                if connected:
+                    await asyncio.gather(
+                        *(c.check_health() for c in connected), return_exceptions=True
+                    )
+        except asyncio.CancelledError:
+            _LOGGER.debug("🛑 Surveillance de flotte arrêtée")
+            raise
+
+    def stats(self) -> dict:
+        """Statistiques de la flotte (diagnostic et benchmarks)"""
+        durations = list(self._connect_durations.values())
+        return {
+            "boxes": len(self.connections),
+            "connected": sum(1 for c in self.connections if c.connected),
+            "connecting": self._connecting,
+            "peak_connecting": self.peak_connecting,
+            "fleet_connect_time": self.last_fleet_connect_time,
+            "connect_time_avg": sum(durations) / len(durations) if durations else None,
+            "connect_time_max": max(durations) if durations else None,
+            "open_breakers": sorted(h for h, b in self._breakers.items() if b.state == "open"),
+            "timers": len(self.timers),
+            "timers_owed": self.timers.owed,
+            "timers_expired": self.timers.expired,
+            "timer_wakeups": self.timers.wheel.wakeups,
+        }
@@ -0,0 +1,81 @@
+"""
+Suivi des entrées digitales à fréquence élevée (compteur, débitmètre, contact rebondissant)
+Module sans dépendance Home Assistant, réutilisable par les outils et benchmarks
+"""
+from typing import Optional
+
+# Durée de stabilité minimale d'une entrée avant de publier son nouvel état
+DEFAULT_DEBOUNCE_MS = 20
+# Intervalle minimum entre deux publications vers Home Assistant
+DEFAULT_PUBLISH_INTERVAL = 1.0
+
+
+class DigitalInputTracker:
+    """État anti-rebond, nombre de fronts et fréquence d'une entrée digitale
+
+    - L'état publié ne change qu'après debounce secondes de stabilité
+    - Un front montant est compté quand l'état anti-rebond passe à ON: les
+      rebonds d'un contact ne gonflent pas le compteur
+    - count_raw: chaque front montant brut est compté dès sa réception, pour les
+      impulsions plus courtes que l'anti-rebond (débitmètre, compteur d'énergie)
+    - La fréquence est calculée sur l'intervalle entre deux publications
+    """
+
+    __slots__ = (
+        "debounce", "count_raw", "state", "raw_state", "last_change", "edges",
+        "_window_edges", "_window_start", "frequency",
+    )
+
+    def __init__(self, debounce: float = DEFAULT_DEBOUNCE_MS / 1000, count_raw: bool = False):
+        self.debounce = debounce
+        self.count_raw = count_raw
+        self.state: Optional[str] = None  # État anti-rebond (publié)
+        self.raw_state: Optional[str] = None  # Dernier état reçu du boîtier
+        self.last_change = 0.0  # Instant (monotonic) du dernier changement brut
+        self.edges = 0  # Fronts montants (anti-rebond, ou bruts si count_raw) depuis le démarrage
+        self.frequency = 0.0  # Fronts montants par seconde sur la dernière fenêtre
+        self._window_edges = 0
+        self._window_start: Optional[float] = None
+
+    def feed(self, raw_state: str, now: float) -> bool:
+        """Enregistre un état brut, retourne True s'il diffère du précédent"""
+        if raw_state == self.raw_state:
+            return False
+        if self.count_raw and raw_state == "ON" and self.raw_state is not None:
+            self._count_edge()
+        if self._window_start is None:
+            self._window_start = now
+        self.raw_state = raw_state
+        self.last_change = now
+        if self.state is None:
+            # Premier état connu (snapshot): adopté sans attendre
+            self.state = raw_state
+        return True
+
+    def _count_edge(self):
+        self.edges += 1
+        self._window_edges += 1
+
+    def settle_at(self) -> Optional[float]:
+        """Instant où l'état brut sera stable, None s'il est déjà publié"""
+        if self.raw_state == self.state:
+            return None
+        return self.last_change + self.debounce
+
+    def settle(self, now: float) -> bool:
+        """Adopte l'état brut s'il est stable depuis debounce, retourne True si l'état change"""
+        if self.raw_state == self.state or now - self.last_change < self.debounce:
+            return False
+        if not self.count_raw and self.raw_state == "ON":
+            self._count_edge()
+        self.state = self.raw_state
+        return True
+
+    def roll_window(self, now: float) -> bool:
+        """Calcule la fréquence de la fenêtre écoulée, retourne True si des fronts y ont eu lieu"""
+        active = self._window_edges > 0
+        if self._window_start is not None and now > self._window_start:
+            self.frequency = self._window_edges / (now - self._window_start)
+        self._window_edges = 0
+        self._window_start = now
+        return active
@@ -0,0 +1,136 @@
+"""
+Métriques d'exécution d'une connexion RMG Rio 4 (compteurs, histogrammes, historique)
+Module sans dépendance Home Assistant, réutilisable par les outils et benchmarks
+"""
+import time
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime
+from typing import Deque, List, Optional, Sequence
+
+# Bornes (ms) de l'histogramme des latences d'acquittement
+DEFAULT_LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+# Nombre d'événements de connexion conservés pour le diagnostic
+DEFAULT_HISTORY_SIZE = 50
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
+
+
+class Histogram:
+    """Histogramme à bornes fixes: mémoire constante, quantiles approchés"""
+
+    __slots__ = ("bounds", "counts", "count", "total", "max")
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_LATENCY_BUCKETS_MS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # Dernier seau: au-delà de la borne max
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Borne supérieure du seau contenant le quantile q, plafonnée au max observé"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+    def as_dict(self) -> dict:
+        mean = self.mean
+        return {
+            "count": self.count,
+            "mean": round(mean, 3) if mean is not None else None,
+            "p50": _round(self.quantile(0.50)),
+            "p95": _round(self.quantile(0.95)),
+            "p99": _round(self.quantile(0.99)),
+            "max": round(self.max, 3),
+            "buckets": {
+                **{f"le_{bound:g}": count for bound, count in zip(self.bounds, self.counts)},
+                "inf": self.counts[-1],
+            },
+        }
+
+
+class ConnectionMetrics:
+    """Compteurs d'une connexion: trafic, commandes, acquittements, reconnexions"""
+
+    def __init__(self, history_size: int = DEFAULT_HISTORY_SIZE):
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.frames_parsed = 0
+        self.commands_sent = 0
+        self.commands_acked = 0
+        self.commands_failed = 0
+        self.ack_latency_ms = Histogram()
+        self.reconnects = 0  # Reconnexions réussies
+        self.reconnect_attempts = 0
+        self.history: Deque[dict] = deque(maxlen=history_size)
+        self._connected_total = 0.0
+        self._connected_since: Optional[float] = None
+
+    @property
+    def connected_seconds(self) -> float:
+        """Temps cumulé passé connecté, session en cours comprise"""
+        current = time.monotonic() - self._connected_since if self._connected_since else 0.0
+        return self._connected_total + current
+
+    def record_connected(self):
+        if self._connected_since is None:
+            self._connected_since = time.monotonic()
+            self._add_event("connected")
+
+    def record_disconnected(self, reason: Optional[str] = None):
+        if self._connected_since is not None:
+            duration = time.monotonic() - self._connected_since
+            self._connected_total += duration
+            self._connected_since = None
+            self._add_event("disconnected", reason=reason, session_s=round(duration, 3))
+
+    def record_reconnect_attempt(self, success: bool):
+        self.reconnect_attempts += 1
+        if success:
+            self.reconnects += 1
+        else:
+            self._add_event("reconnect_failed", attempt=self.reconnect_attempts)
+
+    def record_ack(self, latency: float):
+        self.commands_acked += 1
+        self.ack_latency_ms.observe(latency * 1000)
+
+    def _add_event(self, event: str, **details):
+        self.history.append({"time": datetime.now().isoformat(timespec="seconds"), "event": event, **details})
+
+    def as_dict(self) -> dict:
+        return {
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "frames_parsed": self.frames_parsed,
+            "commands_sent": self.commands_sent,
+            "commands_acked": self.commands_acked,
+            "commands_failed": self.commands_failed,
+            "ack_latency_ms": self.ack_latency_ms.as_dict(),
+            "reconnects": self.reconnects,
+            "reconnect_attempts": self.reconnect_attempts,
+            "connected_seconds": round(self.connected_seconds, 1),
+        }
+
+    def history_list(self) -> List[dict]:
+        return list(self.history)
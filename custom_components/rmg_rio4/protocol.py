@@ -0,0 +1,335 @@
+"""
+Éléments du protocole TCP RMG Rio 4 (voir docs/PROTOCOL.md)
+Module sans dépendance Home Assistant, réutilisable par les outils et benchmarks
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+# Types de canaux du boîtier
+RELAY = "RELAY"
+DIO = "DIO"
+
+# Rio 4 = toujours 4 relais et 4 DIO
+NUM_RELAYS = 4
+NUM_DIOS = 4
+
+# Longueur maximale d'une ligne: les trames du Rio 4 font quelques dizaines d'octets
+DEFAULT_MAX_LINE_LENGTH = 1024
+
+# Taille de lecture socket: une rafale est découpée en une seule passe par le LineFramer
+READ_CHUNK_SIZE = 65536
+
+# Délais de l'établissement de session: connexion TCP, puis chaque ligne du handshake
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_HANDSHAKE_TIMEOUT = 5.0
+
+# Bornes de la durée d'un PULSE acceptées par le boîtier (secondes)
+MIN_PULSE_DURATION = 0.1
+MAX_PULSE_DURATION = 60
+
+# Clé d'un canal: (type, numéro), ex: ("RELAY", 1)
+ChannelKey = Tuple[str, int]
+
+# Table précalculée "RELAY1" -> ("RELAY", 1) pour éviter de parser chaque trame
+CHANNEL_KEYS: Dict[str, ChannelKey] = {
+    f"{kind}{number}": (kind, number)
+    for kind, count in ((RELAY, NUM_RELAYS), (DIO, NUM_DIOS))
+    for number in range(1, count + 1)
+}
+
+
+# Trames précalculées des commandes fixes ("RELAY1 ON" -> b"RELAY1 ON\r") et de leur
+# écho attendu: ni formatage, ni encodage, ni parsing par commande envoyée
+COMMAND_FRAMES: Dict[str, bytes] = {}
+_FIXED_REPLIES: Dict[str, Tuple[ChannelKey, Optional[str]]] = {}
+for _name, _key in CHANNEL_KEYS.items():
+    for _suffix, _reply in ((" ON", "ON"), (" OFF", "OFF"), ("?", None)):
+        COMMAND_FRAMES[_name + _suffix] = f"{_name}{_suffix}\r".encode("ascii")
+        _FIXED_REPLIES[_name + _suffix] = (_key, _reply)
+del _name, _key, _suffix, _reply
+
+
+def encode_command(command: str) -> bytes:
+    """Trame d'une commande terminée par \r, précalculée pour les commandes fixes"""
+    frame = COMMAND_FRAMES.get(command)
+    if frame is None:
+        frame = f"{command}\r".encode("utf-8")
+    return frame
+
+
+def parse_channel(device: str) -> Optional[ChannelKey]:
+    """Convertit un nom de canal (RELAY1, DIO3...) en clé (type, numéro)"""
+    key = CHANNEL_KEYS.get(device)
+    if key is not None:
+        return key
+
+    # Canal hors de la table (autre modèle de boîtier): parsing générique
+    for kind in (RELAY, DIO):
+        if device.startswith(kind):
+            number = device[len(kind):]
+            if number.isdigit():
+                return (kind, int(number))
+    return None
+
+
+def channel_name(key: ChannelKey) -> str:
+    """Convertit une clé (type, numéro) en nom de canal (RELAY1, DIO3...)"""
+    return f"{key[0]}{key[1]}"
+
+
+def expected_reply(command: str) -> Optional[Tuple[ChannelKey, Optional[str]]]:
+    """Retourne le canal et l'état attendu en écho d'une commande
+    
+    RELAY1 ON -> (("RELAY", 1), "ON"), RELAY1 PULSE 0.5 -> (("RELAY", 1), "ON"),
+    RELAY1? -> (("RELAY", 1), None) car toute réponse RELAY1=... convient.
+    Retourne None pour une commande sans écho d'état (SERIALNUMBER?, ...).
+    """
+    reply = _FIXED_REPLIES.get(command)
+    if reply is not None:
+        return reply
+    
+    command = command.strip()
+    if command.endswith("?"):
+        key = parse_channel(command[:-1])
+        return (key, None) if key else None
+    
+    parts = command.split()
+    if len(parts) < 2:
+        return None
+    key = parse_channel(parts[0])
+    if key is None:
+        return None
+    
+    action = parts[1].upper()
+    if action in ("ON", "PULSE"):
+        return key, "ON"
+    if action == "OFF":
+        return key, "OFF"
+    return None
+
+
+def output_command(key: ChannelKey, state: str) -> str:
+    """Construit la commande d'une sortie depuis un état demandé
+    
+    "ON" -> RELAY1 ON, "off" -> RELAY1 OFF, "PULSE 1.5" -> RELAY1 PULSE 1.5,
+    "PULSE" seul -> impulsion de 0.5 seconde. Lève ValueError si l'état est invalide
+    ou si la durée sort des bornes du boîtier (MIN/MAX_PULSE_DURATION).
+    """
+    parts = str(state).split()
+    action = parts[0].upper() if parts else ""
+    if action in ("ON", "OFF") and len(parts) == 1:
+        return f"{channel_name(key)} {action}"
+    if action == "PULSE" and len(parts) <= 2:
+        try:
+            duration = float(parts[1]) if len(parts) == 2 else 0.5
+        except ValueError:
+            raise ValueError(f"Durée d'impulsion invalide: {parts[1]}") from None
+        if not MIN_PULSE_DURATION <= duration <= MAX_PULSE_DURATION:
+            raise ValueError(
+                f"Durée d'impulsion hors limites ({MIN_PULSE_DURATION:g} à "
+                f"{MAX_PULSE_DURATION:g} s): {parts[1]}"
+            )
+        return f"{channel_name(key)} PULSE {duration:g}"
+    raise ValueError(f"État de sortie invalide: {state}")
+
+
+class LineFramer:
+    """Découpe incrémentale d'un flux d'octets en lignes de texte
+    
+    - Conserve la ligne incomplète dans un bytearray, chaque octet n'est examiné qu'une fois
+    - Délimiteurs \\r, \\n ou \\r\\n (même coupés entre deux lectures)
+    - Décode en UTF-8 uniquement des lignes complètes (séquences multi-octets intactes)
+    - Longueur de ligne bornée: une ligne trop longue est ignorée jusqu'au prochain délimiteur
+    """
+    
+    __slots__ = ("max_line_length", "overflows", "_buffer", "_discarding")
+    
+    def __init__(self, max_line_length: int = DEFAULT_MAX_LINE_LENGTH):
+        self.max_line_length = max_line_length
+        self.overflows = 0  # Nombre de lignes ignorées car trop longues
+        self._buffer = bytearray()
+        self._discarding = False
+    
+    @property
+    def pending(self) -> int:
+        """Nombre d'octets en attente d'un délimiteur"""
+        return len(self._buffer)
+    
+    def reset(self):
+        """Vide le tampon (nouvelle connexion)"""
+        self._buffer.clear()
+        self._discarding = False
+    
+    def feed(self, data: bytes) -> List[str]:
+        """Ajoute des octets reçus et retourne les lignes complètes non vides"""
+        # \n est traité comme \r: une paire \r\n donne une ligne vide, ignorée ensuite
+        if b"\n" in data:
+            data = data.replace(b"\n", b"\r")
+        
+        buffer = self._buffer
+        end = data.rfind(b"\r")
+        if end < 0:
+            # Pas de ligne complète: seule la nouvelle portion est examinée
+            buffer += data
+            self._check_overflow()
+            return []
+        
+        # Les octets avant le dernier délimiteur forment des lignes complètes: un
+        # délimiteur ne peut pas couper une séquence UTF-8, on décode en une fois
+        if buffer:
+            buffer += data[:end]
+            complete = bytes(buffer)
+        else:
+            complete = data[:end]
+        was_discarding = self._discarding
+        self._discarding = False
+        buffer[:] = data[end + 1:]
+        
+        segments = complete.decode("utf-8", "replace").split("\r")
+        if was_discarding:
+            # Fin de la ligne trop longue commencée dans un appel précédent
+            segments[0] = ""
+        # Le reste après le dernier délimiteur est une nouvelle ligne: son
+        # éventuel dépassement ne concerne que les appels suivants
+        self._check_overflow()
+        
+        lines = []
+        max_length = self.max_line_length
+        for segment in segments:
+            if len(segment) > max_length:
+                self.overflows += 1
+                continue
+            line = segment.strip()
+            if line:
+                lines.append(line)
+        return lines
+    
+    def _check_overflow(self):
+        """Abandonne la ligne en cours si aucun délimiteur n'arrive à temps"""
+        if len(self._buffer) > self.max_line_length:
+            if not self._discarding:
+                self.overflows += 1
+                self._discarding = True
+            self._buffer.clear()
+
+
+class HandshakeError(Exception):
+    """Le boîtier n'a pas suivi la séquence LOGINREQUEST? / AUTHENTICATION=..."""
+
+
+class AuthenticationError(HandshakeError):
+    """Identifiants refusés par le boîtier (AUTHENTICATION=Failed)"""
+
+
+class Rio4Session:
+    """Socket TCP vers un boîtier et son handshake d'authentification
+
+    Séquence commune au config flow et à RelayBoxConnection. Les lignes reçues
+    après AUTHENTICATION=Successful (snapshot poussé par le boîtier) restent dans
+    lines, la fin de ligne éventuelle dans framer: le propriétaire de la session
+    les traite avant de lire le socket.
+    """
+
+    def __init__(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        framer: Optional[LineFramer] = None,
+    ):
+        self.reader = reader
+        self.writer = writer
+        self.framer = framer if framer is not None else LineFramer()
+        self.lines: Deque[str] = deque()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.authenticated = False
+        self.authenticated_at: Optional[float] = None  # time.monotonic()
+        # Observateurs des octets bruts du handshake (capture du trafic)
+        self.on_receive: Optional[Callable[[bytes], None]] = None
+        self.on_send: Optional[Callable[[bytes], None]] = None
+
+    @classmethod
+    async def open(
+        cls,
+        host: str,
+        port: int,
+        timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        framer: Optional[LineFramer] = None,
+    ) -> "Rio4Session":
+        """Ouvre le socket TCP (sans authentifier)"""
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=timeout)
+        return cls(reader, writer, framer)
+
+    @property
+    def is_open(self) -> bool:
+        return not self.writer.is_closing()
+
+    async def read_line(self, timeout: float = DEFAULT_HANDSHAKE_TIMEOUT) -> str:
+        """Lit la prochaine ligne du handshake"""
+        while not self.lines:
+            data = await asyncio.wait_for(self.reader.read(READ_CHUNK_SIZE), timeout=timeout)
+            if not data:
+                raise HandshakeError("Connexion fermée pendant l'authentification")
+            self.bytes_in += len(data)
+            if self.on_receive is not None:
+                self.on_receive(data)
+            self.lines.extend(self.framer.feed(data))
+        return self.lines.popleft()
+
+    async def login(
+        self, username: str, password: str, timeout: float = DEFAULT_HANDSHAKE_TIMEOUT
+    ):
+        """LOGINREQUEST? -> identifiants -> AUTHENTICATION=Successful
+
+        Lève HandshakeError (réponse inattendue), AuthenticationError ou
+        asyncio.TimeoutError.
+        """
+        message = await self.read_line(timeout)
+        if "LOGINREQUEST?" not in message:
+            raise HandshakeError(f"Réponse inattendue du serveur: {message}")
+
+        login_string = f"{username};{password}\r".encode("utf-8")
+        if self.on_send is not None:
+            # Le mot de passe n'est jamais transmis aux observateurs
+            self.on_send(f"{username};***\r".encode("utf-8"))
+        self.writer.write(login_string)
+        self.bytes_out += len(login_string)
+        await self.writer.drain()
+
+        auth_message = await self.read_line(timeout)
+        while not auth_message.startswith("AUTHENTICATION"):
+            # Ligne parasite avant la réponse d'authentification
+            auth_message = await self.read_line(timeout)
+        if "AUTHENTICATION=Successful" not in auth_message:
+            raise AuthenticationError(f"Authentification échouée: {auth_message}")
+
+        self.authenticated = True
+        self.authenticated_at = time.monotonic()
+
+    async def close(self):
+        """Ferme le socket (erreurs de fermeture ignorées)"""
+        try:
+            self.writer.close()
+            await self.writer.wait_closed()
+        except Exception:
+            pass
+
+
+async def open_session(
+    host: str,
+    port: int,
+    username: str,
+    password: str,
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+    timeout: float = DEFAULT_HANDSHAKE_TIMEOUT,
+) -> Rio4Session:
+    """Ouvre et authentifie une session, le socket est fermé en cas d'échec"""
+    session = await Rio4Session.open(host, port, connect_timeout)
+    try:
+        await session.login(username, password, timeout)
+    except BaseException:
+        await session.close()
+        raise
+    return session
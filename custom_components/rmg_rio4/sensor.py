@@ -0,0 +1,204 @@
+"""
+Plateforme Sensor pour l'intégration RMG Rio 4: capteurs de diagnostic de la connexion
+
+Les capteurs sont désactivés par défaut: à activer au besoin depuis la page de l'appareil.
+"""
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Callable
+
+from homeassistant.components.sensor import (
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory, UnitOfFrequency, UnitOfInformation, UnitOfTime
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from . import DOMAIN
+from .inputs import DigitalInputTracker
+from .protocol import DIO
+
+# Les métriques sont lues en mémoire: un rafraîchissement par minute suffit
+SCAN_INTERVAL = timedelta(seconds=60)
+
+
+@dataclass(frozen=True, kw_only=True)
+class RMGSensorEntityDescription(SensorEntityDescription):
+    """Description d'un capteur de diagnostic et de sa valeur"""
+
+    value_fn: Callable[[Any], Any]
+
+
+SENSORS: tuple[RMGSensorEntityDescription, ...] = (
+    RMGSensorEntityDescription(
+        key="ack_latency_p95",
+        name="Latence d'acquittement p95",
+        icon="mdi:timer-outline",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=1,
+        value_fn=lambda c: c.metrics.ack_latency_ms.quantile(0.95),
+    ),
+    RMGSensorEntityDescription(
+        key="heartbeat_rtt",
+        name="Aller-retour heartbeat",
+        icon="mdi:heart-pulse",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda c: (
+            round(c.last_heartbeat_rtt * 1000, 1) if c.last_heartbeat_rtt is not None else None
+        ),
+    ),
+    RMGSensorEntityDescription(
+        key="commands_sent",
+        name="Commandes envoyées",
+        icon="mdi:upload",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda c: c.metrics.commands_sent,
+    ),
+    RMGSensorEntityDescription(
+        key="commands_failed",
+        name="Commandes en échec",
+        icon="mdi:alert-circle-outline",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda c: c.metrics.commands_failed,
+    ),
+    RMGSensorEntityDescription(
+        key="reconnects",
+        name="Reconnexions",
+        icon="mdi:connection",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda c: c.metrics.reconnects,
+    ),
+    RMGSensorEntityDescription(
+        key="connected_time",
+        name="Temps connecté",
+        icon="mdi:clock-check-outline",
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda c: round(c.metrics.connected_seconds),
+    ),
+    RMGSensorEntityDescription(
+        key="bytes_in",
+        name="Octets reçus",
+        icon="mdi:download-network",
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda c: c.metrics.bytes_in,
+    ),
+    RMGSensorEntityDescription(
+        key="bytes_out",
+        name="Octets envoyés",
+        icon="mdi:upload-network",
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda c: c.metrics.bytes_out,
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Configure les capteurs de diagnostic et les compteurs des entrées"""
+    connection = hass.data[DOMAIN][entry.entry_id]
+    entities = [
+        RMGDiagnosticSensor(connection, entry.entry_id, description) for description in SENSORS
+    ]
+    for _, number in connection.inputs:
+        entities.append(RMGInputCounter(connection, entry.entry_id, number))
+        entities.append(RMGInputFrequency(connection, entry.entry_id, number))
+    async_add_entities(entities)
+
+
+class RMGDiagnosticSensor(SensorEntity):
+    """Métrique de la connexion exposée comme capteur de diagnostic (désactivé par défaut)"""
+
+    entity_description: RMGSensorEntityDescription
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(self, connection, entry_id: str, description: RMGSensorEntityDescription):
+        """Initialise le capteur"""
+        self._connection = connection
+        self.entity_description = description
+        self._attr_unique_id = f"{entry_id}_{description.key}"
+        self._attr_device_info = {
+            "identifiers": {(DOMAIN, connection.host)},
+            "name": "RMG Rio 4",
+            "manufacturer": "RMG",
+            "model": "Rio 4",
+            "sw_version": "1.1.4",
+        }
+
+    @property
+    def native_value(self):
+        """Valeur courante de la métrique"""
+        return self.entity_description.value_fn(self._connection)
+
+
+class RMGInputSensor(SensorEntity):
+    """Base des capteurs d'une entrée: mis à jour à chaque publication de l'entrée"""
+
+    _attr_should_poll = False
+
+    def __init__(self, connection, entry_id: str, dio_number: int, suffix: str):
+        """Initialise le capteur"""
+        self._connection = connection
+        self._channel_key = (DIO, dio_number)
+        self._tracker: DigitalInputTracker = connection.inputs[self._channel_key]
+        self._attr_unique_id = f"{entry_id}_input_{dio_number}_{suffix}"
+        self._attr_device_info = {
+            "identifiers": {(DOMAIN, connection.host)},
+            "name": "RMG Rio 4",
+            "manufacturer": "RMG",
+            "model": "Rio 4",
+            "sw_version": "1.1.4",
+        }
+        connection.register_input_callback(dio_number, self._publish_callback)
+        # Réécrit à la déconnexion, à la reconnexion et quand le canal est périmé
+        connection.register_entity(self, self._channel_key)
+
+    def _publish_callback(self, tracker: DigitalInputTracker):
+        self._connection.state_writes.schedule(self)
+
+    @property
+    def available(self) -> bool:
+        return self._connection.connected and not self._connection.is_stale(self._channel_key)
+
+
+class RMGInputCounter(RMGInputSensor):
+    """Nombre de fronts montants d'une entrée (impulsions)"""
+
+    _attr_icon = "mdi:counter"
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    def __init__(self, connection, entry_id: str, dio_number: int):
+        super().__init__(connection, entry_id, dio_number, "edges")
+        self._attr_name = f"Impulsions entrée {dio_number}"
+
+    @property
+    def native_value(self):
+        return self._tracker.edges
+
+
+class RMGInputFrequency(RMGInputSensor):
+    """Fréquence des fronts montants d'une entrée sur la dernière fenêtre de publication"""
+
+    _attr_icon = "mdi:sine-wave"
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfFrequency.HERTZ
+    _attr_suggested_display_precision = 2
+
+    def __init__(self, connection, entry_id: str, dio_number: int):
+        super().__init__(connection, entry_id, dio_number, "frequency")
+        self._attr_name = f"Fréquence entrée {dio_number}"
+
+    @property
+    def native_value(self):
+        return round(self._tracker.frequency, 2)
@@ -0,0 +1,88 @@
+"""
+Regroupement des écritures d'état des entités vers Home Assistant
+Module sans dépendance Home Assistant, réutilisable par les outils et benchmarks
+"""
+import asyncio
+import logging
+from typing import Dict, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+# Fenêtre de regroupement des écritures d'état (secondes)
+DEFAULT_WRITE_WINDOW = 0.05
+# Durée max de retenue des écritures en attendant la fin d'un snapshot
+DEFAULT_HOLD_TIMEOUT = 1.0
+
+
+class StateWriteBatcher:
+    """Écrit chaque entité modifiée une seule fois par fenêtre
+
+    - schedule(entity): l'entité sera écrite à la fin de la fenêtre en cours,
+      quel que soit le nombre de changements reçus d'ici là
+    - hold(): retient les écritures pendant un snapshot (reconnexion), jusqu'à
+      release() ou au plus hold_timeout secondes
+    """
+
+    def __init__(
+        self,
+        window: float = DEFAULT_WRITE_WINDOW,
+        hold_timeout: float = DEFAULT_HOLD_TIMEOUT,
+    ):
+        self.window = window
+        self.hold_timeout = hold_timeout
+        self._pending: Dict[int, object] = {}  # id(entité) -> entité, ordre d'arrivée
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._hold_handle: Optional[asyncio.TimerHandle] = None
+        self.scheduled = 0  # Demandes d'écriture reçues
+        self.written = 0  # Écritures réellement effectuées
+
+    @property
+    def holding(self) -> bool:
+        return self._hold_handle is not None
+
+    def schedule(self, entity):
+        """Demande l'écriture de l'état d'une entité"""
+        self.scheduled += 1
+        self._pending[id(entity)] = entity
+        if self._flush_handle is None and not self.holding:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.window, self.flush)
+
+    def hold(self):
+        """Retient les écritures jusqu'à release() (fin de snapshot) ou hold_timeout"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._hold_handle is not None:
+            self._hold_handle.cancel()
+        self._hold_handle = asyncio.get_running_loop().call_later(self.hold_timeout, self.release)
+
+    def release(self):
+        """Termine la retenue et écrit immédiatement les entités en attente"""
+        if self._hold_handle is not None:
+            self._hold_handle.cancel()
+            self._hold_handle = None
+        self.flush()
+
+    def flush(self):
+        """Écrit une fois chaque entité en attente"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self.holding:
+            return
+        pending, self._pending = self._pending, {}
+        for entity in pending.values():
+            try:
+                entity.async_write_ha_state()
+                self.written += 1
+            except Exception as e:
+                _LOGGER.debug(f"Écriture d'état ignorée pour {entity}: {e}")
+
+    def cancel(self):
+        """Abandonne les écritures en attente (déchargement)"""
+        for handle in (self._flush_handle, self._hold_handle):
+            if handle is not None:
+                handle.cancel()
+        self._flush_handle = None
+        self._hold_handle = None
+        self._pending.clear()
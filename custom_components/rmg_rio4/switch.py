@@ -2,15 +2,18 @@
 Plateforme Switch pour l'intégration RMG Rio 4 avec gestion de disponibilité
 """
 import logging
-from datetime import datetime, timedelta
-from typing import Any
+import time
+from typing import Any, Optional
 
 from homeassistant.components.switch import SwitchEntity
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import STATE_OFF, STATE_ON
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.restore_state import RestoreEntity
 
-from . import DOMAIN
+from . import CONF_OPTIMISTIC, DEFAULT_OPTIMISTIC, DOMAIN, channel_unique_id
+from .protocol import RELAY, DIO
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -21,46 +24,192 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Configure les entités switch depuis une entrée de configuration"""
-    
+
     # Récupérer la connexion depuis le domain
     connection = hass.data[DOMAIN][entry.entry_id]
-    
+    optimistic = entry.options.get(CONF_OPTIMISTIC, DEFAULT_OPTIMISTIC)
+
     # Créer les entités switch pour chaque relais (toujours 4 sur un Rio 4)
     entities = []
     for i in range(1, 5):  # Rio 4 = 4 relais
-        relay = RMGRelay(connection, i)
+        relay = RMGRelay(connection, entry.entry_id, i, optimistic)
         entities.append(relay)
         # Enregistrer l'entité pour la gestion de disponibilité
-        connection.register_entity(relay)
-    
+        connection.register_entity(relay, (RELAY, i))
+
     # Créer les entités DIO (entrées/sorties digitales)
     # Note: Les DI (Digital Input) seront en lecture seule
     # Les DO (Digital Output) pourront être contrôlées
+    # Les DIO déclarées en entrée dans les options sont des binary_sensor
     for i in range(1, 5):  # 4 DIO sur le Rio 4
-        dio = RMGDIO(connection, i)
+        if (DIO, i) in connection.inputs:
+            continue
+        dio = RMGDIO(connection, entry.entry_id, i, optimistic)
         entities.append(dio)
         # Enregistrer l'entité pour la gestion de disponibilité
-        connection.register_entity(dio)
-    
+        connection.register_entity(dio, (DIO, i))
+
     async_add_entities(entities, True)
 
 
-class RMGRelay(SwitchEntity):
-    """Représente un relais RMG Rio 4 avec gestion de disponibilité avancée"""
-    
-    def __init__(self, connection, relay_number: int):
-        """Initialise le relais"""
+class RMGChannelSwitch(SwitchEntity, RestoreEntity):
+    """Base commune des relais et DIO: disponibilité, mode optimiste, état restauré
+
+    En mode optimiste, l'état demandé est affiché immédiatement puis confirmé
+    par l'écho du boîtier, ou annulé si la commande échoue ou n'est pas acquittée.
+
+    Au démarrage, le dernier état connu de Home Assistant est restauré sans
+    attendre le boîtier: marqué non confirmé (assumed_state, attribut restored)
+    jusqu'au snapshot, et disponible tant que la première connexion est en cours.
+    """
+
+    def __init__(self, connection, entry_id: str, kind: str, number: int, optimistic: bool):
+        """Initialise le canal"""
         self._connection = connection
-        self._relay_number = relay_number
-        self._relay_name = f"RELAY{relay_number}"
-        self._is_on = False
+        self._channel_name = f"{kind}{number}"
+        self._channel_key = (kind, number)
+        # unique_id propre à l'entrée: les services retrouvent boîtier et canal via le registre
+        self._attr_unique_id = channel_unique_id(entry_id, (kind, number))
+        self._optimistic = optimistic
+        # État issu du snapshot poussé par le boîtier après l'authentification
+        known_state = connection.states.get((kind, number))
+        self._is_on = known_state == "ON"
+        self._confirmed_on = self._is_on  # Dernier état confirmé par le boîtier
+        self._confirmed = known_state is not None  # Au moins un état reçu du boîtier
+        self._restored = False  # État restauré, en attente de confirmation
         self._available = True
-        self._last_update = None
         self._last_command_success = True
-        
+
+        # Réconciliation du mode optimiste
+        self._pending_state: Optional[str] = None
+        self._pending_token = 0
+        self._reconciliation_latency: Optional[float] = None
+
+        # Enregistrer le callback pour les mises à jour de ce canal uniquement
+        connection.register_channel_callback(kind, number, self._update_callback)
+
+    async def async_added_to_hass(self) -> None:
+        """Restaure le dernier état connu si le boîtier n'a pas encore répondu"""
+        await super().async_added_to_hass()
+        if self._confirmed:
+            return
+        last_state = await self.async_get_last_state()
+        if last_state is None or last_state.state not in (STATE_ON, STATE_OFF):
+            return
+        self._is_on = self._confirmed_on = last_state.state == STATE_ON
+        self._restored = True
+        _LOGGER.debug("%s état restauré: %s (non confirmé)", self._channel_name, last_state.state)
+
+    async def _update_callback(self, device: str, state: str):
+        """Callback appelé quand l'état du canal change"""
+        self._confirmed_on = (state == "ON")
+        self._confirmed = True
+        if self._restored:
+            # Réconciliation avec le snapshot: l'état n'est plus supposé
+            self._restored = False
+            self._connection.state_writes.schedule(self)
+
+        # Marquer comme disponible si on reçoit une réponse
+        if not self._available:
+            self.set_available(True)
+
+        # Un état intermédiaire ne doit pas écraser l'état optimiste en attente
+        if self._pending_state is not None and state != self._pending_state:
+            return
+
+        if self._is_on != self._confirmed_on:
+            self._is_on = self._confirmed_on
+            self._connection.state_writes.schedule(self)
+            _LOGGER.debug("%s état changé: %s", self._channel_name, state)
+
+    @property
+    def is_on(self) -> bool:
+        """Retourne si le canal est activé"""
+        return self._is_on
+
+    @property
+    def available(self) -> bool:
+        """Retourne si l'entité est disponible"""
+        # L'entité est disponible si:
+        # 1. Elle est marquée comme disponible
+        # 2. La connexion est active
+        # 3. Le canal n'est pas périmé (watchdog de la connexion, réécrit l'entité à l'expiration)
+        # ou l'état restauré attend la première connexion (indisponible après son échec)
+        if not self._available:
+            return False
+        if self._restored:
+            return True
+        return self._connection.connected and not self._connection.is_stale(self._channel_key)
+
+    @property
+    def assumed_state(self) -> bool:
+        """État restauré non encore confirmé par le boîtier"""
+        return self._restored
+
+    def set_available(self, available: bool):
+        """Met à jour la disponibilité de l'entité"""
+        if self._available != available:
+            self._available = available
+            _LOGGER.debug("%s %s", self._channel_name, "disponible" if available else "indisponible")
+            # Ne pas appeler async_write_ha_state ici pour éviter les boucles
+
+    @property
+    def extra_state_attributes(self):
+        """Retourne des attributs supplémentaires"""
+        attrs = {}
+        if self._restored:
+            attrs["restored"] = True
+        if self._optimistic:
+            attrs["pending_state"] = self._pending_state
+            attrs["reconciliation_latency_ms"] = (
+                round(self._reconciliation_latency * 1000, 1)
+                if self._reconciliation_latency is not None else None
+            )
+        return attrs
+
+    async def _async_send_state(self, command: str, target_on: bool) -> bool:
+        """Envoie une commande d'état, avec affichage optimiste si activé"""
+        if not self._optimistic:
+            return await self._connection.send_command_ack(command)
+
+        # Afficher tout de suite l'état demandé
+        self._pending_token += 1
+        token = self._pending_token
+        self._pending_state = "ON" if target_on else "OFF"
+        start = time.monotonic()
+        self._is_on = target_on
+        self.async_write_ha_state()
+
+        success = False
+        try:
+            success = await self._connection.send_command_ack(command)
+        finally:
+            # Une commande plus récente sur ce canal gère désormais la réconciliation
+            if token == self._pending_token:
+                self._pending_state = None
+                if success:
+                    self._reconciliation_latency = time.monotonic() - start
+                # Confirmé: l'écho a mis à jour l'état confirmé. Sinon: retour arrière
+                if self._is_on != self._confirmed_on:
+                    _LOGGER.warning(f"↩️ {self._channel_name}: état optimiste annulé")
+                    self._is_on = self._confirmed_on
+                self.async_write_ha_state()
+        return success
+
+
+class RMGRelay(RMGChannelSwitch):
+    """Représente un relais RMG Rio 4 avec gestion de disponibilité avancée"""
+
+    def __init__(
+        self, connection, entry_id: str, relay_number: int, optimistic: bool = DEFAULT_OPTIMISTIC
+    ):
+        """Initialise le relais"""
+        super().__init__(connection, entry_id, RELAY, relay_number, optimistic)
+        self._relay_number = relay_number
+        self._relay_name = self._channel_name
+
         # Attributs Home Assistant
         self._attr_name = f"Relais {relay_number}"
-        self._attr_unique_id = f"rmg_rio4_relay_{relay_number}"
         self._attr_icon = "mdi:electric-switch"
         self._attr_device_info = {
             "identifiers": {(DOMAIN, connection.host)},
@@ -69,30 +218,7 @@ class RMGRelay(SwitchEntity):
             "model": "Rio 4",
             "sw_version": "1.1.4",
         }
-        
-        # Enregistrer le callback pour les mises à jour
-        connection.register_callback(self._update_callback)
-    
-    async def _update_callback(self, device: str, state: str):
-        """Callback appelé quand un état change"""
-        if device == self._relay_name:
-            old_state = self._is_on
-            self._is_on = (state == "ON")
-            self._last_update = datetime.now()
-            
-            # Marquer comme disponible si on reçoit une réponse
-            if not self._available:
-                self.set_available(True)
-            
-            if old_state != self._is_on:
-                self.async_write_ha_state()
-                _LOGGER.debug(f"{self._relay_name} état changé: {state}")
-    
-    @property
-    def is_on(self) -> bool:
-        """Retourne si le relais est activé"""
-        return self._is_on
-    
+
     @property
     def icon(self) -> str:
         """Retourne l'icône selon l'état du relais"""
@@ -100,96 +226,69 @@ class RMGRelay(SwitchEntity):
             return "mdi:electric-switch-closed"
         else:
             return "mdi:electric-switch"
-    
-    @property
-    def available(self) -> bool:
-        """Retourne si l'entité est disponible"""
-        # L'entité est disponible si:
-        # 1. Elle est marquée comme disponible
-        # 2. La connexion est active
-        # 3. Pas de timeout sur la dernière mise à jour (> 5 minutes)
-        if not self._available or not self._connection.connected:
-            return False
-            
-        if self._last_update:
-            time_since_update = datetime.now() - self._last_update
-            if time_since_update > timedelta(minutes=5):
-                return False
-        
-        return True
-    
-    def set_available(self, available: bool):
-        """Met à jour la disponibilité de l'entité"""
-        if self._available != available:
-            self._available = available
-            _LOGGER.debug(f"Relais {self._relay_number} {'disponible' if available else 'indisponible'}")
-            # Ne pas appeler async_write_ha_state ici pour éviter les boucles
-    
+
     async def async_turn_on(self, **kwargs: Any) -> None:
         """Active le relais avec gestion d'erreur améliorée"""
         try:
             command = f"{self._relay_name} ON"
-            success = await self._connection.send_command(command)
-            
+            success = await self._async_send_state(command, True)
+
             self._last_command_success = success
-            
+
             if success:
-                _LOGGER.debug(f"✅ Commande ON envoyée pour {self._relay_name}")
+                _LOGGER.debug("✅ Commande ON acquittée pour %s", self._relay_name)
             else:
                 _LOGGER.error(f"❌ Échec de la commande ON pour {self._relay_name}")
                 # L'entité reste disponible, la reconnexion se fera automatiquement
-                
+
         except Exception as e:
             _LOGGER.error(f"❌ Erreur activation relais {self._relay_number}: {e}")
             self._last_command_success = False
             # Ne pas marquer comme indisponible, la reconnexion automatique se charge du reste
             raise
-    
+
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Désactive le relais avec gestion d'erreur améliorée"""
         try:
             command = f"{self._relay_name} OFF"
-            success = await self._connection.send_command(command)
-            
+            success = await self._async_send_state(command, False)
+
             self._last_command_success = success
-            
+
             if success:
-                _LOGGER.debug(f"✅ Commande OFF envoyée pour {self._relay_name}")
+                _LOGGER.debug("✅ Commande OFF acquittée pour %s", self._relay_name)
             else:
                 _LOGGER.error(f"❌ Échec de la commande OFF pour {self._relay_name}")
-                
+
         except Exception as e:
             _LOGGER.error(f"❌ Erreur désactivation relais {self._relay_number}: {e}")
             self._last_command_success = False
             raise
-    
+
     async def async_pulse(self, duration: float = 0.5) -> None:
         """Active le relais en mode PULSE"""
         command = f"{self._relay_name} PULSE {duration}"
-        success = await self._connection.send_command(command)
+        success = await self._connection.send_command_ack(command)
         if success:
-            _LOGGER.debug(f"Commande PULSE {duration}s envoyée pour {self._relay_name}")
+            _LOGGER.debug("Commande PULSE %ss acquittée pour %s", duration, self._relay_name)
         else:
             _LOGGER.error(f"Échec de la commande PULSE pour {self._relay_name}")
 
 
-class RMGDIO(SwitchEntity):
+class RMGDIO(RMGChannelSwitch):
     """Représente une entrée/sortie digitale RMG Rio 4 avec gestion de disponibilité"""
-    
-    def __init__(self, connection, dio_number: int):
+
+    def __init__(
+        self, connection, entry_id: str, dio_number: int, optimistic: bool = DEFAULT_OPTIMISTIC
+    ):
         """Initialise la DIO"""
-        self._connection = connection
+        super().__init__(connection, entry_id, DIO, dio_number, optimistic)
         self._dio_number = dio_number
-        self._dio_name = f"DIO{dio_number}"
-        self._is_on = False
-        self._available = True
+        self._dio_name = self._channel_name
         self._is_read_only = False  # Sera déterminé dynamiquement
-        self._last_update = None
-        self._last_command_success = True
-        
+
         # Attributs Home Assistant
         self._attr_name = f"DIO {dio_number}"
-        self._attr_unique_id = f"rmg_rio4_dio_{dio_number}"
         self._attr_icon = "mdi:toggle-switch-off"
         self._attr_device_info = {
             "identifiers": {(DOMAIN, connection.host)},
@@ -198,38 +297,19 @@ class RMGDIO(SwitchEntity):
             "model": "Rio 4",
             "sw_version": "1.1.4",
         }
-        
-        # Enregistrer le callback pour les mises à jour
-        connection.register_callback(self._update_callback)
-    
+
     async def _update_callback(self, device: str, state: str):
-        """Callback appelé quand un état change"""
-        if device == self._dio_name:
-            # Détecter si c'est une erreur de type DI
-            if "TYPE DI ERROR" in state:
-                self._is_read_only = True
-                self._attr_name = f"DIO {self._dio_number} (Entrée)"
-                _LOGGER.info(f"{self._dio_name} détecté comme entrée digitale (lecture seule)")
-                self.async_write_ha_state()
-                return
-            
-            old_state = self._is_on
-            self._is_on = (state == "ON")
-            self._last_update = datetime.now()
-            
-            # Marquer comme disponible si on reçoit une réponse
-            if not self._available:
-                self.set_available(True)
-            
-            if old_state != self._is_on:
-                self.async_write_ha_state()
-                _LOGGER.debug(f"{self._dio_name} état changé: {state}")
-    
-    @property
-    def is_on(self) -> bool:
-        """Retourne si la DIO est activée"""
-        return self._is_on
-    
+        """Callback appelé quand l'état de la DIO change"""
+        # Détecter si c'est une erreur de type DI
+        if "TYPE DI ERROR" in state:
+            self._is_read_only = True
+            self._attr_name = f"DIO {self._dio_number} (Entrée)"
+            _LOGGER.info(f"{self._dio_name} détecté comme entrée digitale (lecture seule)")
+            self._connection.state_writes.schedule(self)
+            return
+
+        await super()._update_callback(device, state)
+
     @property
     def icon(self) -> str:
         """Retourne l'icône selon l'état de la DIO"""
@@ -237,77 +317,53 @@ class RMGDIO(SwitchEntity):
             return "mdi:toggle-switch"
         else:
             return "mdi:toggle-switch-off"
-    
-    @property
-    def available(self) -> bool:
-        """Retourne si l'entité est disponible"""
-        # L'entité est disponible si:
-        # 1. Elle est marquée comme disponible
-        # 2. La connexion est active  
-        # 3. Pas de timeout sur la dernière mise à jour (> 5 minutes)
-        if not self._available or not self._connection.connected:
-            return False
-            
-        if self._last_update:
-            time_since_update = datetime.now() - self._last_update
-            if time_since_update > timedelta(minutes=5):
-                return False
-        
-        return True
-    
-    def set_available(self, available: bool):
-        """Met à jour la disponibilité de l'entité"""
-        if self._available != available:
-            self._available = available
-            _LOGGER.debug(f"DIO {self._dio_number} {'disponible' if available else 'indisponible'}")
-            # Ne pas appeler async_write_ha_state ici pour éviter les boucles
-    
+
     async def async_turn_on(self, **kwargs: Any) -> None:
         """Active la DIO (si c'est une sortie) avec gestion d'erreur améliorée"""
         # Vérifier si c'est une entrée en mode lecture seule
         if self._is_read_only:
             _LOGGER.warning(f"⚠️ {self._dio_name} est une entrée digitale (lecture seule)")
             return
-        
+
         try:
             command = f"{self._dio_name} ON"
-            success = await self._connection.send_command(command)
-            
+            success = await self._async_send_state(command, True)
+
             self._last_command_success = success
-            
+
             if success:
-                _LOGGER.debug(f"✅ Commande ON envoyée pour {self._dio_name}")
+                _LOGGER.debug("✅ Commande ON acquittée pour %s", self._dio_name)
             else:
                 _LOGGER.error(f"❌ Échec de la commande ON pour {self._dio_name}")
-                
+
         except Exception as e:
             _LOGGER.error(f"❌ Erreur activation DIO {self._dio_number}: {e}")
             self._last_command_success = False
             raise
-    
+
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Désactive la DIO (si c'est une sortie) avec gestion d'erreur améliorée"""
         # Vérifier si c'est une entrée en mode lecture seule
         if self._is_read_only:
             _LOGGER.warning(f"⚠️ {self._dio_name} est une entrée digitale (lecture seule)")
             return
-        
+
         try:
             command = f"{self._dio_name} OFF"
-            success = await self._connection.send_command(command)
-            
+            success = await self._async_send_state(command, False)
+
             self._last_command_success = success
-            
+
             if success:
-                _LOGGER.debug(f"✅ Commande OFF envoyée pour {self._dio_name}")
+                _LOGGER.debug("✅ Commande OFF acquittée pour %s", self._dio_name)
             else:
                 _LOGGER.error(f"❌ Échec de la commande OFF pour {self._dio_name}")
-                
+
         except Exception as e:
             _LOGGER.error(f"❌ Erreur désactivation DIO {self._dio_number}: {e}")
             self._last_command_success = False
             raise
-    
+
     @property
     def extra_state_attributes(self):
         """Retourne des attributs supplémentaires"""
@@ -319,4 +375,5 @@ class RMGDIO(SwitchEntity):
             attrs["type"] = "Digital Input (lecture seule)"
         else:
             attrs["type"] = "Digital Output (contrôlable)"
-        return attrs
\ No newline at end of file
+        attrs.update(super().extra_state_attributes)
+        return attrs
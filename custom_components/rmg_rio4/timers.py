@@ -0,0 +1,378 @@
+"""
+Sorties temporisées des boîtiers RMG Rio 4 (roue temporelle hiérarchique)
+Module sans dépendance Home Assistant, réutilisable par les outils et benchmarks
+"""
+import asyncio
+import logging
+import math
+from typing import Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from .protocol import ChannelKey, channel_name, output_command
+
+_LOGGER = logging.getLogger(__name__)
+
+# Pas de la roue (secondes): précision des échéances
+DEFAULT_RESOLUTION = 0.1
+# 64 cases par niveau, 4 niveaux: 64^4 pas de 0,1 s, soit ~19 jours d'horizon
+WHEEL_BITS = 6
+WHEEL_SLOTS = 1 << WHEEL_BITS
+DEFAULT_LEVELS = 4
+_SLOT_MASK = WHEEL_SLOTS - 1
+_FULL_MASK = (1 << WHEEL_SLOTS) - 1
+# Durée maximale d'une sortie temporisée (service start_timer)
+MAX_TIMER_DURATION = 7 * 24 * 3600
+
+# Temporisation d'un canal: ("host:port", canal), indépendante de l'entrée de configuration
+TimerKey = Tuple[str, ChannelKey]
+
+
+class TimingWheel:
+    """Roue temporelle hiérarchique: toutes les échéances sur un seul loop.call_at
+
+    - niveau n: 64 cases de 64^n pas; une échéance est rangée au niveau le plus
+      fin qui la contient, puis redescend d'un niveau (cascade) à l'approche
+    - ajout, annulation et prolongation en O(1), sans tas ni tri
+    - un seul handle sur la boucle, programmé sur la prochaine case occupée:
+      aucun réveil périodique, quelques réveils pour une échéance de plusieurs heures
+    - on_expire(clés) reçoit en une fois toutes les échéances d'un même pas
+    """
+
+    def __init__(
+        self,
+        on_expire: Callable[[List[Hashable]], None],
+        resolution: float = DEFAULT_RESOLUTION,
+        levels: int = DEFAULT_LEVELS,
+    ):
+        self.resolution = resolution
+        self.levels = levels
+        self._on_expire = on_expire
+        # Par niveau: cases {clé: pas d'échéance} et bitmap des cases occupées
+        self._slots: List[List[Dict[Hashable, int]]] = [
+            [{} for _ in range(WHEEL_SLOTS)] for _ in range(levels)
+        ]
+        self._occupied = [0] * levels
+        self._where: Dict[Hashable, Tuple[int, int]] = {}  # Clé -> (niveau, case)
+        self._origin: Optional[float] = None  # loop.time() du pas 0
+        self._tick = 0  # Prochain pas à traiter
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._armed_tick: Optional[int] = None
+        self.wakeups = 0
+        self.cascades = 0
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._where
+
+    def schedule(self, key: Hashable, delay: float):
+        """Programme (ou reprogramme) l'échéance de key dans delay secondes"""
+        loop = asyncio.get_running_loop()
+        if self._origin is None:
+            self._origin = loop.time()
+        self._remove(key)
+        if not self._where:
+            # Roue vide: pas de retard à rattraper, on repart du pas courant
+            self._tick = max(self._tick, self._now_tick(loop))
+        self._insert(key, self._deadline_tick(loop.time() + delay))
+        self._arm(loop)
+
+    def cancel(self, key: Hashable) -> bool:
+        """Annule l'échéance de key (False si elle n'existe pas ou a expiré)"""
+        if not self._remove(key):
+            return False
+        if not self._where and self._handle is not None:
+            self._handle.cancel()
+            self._handle = self._armed_tick = None
+        return True
+
+    def extend(self, key: Hashable, seconds: float) -> Optional[float]:
+        """Décale l'échéance de key de seconds et retourne le temps restant"""
+        tick = self._deadline_of(key)
+        if tick is None:
+            return None
+        loop = asyncio.get_running_loop()
+        self._remove(key)
+        deadline = max(self._tick, tick + math.ceil(seconds / self.resolution - 1e-9))
+        self._insert(key, deadline)
+        self._arm(loop)
+        return self.remaining(key)
+
+    def remaining(self, key: Hashable) -> Optional[float]:
+        """Secondes avant l'échéance de key, None si elle n'est pas programmée"""
+        tick = self._deadline_of(key)
+        if tick is None:
+            return None
+        now = asyncio.get_running_loop().time()
+        return max(0.0, self._origin + tick * self.resolution - now)
+
+    def close(self):
+        """Annule toutes les échéances et le handle de la boucle"""
+        if self._handle is not None:
+            self._handle.cancel()
+        self._handle = self._armed_tick = None
+        for level in self._slots:
+            for slot in level:
+                slot.clear()
+        self._occupied = [0] * self.levels
+        self._where.clear()
+
+    def _now_tick(self, loop: asyncio.AbstractEventLoop) -> int:
+        # Tolérance: call_at peut se déclencher une fraction de résolution d'horloge en avance
+        return math.floor((loop.time() - self._origin) / self.resolution + 1e-6)
+
+    def _deadline_tick(self, when: float) -> int:
+        """Pas d'une échéance, arrondi au pas suivant: jamais en avance"""
+        return max(self._tick, math.ceil((when - self._origin) / self.resolution - 1e-9))
+
+    def _deadline_of(self, key: Hashable) -> Optional[int]:
+        where = self._where.get(key)
+        if where is None:
+            return None
+        return self._slots[where[0]][where[1]][key]
+
+    def _insert(self, key: Hashable, tick: int):
+        delta = tick - self._tick
+        level = 0
+        while level < self.levels - 1 and delta >= 1 << (WHEEL_BITS * (level + 1)):
+            level += 1
+        # Au-delà de l'horizon: rangée dans la dernière case, reclassée à la cascade
+        position = min(tick, self._tick + (1 << (WHEEL_BITS * self.levels)) - 1)
+        slot = (position >> (WHEEL_BITS * level)) & _SLOT_MASK
+        self._slots[level][slot][key] = tick
+        self._occupied[level] |= 1 << slot
+        self._where[key] = (level, slot)
+
+    def _remove(self, key: Hashable) -> bool:
+        where = self._where.pop(key, None)
+        if where is None:
+            return False
+        level, slot = where
+        entries = self._slots[level][slot]
+        del entries[key]
+        if not entries:
+            self._occupied[level] &= ~(1 << slot)
+        return True
+
+    def _next_event_tick(self) -> Optional[int]:
+        """Prochain pas où une case occupée expire (niveau 0) ou cascade (niveaux supérieurs)"""
+        tick = self._tick
+        best = None
+        for level, mask in enumerate(self._occupied):
+            if not mask:
+                continue
+            shift = WHEEL_BITS * level
+            index = tick >> shift
+            current = index & _SLOT_MASK
+            # Distance à la première case occupée à partir de la case courante
+            rotated = ((mask >> current) | (mask << (WHEEL_SLOTS - current))) & _FULL_MASK
+            distance = (rotated & -rotated).bit_length() - 1
+            if level == 0:
+                candidate = tick + distance
+            else:
+                if distance == 0 and tick & ((1 << shift) - 1):
+                    # Case courante déjà cascadée: ses échéances sont pour le tour suivant
+                    rest = rotated & ~1
+                    distance = (rest & -rest).bit_length() - 1 if rest else WHEEL_SLOTS
+                candidate = (index + distance) << shift
+            if best is None or candidate < best:
+                best = candidate
+        return best
+
+    def _process(self, tick: int) -> List[Hashable]:
+        """Traite un pas: cascades (du niveau le plus haut), puis expirations du niveau 0"""
+        self._tick = tick
+        for level in range(self.levels - 1, 0, -1):
+            shift = WHEEL_BITS * level
+            if tick & ((1 << shift) - 1):
+                continue
+            slot = (tick >> shift) & _SLOT_MASK
+            if not self._occupied[level] >> slot & 1:
+                continue
+            entries = self._slots[level][slot]
+            self._slots[level][slot] = {}
+            self._occupied[level] &= ~(1 << slot)
+            self.cascades += 1
+            for key, deadline in entries.items():
+                self._insert(key, deadline)
+
+        slot = tick & _SLOT_MASK
+        entries = self._slots[0][slot]
+        if not entries:
+            return []
+        self._slots[0][slot] = {}
+        self._occupied[0] &= ~(1 << slot)
+        expired = []
+        for key, deadline in entries.items():
+            if deadline <= tick:
+                del self._where[key]
+                expired.append(key)
+            else:
+                self._insert(key, deadline)
+        return expired
+
+    def _arm(self, loop: asyncio.AbstractEventLoop):
+        tick = self._next_event_tick()
+        if tick is None:
+            return
+        if self._handle is not None:
+            if self._armed_tick <= tick:
+                # Le handle en place se déclenche au plus tôt: au pire en avance, il se reprogramme
+                return
+            self._handle.cancel()
+        self._armed_tick = tick
+        self._handle = loop.call_at(self._origin + tick * self.resolution, self._fire)
+
+    def _fire(self):
+        self._handle = self._armed_tick = None
+        self.wakeups += 1
+        loop = asyncio.get_running_loop()
+        now_tick = self._now_tick(loop)
+        expired = []
+        while True:
+            tick = self._next_event_tick()
+            if tick is None or tick > now_tick:
+                break
+            expired += self._process(tick)
+            self._tick = tick + 1
+        # Aucun événement jusqu'à maintenant: les pas intermédiaires sont sautés
+        self._tick = max(self._tick, now_tick + 1)
+        self._arm(loop)
+        if expired:
+            try:
+                self._on_expire(expired)
+            except Exception:
+                _LOGGER.exception("Erreur dans le traitement des échéances")
+
+
+def _endpoint(connection) -> str:
+    return f"{connection.host}:{connection.port}"
+
+
+class OutputTimers:
+    """Sorties temporisées de tous les boîtiers (ex: ON pendant 20 minutes, puis OFF)
+
+    Les échéances sont tenues côté Home Assistant dans une seule TimingWheel:
+    la durée n'est pas limitée par le PULSE du boîtier (60 s) et des centaines
+    de canaux ne coûtent qu'un timer sur la boucle. Identifiées par hôte et
+    canal, elles survivent aux reconnexions et au rechargement d'une entrée:
+    - à l'échéance, les états de fin partent en une seule trame par boîtier
+    - boîtier injoignable à l'échéance: l'état de fin est dû et envoyé à la reconnexion
+    - à chaque reconnexion, l'état des temporisations en cours est réappliqué
+      (boîtier redémarré entre-temps)
+    resolve(endpoint) retourne la connexion d'un hôte "host:port" (ou None).
+    """
+
+    def __init__(self, resolve: Callable[[str], Optional[object]]):
+        self._resolve = resolve
+        self.wheel = TimingWheel(self._on_expire)
+        self._timers: Dict[TimerKey, Tuple[str, str]] = {}  # -> (état, état de fin)
+        self._owed: Dict[TimerKey, str] = {}  # États de fin non envoyés (boîtier injoignable)
+        self._tasks: Set[asyncio.Task] = set()
+        self.expired = 0
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    @property
+    def owed(self) -> int:
+        return len(self._owed)
+
+    async def start(
+        self, connection, keys: List[ChannelKey], duration: float, state: str = "ON"
+    ) -> bool:
+        """Passe les canaux à state pendant duration secondes (une trame), puis à l'état inverse"""
+        state = state.upper()
+        if state not in ("ON", "OFF"):
+            raise ValueError(f"État de sortie invalide: {state}")
+        end_state = "OFF" if state == "ON" else "ON"
+        commands = [output_command(key, state) for key in keys]
+        endpoint = _endpoint(connection)
+        for key in keys:
+            timer_key = (endpoint, key)
+            self._owed.pop(timer_key, None)
+            self._timers[timer_key] = (state, end_state)
+            self.wheel.schedule(timer_key, duration)
+        _LOGGER.info(
+            f"⏱️ {endpoint}: {', '.join(map(channel_name, keys))} {state} "
+            f"pendant {duration:g}s"
+        )
+        return await connection.send_commands(commands)
+
+    def cancel(self, connection, key: ChannelKey) -> bool:
+        """Annule la temporisation d'un canal: la sortie reste dans son état actuel"""
+        timer_key = (_endpoint(connection), key)
+        self._owed.pop(timer_key, None)
+        if self._timers.pop(timer_key, None) is None:
+            return False
+        self.wheel.cancel(timer_key)
+        return True
+
+    def extend(self, connection, key: ChannelKey, seconds: float) -> Optional[float]:
+        """Prolonge la temporisation d'un canal et retourne le temps restant"""
+        return self.wheel.extend((_endpoint(connection), key), seconds)
+
+    def remaining(self, connection, key: ChannelKey) -> Optional[float]:
+        return self.wheel.remaining((_endpoint(connection), key))
+
+    def resume(self, connection):
+        """Reconnexion: envoie les états de fin dus et réapplique les temporisations en cours"""
+        endpoint = _endpoint(connection)
+        ends = [(k, s) for k, s in self._owed.items() if k[0] == endpoint]
+        for timer_key, _ in ends:
+            del self._owed[timer_key]
+        running = [(k, t[0]) for k, t in self._timers.items() if k[0] == endpoint]
+        if ends or running:
+            _LOGGER.info(
+                f"⏱️ {endpoint}: {len(ends)} fin(s) de temporisation due(s), "
+                f"{len(running)} temporisation(s) réappliquée(s)"
+            )
+            self._spawn(self._send(connection, ends, running))
+
+    def close(self):
+        """Arrête la roue et les envois en cours (les temporisations sont perdues)"""
+        self.wheel.close()
+        self._timers.clear()
+        self._owed.clear()
+        for task in self._tasks:
+            task.cancel()
+
+    def _on_expire(self, timer_keys: List[TimerKey]):
+        groups: Dict[str, List[Tuple[TimerKey, str]]] = {}
+        for timer_key in timer_keys:
+            timer = self._timers.pop(timer_key, None)
+            if timer is None:
+                continue
+            self.expired += 1
+            groups.setdefault(timer_key[0], []).append((timer_key, timer[1]))
+
+        for endpoint, ends in groups.items():
+            connection = self._resolve(endpoint)
+            if connection is None or not connection.connected:
+                _LOGGER.warning(
+                    f"⏱️ {endpoint} injoignable: fin de temporisation envoyée à la reconnexion"
+                )
+                self._owed.update(ends)
+                continue
+            self._spawn(self._send(connection, ends))
+
+    async def _send(
+        self,
+        connection,
+        ends: List[Tuple[TimerKey, str]],
+        running: List[Tuple[TimerKey, str]] = (),
+    ):
+        """Une trame par boîtier; les états de fin non envoyés restent dus"""
+        commands = [output_command(timer_key[1], state) for timer_key, state in ends]
+        commands += [output_command(timer_key[1], state) for timer_key, state in running]
+        if await connection.send_commands(commands):
+            return
+        for timer_key, state in ends:
+            # Sauf si le canal a été temporisé à nouveau entre-temps
+            if timer_key not in self._timers:
+                self._owed[timer_key] = state
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
@@ -0,0 +1,99 @@
+"""
+Surveillance de fraîcheur des canaux d'un boîtier RMG Rio 4
+Module sans dépendance Home Assistant, réutilisable par les outils et benchmarks
+"""
+import asyncio
+import logging
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from .protocol import ChannelKey
+
+_LOGGER = logging.getLogger(__name__)
+
+# Un canal sans nouvelle depuis cette durée est considéré périmé
+DEFAULT_STALE_AFTER = 300
+
+
+class StalenessWatchdog:
+    """Un seul timer (loop.call_at, horloge monotone) pour tous les canaux d'une connexion
+
+    - touch(key) à chaque état reçu: aucun calcul de date ni timer par message
+    - à stale_after / 2 sans nouvelle, on_probe(canaux) demande un rafraîchissement
+    - à stale_after sans nouvelle, le canal expire et on_change(canal, True) est appelé
+    - un état reçu sur un canal expiré appelle on_change(canal, False)
+    """
+
+    def __init__(
+        self,
+        on_change: Callable[[ChannelKey, bool], None],
+        on_probe: Callable[[List[ChannelKey]], None],
+        stale_after: float = DEFAULT_STALE_AFTER,
+    ):
+        self.stale_after = stale_after
+        self._on_change = on_change
+        self._on_probe = on_probe
+        self._seen_at: Dict[ChannelKey, float] = {}
+        self._probed: Set[ChannelKey] = set()
+        self.stale: Set[ChannelKey] = set()
+        self._handle: Optional[asyncio.TimerHandle] = None
+
+    def is_stale(self, key: ChannelKey) -> bool:
+        return key in self.stale
+
+    def touch(self, key: ChannelKey):
+        """Un état du canal vient d'être reçu"""
+        loop = asyncio.get_running_loop()
+        self._seen_at[key] = loop.time()
+        self._probed.discard(key)
+        if key in self.stale:
+            self.stale.discard(key)
+            self._on_change(key, False)
+        if self._handle is None:
+            # Les échéances ne font que reculer: le timer en place, s'il existe,
+            # se déclenche au pire en avance et se reprogramme
+            self._arm(loop, self._seen_at[key] + self.stale_after / 2)
+
+    def touch_all(self, keys: Iterable[ChannelKey]):
+        for key in keys:
+            self.touch(key)
+
+    def cancel(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _arm(self, loop: asyncio.AbstractEventLoop, when: float):
+        self._handle = loop.call_at(when, self._fire)
+
+    def _fire(self):
+        self._handle = None
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        probe_after = self.stale_after / 2
+        probes = []
+        next_deadline = None
+
+        for key, seen_at in self._seen_at.items():
+            if key in self.stale:
+                continue
+            stale_at = seen_at + self.stale_after
+            if now >= stale_at:
+                self.stale.add(key)
+                _LOGGER.debug(f"⌛ Canal {key[0]}{key[1]} sans nouvelle depuis {self.stale_after:.0f}s")
+                self._on_change(key, True)
+                continue
+            if key in self._probed:
+                deadline = stale_at
+            elif now >= seen_at + probe_after:
+                probes.append(key)
+                self._probed.add(key)
+                deadline = stale_at
+            else:
+                deadline = seen_at + probe_after
+            if next_deadline is None or deadline < next_deadline:
+                next_deadline = deadline
+
+        if probes:
+            self._on_probe(probes)
+        if next_deadline is not None:
+            self._arm(loop, next_deadline)
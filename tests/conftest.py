@@ -0,0 +1,13 @@
+"""
+Configuration pytest: dépôt et tools/ dans sys.path, boîtiers simulés en fixtures
+
+Prérequis: Home Assistant et pytest-asyncio installés (voir CONTRIBUTING.md).
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tools"))
+
+from rio4_simulator import rio4_box, rio4_box_factory  # noqa: E402,F401
@@ -0,0 +1,120 @@
+"""Tests des entrées à fréquence élevée (anti-rebond et comptage des fronts)"""
+import asyncio
+
+import pytest
+
+from custom_components.rmg_rio4 import STATE_LIVE, RelayBoxConnection
+from custom_components.rmg_rio4.binary_sensor import RMGInput
+from custom_components.rmg_rio4.fleet import CircuitBreaker
+from custom_components.rmg_rio4.inputs import DigitalInputTracker
+from custom_components.rmg_rio4.protocol import DIO
+from custom_components.rmg_rio4.sensor import RMGInputCounter, RMGInputFrequency
+
+
+def _bounce(tracker: DigitalInputTracker, start: float, final: str, count: int = 5):
+    """Rafale de rebonds (1 ms) terminée sur final, puis stabilisation"""
+    now = start
+    states = ["ON", "OFF"] * count + [final]
+    for state in states:
+        tracker.feed(state, now)
+        now += 0.001
+    tracker.settle(now + tracker.debounce)
+    return now + tracker.debounce
+
+
+def test_bouncing_contact_counts_one_edge_per_press():
+    tracker = DigitalInputTracker(debounce=0.02)
+    tracker.feed("OFF", 0.0)  # Snapshot
+    now = _bounce(tracker, 1.0, "ON")
+    assert tracker.state == "ON"
+    now = _bounce(tracker, now + 1, "OFF")
+    now = _bounce(tracker, now + 1, "ON")
+    assert tracker.state == "ON"
+    assert tracker.edges == 2
+
+
+def test_glitch_shorter_than_debounce_is_not_counted():
+    tracker = DigitalInputTracker(debounce=0.02)
+    tracker.feed("OFF", 0.0)
+    tracker.feed("ON", 1.0)
+    tracker.feed("OFF", 1.005)
+    assert not tracker.settle(1.1)
+    assert tracker.edges == 0
+
+
+def test_raw_count_counts_every_rising_edge():
+    tracker = DigitalInputTracker(debounce=0.02, count_raw=True)
+    tracker.feed("OFF", 0.0)
+    _bounce(tracker, 1.0, "ON")
+    assert tracker.edges == 6
+    assert tracker.state == "ON"
+
+
+def test_snapshot_state_is_not_an_edge():
+    tracker = DigitalInputTracker()
+    tracker.feed("ON", 0.0)
+    assert tracker.state == "ON"
+    assert not tracker.settle(1.0)
+    assert tracker.edges == 0
+
+
+@pytest.mark.asyncio
+async def test_connection_counts_debounced_edges_from_the_box(rio4_box):
+    connection = RelayBoxConnection(
+        rio4_box.host, rio4_box.port, rio4_box.username, rio4_box.password
+    )
+    connection.configure_inputs([1, 2], debounce=0.02, publish_interval=0.05, raw_count=[2])
+    assert await connection.connect()
+    try:
+        for number in (1, 2):
+            for state in ["ON", "OFF"] * 3 + ["ON"]:
+                rio4_box.set_input(number, state)
+        await asyncio.sleep(0.2)
+        assert connection.inputs[(DIO, 1)].edges == 1
+        assert connection.inputs[(DIO, 2)].edges == 4
+        assert connection.inputs[(DIO, 1)].state == "ON"
+    finally:
+        await connection.disconnect()
+
+
+def _record_writes(entity) -> list:
+    """Remplace l'écriture Home Assistant par le relevé de la disponibilité écrite"""
+    writes = []
+    entity.async_write_ha_state = lambda: writes.append(entity.available)
+    return writes
+
+
+@pytest.mark.asyncio
+async def test_input_entities_written_on_disconnect_and_reconnect(rio4_box):
+    connection = RelayBoxConnection(
+        rio4_box.host, rio4_box.port, rio4_box.username, rio4_box.password
+    )
+    connection.configure_inputs([1], debounce=0.02, publish_interval=0.05)
+    connection._first_reconnect_jitter = 0
+    connection._reconnect_interval = 0.02
+    connection._max_reconnect_interval = 0.05
+    connection.breaker = CircuitBreaker(reset_timeout=0.05)
+    assert await connection.connect()
+    entities = [
+        RMGInput(connection, "entry", 1),
+        RMGInputCounter(connection, "entry", 1),
+        RMGInputFrequency(connection, "entry", 1),
+    ]
+    assert all(not entity.should_poll for entity in entities)
+    writes = [_record_writes(entity) for entity in entities]
+    try:
+        # Coupure: chaque entité d'entrée est réécrite indisponible sans attendre une publication
+        outage = asyncio.create_task(rio4_box.restart(outage=0.3))
+        await asyncio.sleep(0.2)
+        assert all(entity_writes[-1:] == [False] for entity_writes in writes)
+
+        # Reconnexion: réécrite disponible une fois le snapshot reçu
+        await outage
+        for _ in range(400):
+            if connection.state == STATE_LIVE and all(w[-1] for w in writes):
+                break
+            await asyncio.sleep(0.01)
+        assert all(entity_writes[-1] is True for entity_writes in writes)
+    finally:
+        await connection.disconnect()
+    assert all(entity_writes[-1] is False for entity_writes in writes)
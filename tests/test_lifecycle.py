@@ -0,0 +1,145 @@
+"""Cycle de vie de la connexion: au plus une tâche de lecture et un heartbeat à tout instant"""
+import asyncio
+import time
+
+import pytest
+import pytest_asyncio
+
+from custom_components.rmg_rio4 import STATE_CLOSED, STATE_LIVE, RelayBoxConnection
+from custom_components.rmg_rio4.fleet import FleetManager
+
+LISTENER = "RelayBoxConnection._listen"
+HEARTBEAT = "RelayBoxConnection._heartbeat_loop"
+FLEET_HEALTH = "FleetManager._health_loop"
+
+
+def _task_counts() -> dict:
+    """Tâches de session vivantes dans la boucle courante, par coroutine"""
+    counts = {LISTENER: 0, HEARTBEAT: 0, FLEET_HEALTH: 0}
+    for task in asyncio.all_tasks():
+        name = task.get_coro().__qualname__
+        if name in counts and not task.done():
+            counts[name] += 1
+    return counts
+
+
+class TaskSampler:
+    """Relève le maximum de tâches de session à chaque itération de la boucle"""
+
+    def __init__(self):
+        self.peak = dict.fromkeys((LISTENER, HEARTBEAT, FLEET_HEALTH), 0)
+        self._task = None
+
+    def __enter__(self):
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+    async def _run(self):
+        while True:
+            for name, count in _task_counts().items():
+                self.peak[name] = max(self.peak[name], count)
+            await asyncio.sleep(0)
+
+
+@pytest_asyncio.fixture(params=[False, True], ids=["standalone", "fleet"])
+async def connection(request, rio4_box):
+    """Connexion au boîtier simulé, autonome ou rattachée à une flotte"""
+    connection = RelayBoxConnection(
+        rio4_box.host, rio4_box.port, rio4_box.username, rio4_box.password,
+        heartbeat_interval=0.05,
+    )
+    connection._first_reconnect_jitter = 0.05
+    fleet = None
+    if request.param:
+        fleet = FleetManager(health_interval=0.05)
+        fleet.add(connection)
+    assert await connection.connect()
+    yield connection
+    await connection.disconnect()
+    if fleet is not None:
+        await fleet.remove(connection)
+
+
+async def _wait_reconnected(connection: RelayBoxConnection, reconnects: int, timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while connection.metrics.reconnects == reconnects or connection.state != STATE_LIVE:
+        assert time.monotonic() < deadline, f"pas de reconnexion (état {connection.state})"
+        await asyncio.sleep(0.005)
+
+
+def _assert_single_session(connection: RelayBoxConnection, peak: dict):
+    assert peak[LISTENER] <= 1
+    if connection.fleet is None:
+        assert peak[HEARTBEAT] <= 1
+        assert peak[FLEET_HEALTH] == 0
+    else:
+        # La surveillance est assurée par la boucle partagée de la flotte
+        assert peak[HEARTBEAT] == 0
+        assert peak[FLEET_HEALTH] == 1
+
+
+@pytest.mark.asyncio
+async def test_peer_drop_reconnects_with_single_session(connection, rio4_box):
+    with TaskSampler() as sampler:
+        for _ in range(3):
+            reconnects = connection.metrics.reconnects
+            rio4_box.drop_clients()
+            await _wait_reconnected(connection, reconnects)
+            await asyncio.sleep(0.1)  # Quelques heartbeats par session
+    _assert_single_session(connection, sampler.peak)
+    assert _task_counts()[LISTENER] == 1
+
+
+@pytest.mark.asyncio
+async def test_duplicate_force_reconnect_starts_one_session(connection):
+    with TaskSampler() as sampler:
+        for _ in range(3):
+            reconnects = connection.metrics.reconnects
+            connection.force_reconnect()
+            connection.force_reconnect()
+            await _wait_reconnected(connection, reconnects)
+            await asyncio.sleep(0.1)
+    _assert_single_session(connection, sampler.peak)
+    assert connection.metrics.reconnects == 3
+
+
+@pytest.mark.asyncio
+async def test_disconnect_cancels_session_tasks(connection, rio4_box):
+    with TaskSampler() as sampler:
+        commands = [
+            asyncio.create_task(connection.send_command_ack(f"RELAY{n} ON")) for n in range(1, 5)
+        ]
+        rio4_box.drop_clients()
+        await asyncio.sleep(0)
+        await connection.disconnect()
+        await asyncio.gather(*commands)
+    _assert_single_session(connection, sampler.peak)
+    counts = _task_counts()
+    assert counts[LISTENER] == 0
+    assert counts[HEARTBEAT] == 0
+    assert connection.state == STATE_CLOSED
+    assert not connection.connected
+
+
+class _Entity:
+    def __init__(self):
+        self.writes = 0
+
+    def async_write_ha_state(self):
+        self.writes += 1
+
+
+@pytest.mark.asyncio
+async def test_disconnect_flushes_then_cancels_state_writes(connection):
+    entity = _Entity()
+    connection.register_entity(entity)
+    connection.state_writes.hold()
+    connection.state_writes.schedule(entity)
+    await connection.disconnect()
+    # Écriture finale unique (indisponible), puis plus aucune écriture après la fenêtre
+    assert entity.writes == 1
+    await asyncio.sleep(connection.state_writes.window * 3)
+    assert entity.writes == 1
@@ -0,0 +1,45 @@
+"""Tests du protocole: découpage des trames (LineFramer) et commandes de sortie"""
+import pytest
+
+from custom_components.rmg_rio4.protocol import (
+    MAX_PULSE_DURATION,
+    RELAY,
+    LineFramer,
+    output_command,
+)
+
+
+def test_lines_split_across_reads():
+    framer = LineFramer()
+    assert framer.feed(b"RELAY1=O") == []
+    assert framer.feed(b"N\r\nDIO2=OFF\r") == ["RELAY1=ON", "DIO2=OFF"]
+    assert framer.pending == 0
+
+
+def test_overflow_in_tail_keeps_complete_line_of_same_read():
+    """Une ligne trop longue commencée en fin de lecture n'efface pas la ligne
+    complète qui la précède, et sa fin n'est pas retournée comme une trame"""
+    framer = LineFramer(max_line_length=1024)
+    assert framer.feed(b"RELAY1=ON\r" + b"X" * 2000) == ["RELAY1=ON"]
+    assert framer.feed(b"XXX\rRELAY2=ON\r") == ["RELAY2=ON"]
+    assert framer.overflows == 1
+
+
+def test_overflow_spanning_several_reads():
+    framer = LineFramer(max_line_length=16)
+    assert framer.feed(b"Y" * 10) == []
+    assert framer.feed(b"Y" * 10) == []
+    assert framer.feed(b"Y" * 10 + b"\rDIO1=ON\r") == ["DIO1=ON"]
+    assert framer.overflows == 1
+
+
+def test_output_command_pulse_within_device_limit():
+    assert output_command((RELAY, 1), "pulse") == "RELAY1 PULSE 0.5"
+    assert output_command((RELAY, 1), "PULSE 1.5") == "RELAY1 PULSE 1.5"
+    assert output_command((RELAY, 2), f"PULSE {MAX_PULSE_DURATION}") == "RELAY2 PULSE 60"
+
+
+@pytest.mark.parametrize("state", ["PULSE 900", "PULSE 60.5", "PULSE 0", "PULSE 0.05", "PULSE -1"])
+def test_output_command_rejects_pulse_out_of_device_limit(state):
+    with pytest.raises(ValueError, match="hors limites"):
+        output_command((RELAY, 1), state)
@@ -0,0 +1,235 @@
+"""Tests des sorties temporisées: roue temporelle hiérarchique et états de fin"""
+import asyncio
+
+import pytest
+
+from custom_components.rmg_rio4.protocol import RELAY
+from custom_components.rmg_rio4.timers import WHEEL_SLOTS, OutputTimers, TimingWheel
+
+# Pas très fin pour atteindre les niveaux supérieurs en quelques centaines de ms:
+# niveau 1 au-delà de 64 pas (6,4 ms), niveau 2 au-delà de 64^2 pas (~0,41 s)
+RESOLUTION = 0.0001
+
+
+class FakeConnection:
+    """Connexion minimale: relève les trames envoyées par OutputTimers"""
+
+    def __init__(self, host: str = "10.0.0.1", port: int = 23):
+        self.host = host
+        self.port = port
+        self.connected = True
+        self.accept = True
+        self.sent = []
+
+    async def send_commands(self, commands) -> bool:
+        if not self.connected or not self.accept:
+            return False
+        self.sent.append(list(commands))
+        return True
+
+
+class Recorder:
+    """on_expire de la roue: instant de chaque expiration, par clé"""
+
+    def __init__(self):
+        self.fired = {}
+
+    def __call__(self, keys):
+        now = asyncio.get_running_loop().time()
+        for key in keys:
+            assert key not in self.fired, f"{key} expirée deux fois"
+            self.fired[key] = now
+
+
+async def _settle():
+    """Laisse s'exécuter les envois lancés en tâche de fond"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_wheel_schedule_and_cancel():
+    recorder = Recorder()
+    wheel = TimingWheel(recorder, resolution=0.01)
+    wheel.schedule("a", 0.05)
+    wheel.schedule("b", 0.1)
+    assert len(wheel) == 2 and "b" in wheel
+    assert wheel.cancel("b")
+    assert not wheel.cancel("b")
+    assert "b" not in wheel and wheel.remaining("b") is None
+
+    await asyncio.sleep(0.2)
+    assert list(recorder.fired) == ["a"]
+    assert len(wheel) == 0
+    assert not wheel.cancel("a")
+
+    # Reprogrammer une clé remplace son échéance
+    wheel.schedule("c", 0.05)
+    wheel.schedule("c", 0.15)
+    await asyncio.sleep(0.1)
+    assert "c" not in recorder.fired
+    await asyncio.sleep(0.1)
+    assert "c" in recorder.fired
+    wheel.close()
+
+
+@pytest.mark.asyncio
+async def test_wheel_extend_pushes_deadline_back():
+    recorder = Recorder()
+    wheel = TimingWheel(recorder, resolution=0.01)
+    start = asyncio.get_running_loop().time()
+    wheel.schedule("a", 0.1)
+    remaining = wheel.extend("a", 0.2)
+    assert remaining == pytest.approx(0.3, abs=0.02)
+    assert wheel.extend("missing", 1) is None
+
+    await asyncio.sleep(0.2)
+    assert "a" not in recorder.fired
+    await asyncio.sleep(0.2)
+    assert recorder.fired["a"] - start >= 0.3 - 1e-6
+    wheel.close()
+
+
+@pytest.mark.asyncio
+async def test_wheel_cascades_without_firing_early():
+    recorder = Recorder()
+    wheel = TimingWheel(recorder, resolution=RESOLUTION)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    # Niveau 0, niveau 1 (> 64 pas) et niveau 2 (> 64^2 pas), dans le désordre
+    delays = {
+        "level0": RESOLUTION * (WHEEL_SLOTS // 2),
+        "level1": RESOLUTION * WHEEL_SLOTS * 3.5,
+        "level1_edge": RESOLUTION * WHEEL_SLOTS,
+        "level2": RESOLUTION * WHEEL_SLOTS ** 2 * 1.2,
+        "level2_late": 0.6,
+    }
+    deadlines = {}
+    for key, delay in delays.items():
+        wheel.schedule(key, delay)
+        deadlines[key] = loop.time() + delay
+
+    # Au milieu d'une case du niveau 1: les échéances d'un tour complet plus loin retombent
+    # dans la case courante et ne doivent masquer ni avancer les autres
+    await asyncio.sleep(RESOLUTION * WHEEL_SLOTS / 2)
+    for offset in range(WHEEL_SLOTS):
+        key, delay = f"wrap{offset}", RESOLUTION * (WHEEL_SLOTS ** 2 - WHEEL_SLOTS + offset)
+        delays[key] = delay
+        wheel.schedule(key, delay)
+        deadlines[key] = loop.time() + delay
+
+    await asyncio.sleep(0.75)
+    assert set(recorder.fired) == set(delays)
+    for key, fired in recorder.fired.items():
+        assert fired >= deadlines[key] - 1e-6, f"{key} expirée en avance"
+    assert recorder.fired["level2_late"] - start < 0.7
+    # Les échéances lointaines sont redescendues d'un niveau à l'approche
+    assert wheel.cascades >= 2
+    assert len(wheel) == 0
+    wheel.close()
+
+
+@pytest.fixture
+def box():
+    return FakeConnection()
+
+
+@pytest.fixture
+def timers(box):
+    timers = OutputTimers(lambda endpoint: box if endpoint == "10.0.0.1:23" else None)
+    yield timers
+    timers.close()
+
+
+@pytest.mark.asyncio
+async def test_start_sends_state_then_end_state(timers, box):
+    assert await timers.start(box, [(RELAY, 1), (RELAY, 2)], 0.05)
+    assert box.sent == [["RELAY1 ON", "RELAY2 ON"]]
+    assert len(timers) == 2
+
+    await asyncio.sleep(0.2)
+    await _settle()
+    # Les deux fins partent dans une seule trame
+    assert box.sent[-1] == ["RELAY1 OFF", "RELAY2 OFF"]
+    assert len(timers) == 0 and timers.expired == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_timer_leaves_output_alone(timers, box):
+    await timers.start(box, [(RELAY, 1)], 0.05)
+    assert timers.cancel(box, (RELAY, 1))
+    assert not timers.cancel(box, (RELAY, 1))
+    await asyncio.sleep(0.15)
+    await _settle()
+    assert box.sent == [["RELAY1 ON"]]
+    assert timers.expired == 0
+
+
+@pytest.mark.asyncio
+async def test_extend_delays_end_state(timers, box):
+    await timers.start(box, [(RELAY, 3)], 0.1, state="OFF")
+    # Échéance arrondie au pas suivant de la roue: jamais en avance, au plus un pas en retard
+    remaining = timers.extend(box, (RELAY, 3), 0.2)
+    assert 0.3 - 0.01 <= remaining <= 0.3 + timers.wheel.resolution
+    await asyncio.sleep(0.25)
+    await _settle()
+    assert box.sent == [["RELAY3 OFF"]]
+    await asyncio.sleep(0.3)
+    await _settle()
+    assert box.sent[-1] == ["RELAY3 ON"]
+
+
+@pytest.mark.asyncio
+async def test_end_state_owed_while_offline_is_sent_on_resume(timers, box):
+    await timers.start(box, [(RELAY, 1)], 0.05)
+    box.connected = False
+    await asyncio.sleep(0.15)
+    await _settle()
+    assert timers.expired == 1
+    assert timers.owed == 1
+    assert box.sent == [["RELAY1 ON"]]
+
+    box.connected = True
+    timers.resume(box)
+    await _settle()
+    assert box.sent[-1] == ["RELAY1 OFF"]
+    assert timers.owed == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_end_state_stays_owed(timers, box):
+    await timers.start(box, [(RELAY, 2)], 0.05)
+    box.accept = False  # Connexion perdue pendant l'envoi
+    await asyncio.sleep(0.15)
+    await _settle()
+    assert timers.owed == 1
+
+    box.accept = True
+    timers.resume(box)
+    await _settle()
+    assert box.sent[-1] == ["RELAY2 OFF"]
+    assert timers.owed == 0
+
+
+@pytest.mark.asyncio
+async def test_resume_reapplies_running_timers(timers, box):
+    await timers.start(box, [(RELAY, 1)], 10)
+    await timers.start(box, [(RELAY, 4)], 10, state="OFF")
+    other = FakeConnection(host="10.0.0.2")
+    await timers.start(other, [(RELAY, 1)], 10)
+
+    # Boîtier redémarré: les sorties temporisées de ce boîtier seulement sont réappliquées
+    timers.resume(box)
+    await _settle()
+    assert box.sent[-1] == ["RELAY1 ON", "RELAY4 OFF"]
+    assert other.sent == [["RELAY1 ON"]]
+    assert len(timers) == 3
+    assert timers.remaining(box, (RELAY, 1)) == pytest.approx(10, abs=0.1)
+
+    # Rien en cours ni dû: pas de trame
+    timers.cancel(box, (RELAY, 1))
+    timers.cancel(box, (RELAY, 4))
+    sent = len(box.sent)
+    timers.resume(box)
+    await _settle()
+    assert len(box.sent) == sent
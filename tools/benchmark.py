@@ -0,0 +1,645 @@
+"""
+Micro-benchmarks de l'intégration RMG Rio 4
+
+Usage (depuis la racine du dépôt, dans un environnement Home Assistant) :
+    python tools/benchmark.py                          # tous les benchmarks
+    python tools/benchmark.py dispatch                 # un benchmark précis
+    python tools/benchmark.py --json results.json      # résultats JSON (suivi des régressions)
+
+Les benchmarks réseau utilisent les boîtiers simulés de tools/rio4_simulator.py.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from custom_components.rmg_rio4 import RelayBoxConnection  # noqa: E402
+from custom_components.rmg_rio4.fleet import FleetManager  # noqa: E402
+from custom_components.rmg_rio4.timers import TimingWheel  # noqa: E402
+from custom_components.rmg_rio4.protocol import (  # noqa: E402
+    CHANNEL_KEYS,
+    LineFramer,
+    encode_command,
+)
+from rio4_simulator import running_boxes, start_boxes  # noqa: E402
+
+
+class _FakeEntity:
+    """Entité minimale reproduisant le coût des callbacks des switchs"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = None
+
+    async def legacy_callback(self, device: str, state: str):
+        # Ancien comportement: chaque entité reçoit toutes les trames et filtre
+        if device == self.name:
+            self.state = state
+
+    async def callback(self, device: str, state: str):
+        self.state = state
+
+
+def _percentiles(values, scale: float = 1000.0) -> dict:
+    """p50/p95/p99/max d'une série de durées (secondes), en millisecondes par défaut"""
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    ordered = sorted(values)
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * scale, 3)
+
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": pick(1.0)}
+
+
+def _flatten(prefix: str, stats: dict) -> dict:
+    return {f"{prefix}_{key}": value for key, value in stats.items()}
+
+
+def _state_messages(count: int):
+    """Génère un flux de trames RELAYn=/DIOn= réparties sur les 8 canaux"""
+    names = list(CHANNEL_KEYS)
+    return [
+        f"{names[i % len(names)]}={'ON' if i % 2 else 'OFF'}"
+        for i in range(count)
+    ]
+
+
+async def _process_all(connection: RelayBoxConnection, messages) -> float:
+    start = time.perf_counter()
+    for message in messages:
+        await connection._process_message(message)
+    return time.perf_counter() - start
+
+
+async def bench_dispatch(messages: int = 200_000) -> dict:
+    """Débit de _process_message: diffusion à tous les callbacks vs table de dispatch"""
+    frames = _state_messages(messages)
+
+    legacy = RelayBoxConnection("127.0.0.1", 22023, "admin", "bench")
+    indexed = RelayBoxConnection("127.0.0.1", 22023, "admin", "bench")
+    for name, (kind, number) in CHANNEL_KEYS.items():
+        legacy.register_callback(_FakeEntity(name).legacy_callback)
+        indexed.register_channel_callback(kind, number, _FakeEntity(name).callback)
+
+    before = await _process_all(legacy, frames)
+    after = await _process_all(indexed, frames)
+    return {
+        "messages": messages,
+        "before_msgs_per_s": round(messages / before),
+        "after_msgs_per_s": round(messages / after),
+        "speedup": round(before / after, 2),
+    }
+
+
+def _legacy_split(chunks) -> int:
+    """Ancien découpage de _listen: str += decode() puis split() répétés"""
+    buffer = ""
+    count = 0
+    for data in chunks:
+        buffer += data.decode("utf-8")
+        while "\r" in buffer or "\n" in buffer:
+            if "\r" in buffer:
+                line, buffer = buffer.split("\r", 1)
+            else:
+                line, buffer = buffer.split("\n", 1)
+            if line.strip():
+                count += 1
+    return count
+
+
+def _framer_split(chunks) -> int:
+    framer = LineFramer()
+    count = 0
+    for data in chunks:
+        count += len(framer.feed(data))
+    return count
+
+
+def _chunked(payload: bytes, size: int):
+    return [payload[i:i + size] for i in range(0, len(payload), size)]
+
+
+async def bench_framing(megabytes: int = 4) -> dict:
+    """Découpage de rafales de plusieurs Mo: ancien split() vs LineFramer"""
+    # Trames mélangeant \r et \r\n, comme un boîtier qui pousse ses changements
+    frames = [f"{m}\r".encode() if i % 3 else f"{m}\r\n".encode()
+              for i, m in enumerate(_state_messages(1000))]
+    block = b"".join(frames)
+    payload = block * (megabytes * 1024 * 1024 // len(block))
+
+    results = {"bytes": len(payload)}
+    # L'ancien code lisait par blocs de 1 Ko: au-delà, son coût devient quadratique
+    start = time.perf_counter()
+    lines = _legacy_split(_chunked(payload, 1024))
+    results["legacy_1k_mb_per_s"] = round(len(payload) / (time.perf_counter() - start) / 1e6, 1)
+
+    for size in (1024, 65536):
+        chunks = _chunked(payload, size)
+        start = time.perf_counter()
+        assert _framer_split(chunks) == lines
+        elapsed = time.perf_counter() - start
+        results[f"framer_{size // 1024}k_mb_per_s"] = round(len(payload) / elapsed / 1e6, 1)
+
+    results["lines"] = lines
+    return results
+
+
+async def _connect_fleet(boxes, fleet: FleetManager) -> float:
+    """Connecte une connexion par boîtier via la flotte et retourne la durée totale"""
+    connections = [
+        RelayBoxConnection(box.host, box.port, box.username, box.password) for box in boxes
+    ]
+    for connection in connections:
+        fleet.add(connection)
+
+    async def connect_and_sync(connection):
+        assert await connection.connect()
+        await connection.sync_states()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(connect_and_sync(c) for c in connections))
+    elapsed = time.perf_counter() - start
+
+    for connection in connections:
+        await connection.disconnect()
+        await fleet.remove(connection)
+    return elapsed
+
+
+async def bench_fleet(box_count: int = 200) -> dict:
+    """Test de charge: connexion de nombreux boîtiers simulés locaux"""
+    boxes = await start_boxes(box_count)
+    try:
+        # Référence: tous les handshakes en même temps (comportement sans flotte)
+        unbounded_fleet = FleetManager(box_count, connect_stagger=0)
+        unbounded = await _connect_fleet(boxes, unbounded_fleet)
+        managed_fleet = FleetManager()
+        managed = await _connect_fleet(boxes, managed_fleet)
+    finally:
+        for box in boxes:
+            await box.stop()
+
+    return {
+        "boxes": box_count,
+        "unbounded_connect_s": round(unbounded, 3),
+        "unbounded_peak_handshakes": unbounded_fleet.peak_connecting,
+        "managed_connect_s": round(managed, 3),
+        "managed_peak_handshakes": managed_fleet.peak_connecting,
+        "managed_fleet_connect_time_s": round(managed_fleet.last_fleet_connect_time, 3),
+    }
+
+
+async def bench_storm(box_count: int = 50, outage: float = 1.0) -> dict:
+    """Temps de rétablissement après coupure simultanée de tous les boîtiers"""
+    boxes = await start_boxes(box_count)
+    fleet = FleetManager()
+    connections = []
+    for box in boxes:
+        connection = RelayBoxConnection(box.host, box.port, box.username, box.password)
+        # Intervalles réduits pour garder un benchmark court
+        connection._reconnect_interval = 0.5
+        connection._max_reconnect_interval = 4
+        fleet.add(connection)
+        connections.append(connection)
+    try:
+        await asyncio.gather(*(c.connect() for c in connections))
+        fleet.peak_connecting = 0
+
+        # Tous les boîtiers redémarrent au même instant (ex: redémarrage d'un switch)
+        start = time.perf_counter()
+        await asyncio.gather(*(box.restart(outage) for box in boxes))
+        recovered = {}
+        while len(recovered) < box_count and time.perf_counter() - start < 120:
+            await asyncio.sleep(0.01)
+            for connection in connections:
+                if connection.connected and connection not in recovered:
+                    recovered[connection] = time.perf_counter() - start
+        times = sorted(recovered.values())
+    finally:
+        for connection in connections:
+            await connection.disconnect()
+            await fleet.remove(connection)
+        for box in boxes:
+            await box.stop()
+
+    return {
+        "boxes": box_count,
+        "outage_s": outage,
+        "recovered": len(times),
+        "recover_p50_s": round(times[len(times) // 2], 3) if times else None,
+        "recover_max_s": round(times[-1], 3) if times else None,
+        "peak_handshakes": fleet.peak_connecting,
+    }
+
+
+async def bench_handshake(iterations: int = 50, latency: float = 0.0) -> dict:
+    """Connexion TCP -> authentification -> snapshot complet (toutes entités disponibles)"""
+    connect_times, snapshot_times = [], []
+    async with running_boxes(1, latency=latency) as boxes:
+        box = boxes[0]
+        for _ in range(iterations):
+            connection = RelayBoxConnection(box.host, box.port, box.username, box.password)
+            start = time.perf_counter()
+            assert await connection.connect()
+            connect_times.append(time.perf_counter() - start)
+            assert await connection.sync_states()
+            snapshot_times.append(time.perf_counter() - start)
+            await connection.disconnect()
+    return {
+        "iterations": iterations,
+        "latency_s": latency,
+        **_flatten("connect_ms", _percentiles(connect_times)),
+        **_flatten("snapshot_ms", _percentiles(snapshot_times)),
+    }
+
+
+async def bench_ack(commands: int = 2000, concurrency: int = 8) -> dict:
+    """Latence d'acquittement (commande -> écho) et débit soutenu d'une connexion"""
+    async with running_boxes(1) as boxes:
+        box = boxes[0]
+        connection = RelayBoxConnection(box.host, box.port, box.username, box.password)
+        assert await connection.connect()
+        channels = list(CHANNEL_KEYS)[:concurrency]
+
+        # Latence: une commande à la fois
+        latencies = []
+        for i in range(commands // 4):
+            start = time.perf_counter()
+            assert await connection.send_command_ack(f"RELAY1 {'ON' if i % 2 else 'OFF'}")
+            latencies.append(time.perf_counter() - start)
+
+        # Débit: une commande en vol par canal, sans fusion possible entre elles
+        async def drive(name: str, count: int):
+            for i in range(count):
+                assert await connection.send_command_ack(f"{name} {'ON' if i % 2 else 'OFF'}")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(drive(name, commands // len(channels)) for name in channels))
+        elapsed = time.perf_counter() - start
+        await connection.disconnect()
+
+    return {
+        "commands": commands,
+        "concurrency": len(channels),
+        **_flatten("ack_ms", _percentiles(latencies)),
+        "acked_cmds_per_s": round((commands // len(channels)) * len(channels) / elapsed),
+    }
+
+
+class _EchoWriter:
+    """Writer sans socket: l'écho du boîtier est traité pendant drain()
+
+    Isole le coût CPU du client (file, encodage, écriture, parsing de l'écho,
+    acquittement) du réseau et du boîtier simulé.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.transport = self
+        self._pending = []
+        self._echo = {
+            f"{name} {state}".encode(): f"{name}={state}"
+            for name in CHANNEL_KEYS for state in ("ON", "OFF")
+        }
+
+    def write(self, data: bytes):
+        for frame in data.split(b"\r")[:-1]:
+            self._pending.append(self._echo[frame])
+
+    async def drain(self):
+        pending, self._pending = self._pending, []
+        for reply in pending:
+            await self.connection._process_message(reply)
+
+    def is_closing(self) -> bool:
+        return False
+
+    def abort(self):
+        pass
+
+    def close(self):
+        pass
+
+    async def wait_closed(self):
+        pass
+
+
+async def bench_command_cpu(commands: int = 20000, iterations: int = 200000) -> dict:
+    """Coût CPU par commande: chemin complet acquitté, puis encodage + journalisation seuls
+
+    Journalisation au niveau par défaut de Home Assistant (debug désactivé).
+    """
+    logger = logging.getLogger("custom_components.rmg_rio4")
+    connection = RelayBoxConnection("bench", 0, "admin", "serial")
+    connection.writer = _EchoWriter(connection)
+    connection.connected = True
+    names = [f"{name} {state}" for name in CHANNEL_KEYS for state in ("ON", "OFF")]
+
+    start = time.process_time()
+    for i in range(commands):
+        assert await connection.send_command_ack(names[i % len(names)])
+    full_path = time.process_time() - start
+    await connection.disconnect()
+
+    # Avant: f-string + encode par trame, journal formaté même debug désactivé
+    start = time.process_time()
+    for i in range(iterations):
+        batch = [names[i % len(names)]]
+        payload = "".join(f"{command}\r" for command in batch).encode("utf-8")
+        logger.debug(f"📤 Commande envoyée: {' | '.join(batch)}")
+        logger.debug(f"Message reçu: {payload}")
+    legacy = time.process_time() - start
+
+    # Après: trames précalculées, journalisation paresseuse et gardée
+    start = time.process_time()
+    for i in range(iterations):
+        batch = [names[i % len(names)]]
+        payload = b"".join(map(encode_command, batch))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📤 Commande envoyée: %s", " | ".join(batch))
+        logger.debug("Message reçu: %s", payload)
+    current = time.process_time() - start
+
+    return {
+        "commands": commands,
+        "acked_command_cpu_us": round(full_path / commands * 1e6, 2),
+        "before_encode_log_us": round(legacy / iterations * 1e6, 3),
+        "after_encode_log_us": round(current / iterations * 1e6, 3),
+        "speedup": round(legacy / current, 2),
+    }
+
+
+async def bench_recovery(iterations: int = 10) -> dict:
+    """Rétablissement après coupure forcée: coupure -> reconnecté -> snapshot complet
+
+    Paramètres de reconnexion par défaut de RelayBoxConnection (jitter initial compris).
+    """
+    reconnect_times, snapshot_times = [], []
+    async with running_boxes(1) as boxes:
+        box = boxes[0]
+        connection = RelayBoxConnection(box.host, box.port, box.username, box.password)
+        assert await connection.connect()
+        for _ in range(iterations):
+            start = time.perf_counter()
+            box.drop_clients()
+            # Attendre la détection de la coupure, puis le retour de la connexion
+            while connection.connected and time.perf_counter() - start < 10:
+                await asyncio.sleep(0.001)
+            while not connection.connected and time.perf_counter() - start < 30:
+                await asyncio.sleep(0.001)
+            reconnect_times.append(time.perf_counter() - start)
+            await connection._snapshot_event.wait()
+            snapshot_times.append(time.perf_counter() - start)
+        await connection.disconnect()
+    return {
+        "iterations": iterations,
+        **_flatten("reconnect_ms", _percentiles(reconnect_times)),
+        **_flatten("snapshot_ms", _percentiles(snapshot_times)),
+    }
+
+
+def _count_session_tasks() -> tuple:
+    """Tâches de lecture et de heartbeat vivantes dans la boucle courante"""
+    names = [task.get_coro().__qualname__ for task in asyncio.all_tasks() if not task.done()]
+    return (
+        names.count("RelayBoxConnection._listen"),
+        names.count("RelayBoxConnection._heartbeat_loop"),
+    )
+
+
+async def bench_lifecycle(cycles: int = 20) -> dict:
+    """Coupures et reconnexions forcées en rafale, commandes en vol
+
+    Vérifie qu'il n'existe jamais plus d'une tâche de lecture et d'un heartbeat
+    par connexion (échantillonnage à chaque itération de la boucle).
+    """
+    max_listeners = max_heartbeats = 0
+    sampling = True
+
+    async def sample():
+        nonlocal max_listeners, max_heartbeats
+        while sampling:
+            listeners, heartbeats = _count_session_tasks()
+            max_listeners = max(max_listeners, listeners)
+            max_heartbeats = max(max_heartbeats, heartbeats)
+            await asyncio.sleep(0)
+
+    reconnect_times = []
+    async with running_boxes(1) as boxes:
+        box = boxes[0]
+        connection = RelayBoxConnection(
+            box.host, box.port, box.username, box.password, heartbeat_interval=0.05
+        )
+        connection._first_reconnect_jitter = 0.05
+        sampler = asyncio.create_task(sample())
+        assert await connection.connect()
+        for i in range(cycles):
+            start = time.perf_counter()
+            reconnects = connection.metrics.reconnects
+            commands = [
+                asyncio.create_task(connection.send_command_ack(f"RELAY{n} {'ON' if i % 2 else 'OFF'}"))
+                for n in range(1, 5)
+            ]
+            if i % 2:
+                connection.force_reconnect()
+                connection.force_reconnect()  # Doublon: ne doit rien dupliquer
+            else:
+                box.drop_clients()
+            while (
+                connection.metrics.reconnects == reconnects or connection.state != "live"
+            ) and time.perf_counter() - start < 30:
+                await asyncio.sleep(0.001)
+            reconnect_times.append(time.perf_counter() - start)
+            # Les commandes écrites juste avant une coupure perdent leur écho (timeout)
+            await asyncio.gather(*commands)
+            await asyncio.sleep(0.1)  # Quelques heartbeats par session
+        await connection.disconnect()
+        after_close = _count_session_tasks()
+        sampling = False
+        await sampler
+
+    assert max_listeners <= 1, f"{max_listeners} tâches de lecture simultanées"
+    assert max_heartbeats <= 1, f"{max_heartbeats} heartbeats simultanés"
+    assert after_close == (0, 0), f"tâches restantes après fermeture: {after_close}"
+    return {
+        "cycles": cycles,
+        "max_listeners": max_listeners,
+        "max_heartbeats": max_heartbeats,
+        "reconnects": connection.metrics.reconnects,
+        **_flatten("reconnect_ms", _percentiles(reconnect_times)),
+    }
+
+
+async def bench_timers(timers: int = 20000, span: float = 3.0, box_count: int = 10) -> dict:
+    """Roue temporelle (coût, précision, réveils), puis sorties temporisées de bout en bout
+
+    Les échéances sont comprimées (pas de 0,5 ms) pour parcourir tous les niveaux
+    de la roue en quelques secondes. De bout en bout: un boîtier redémarre pendant
+    la temporisation (état réappliqué), un autre est injoignable à l'échéance
+    (état de fin envoyé à la reconnexion).
+    """
+    loop = asyncio.get_running_loop()
+    fired = {}
+    wheel = TimingWheel(lambda keys: fired.update(dict.fromkeys(keys, loop.time())), resolution=0.0005)
+    # Premières échéances après la programmation de toutes les autres (boucle occupée)
+    delays = [random.uniform(0.5, span) for _ in range(timers)]
+
+    start = time.perf_counter()
+    deadlines = {}
+    for key, delay in enumerate(delays):
+        deadlines[key] = loop.time() + delay
+        wheel.schedule(key, delay)
+    schedule_s = time.perf_counter() - start
+
+    # Référence: un handle de boucle par échéance
+    start = time.perf_counter()
+    handles = [loop.call_later(delay, int) for delay in delays]
+    call_later_s = time.perf_counter() - start
+    for handle in handles:
+        handle.cancel()
+
+    cancelled = set(range(0, timers, 10))
+    for key in cancelled:
+        wheel.cancel(key)
+    for key in range(5, timers, 10):
+        wheel.extend(key, 0.5)
+        deadlines[key] += 0.5
+    while len(wheel):
+        await asyncio.sleep(0.05)
+
+    assert not cancelled & fired.keys(), "échéance annulée déclenchée"
+    assert len(fired) == timers - len(cancelled), f"{timers - len(cancelled) - len(fired)} échéances perdues"
+    lateness = [fired[key] - deadlines[key] for key in fired]
+    early = [late for late in lateness if late < -0.001]
+    assert not early, f"{len(early)} échéances en avance (jusqu'à {min(early) * 1000:.1f} ms)"
+
+    # De bout en bout: ON pendant 1 s sur tous les canaux de chaque boîtier
+    fleet = FleetManager()
+    async with running_boxes(box_count) as boxes:
+        connections = []
+        for box in boxes:
+            connection = RelayBoxConnection(box.host, box.port, box.username, box.password)
+            connection._first_reconnect_jitter = 0.05
+            connection._reconnect_interval = 0.1
+            connection._max_reconnect_interval = 0.2
+            fleet.add(connection)
+            connection.breaker.failure_threshold = 1000  # Coupure courte: pas de disjoncteur
+            connections.append(connection)
+        assert all(await asyncio.gather(*(c.connect() for c in connections)))
+        await asyncio.gather(*(c.sync_states() for c in connections))
+
+        rebooted, unreachable = boxes[0], boxes[1]
+        start = loop.time()
+        await asyncio.gather(*(fleet.timers.start(c, list(CHANNEL_KEYS.values()), 1.0) for c in connections))
+
+        async def reboot():
+            await asyncio.sleep(0.2)
+            await rebooted.stop()
+            rebooted.states = dict.fromkeys(rebooted.states, "OFF")  # Sorties perdues au redémarrage
+            await asyncio.sleep(0.3)
+            await rebooted.start()
+
+        async def outage():
+            await asyncio.sleep(0.5)
+            await unreachable.restart(outage=1.0)
+
+        outage_task = asyncio.create_task(outage())
+        await reboot()
+        while loop.time() - start < 0.95 and any(s != "ON" for s in rebooted.states.values()):
+            await asyncio.sleep(0.01)
+        rearmed = all(s == "ON" for s in rebooted.states.values())
+
+        healthy_off_s = None
+        while any(s != "OFF" for box in boxes for s in box.states.values()):
+            assert loop.time() - start < 30, "états de fin non appliqués"
+            if healthy_off_s is None and all(
+                s == "OFF" for box in boxes[2:] for s in box.states.values()
+            ):
+                healthy_off_s = loop.time() - start
+            await asyncio.sleep(0.005)
+        all_off_s = loop.time() - start
+        await outage_task
+        stats = fleet.stats()
+        for connection in connections:
+            await connection.disconnect()
+            await fleet.remove(connection)
+
+    assert rearmed, "temporisation non réappliquée après redémarrage du boîtier"
+    return {
+        "timers": timers,
+        "schedule_us": round(schedule_s / timers * 1e6, 2),
+        "call_later_us": round(call_later_s / timers * 1e6, 2),
+        "loop_handles": 1,
+        "call_later_handles": timers,
+        "wakeups": wheel.wakeups,
+        "cascades": wheel.cascades,
+        **_flatten("lateness_ms", _percentiles(lateness)),
+        "e2e_channels": box_count * len(CHANNEL_KEYS),
+        "e2e_healthy_off_s": round(healthy_off_s, 3),
+        "e2e_all_off_s": round(all_off_s, 3),
+        "e2e_rearmed_after_reboot": rearmed,
+        "e2e_expired": stats["timers_expired"],
+    }
+
+
+BENCHMARKS = {
+    "dispatch": bench_dispatch,
+    "framing": bench_framing,
+    "handshake": bench_handshake,
+    "ack": bench_ack,
+    "command_cpu": bench_command_cpu,
+    "recovery": bench_recovery,
+    "lifecycle": bench_lifecycle,
+    "timers": bench_timers,
+    "fleet": bench_fleet,
+    "storm": bench_storm,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("names", nargs="*", help=f"benchmarks à lancer ({', '.join(BENCHMARKS)})")
+    parser.add_argument("--json", metavar="FICHIER",
+                        help="écrit les résultats en JSON (- pour la sortie standard)")
+    args = parser.parse_args()
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"benchmark inconnu: {', '.join(sorted(unknown))}")
+
+    # Les journaux de (re)connexion des boîtiers simulés faussent les mesures
+    logging.disable(logging.CRITICAL)
+    results = {}
+    for name in args.names or BENCHMARKS:
+        start = time.perf_counter()
+        result = asyncio.run(BENCHMARKS[name]())
+        result["duration_s"] = round(time.perf_counter() - start, 3)
+        results[name] = result
+        if args.json != "-":
+            print(f"{name}: " + ", ".join(f"{k}={v}" for k, v in result.items()))
+
+    if args.json:
+        report = {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "benchmarks": results,
+        }
+        if args.json == "-":
+            json.dump(report, sys.stdout, indent=2)
+            print()
+        else:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
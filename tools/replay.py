@@ -0,0 +1,159 @@
+"""
+Rejeu d'une capture du trafic RMG Rio 4 (option « Capturer le trafic brut »)
+
+Usage (depuis la racine du dépôt, dans un environnement Home Assistant) :
+    python tools/replay.py /config/rmg_rio4_<entry_id>.cap       # vitesse d'origine
+    python tools/replay.py capture.cap --speed 20                 # 20 fois plus vite
+    python tools/replay.py capture.cap --show                     # trames et événements
+    python tools/replay.py capture.cap --speed 0 --repeat 20      # au plus vite (parsing)
+
+Les fichiers tournants (.cap.1, .cap.2...) sont rejoués du plus ancien au plus
+récent. Les blocs reçus sont réinjectés tels que lus sur le socket (mêmes
+découpages) dans RelayBoxConnection, sans socket ni boîtier : le rejeu est
+déterministe et reproduit le parsing, le dispatch et les acquittements.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from custom_components.rmg_rio4 import RelayBoxConnection  # noqa: E402
+from custom_components.rmg_rio4.capture import (  # noqa: E402
+    DIRECTION_EVENT,
+    DIRECTION_IN,
+    DIRECTION_OUT,
+    capture_files,
+    read_capture,
+)
+from custom_components.rmg_rio4.protocol import channel_name  # noqa: E402
+
+
+class _NullWriter:
+    """Writer sans socket: les trames émises pendant le rejeu (heartbeat...) sont comptées"""
+
+    def __init__(self):
+        self.transport = self
+        self.bytes = 0
+
+    def write(self, data: bytes):
+        self.bytes += len(data)
+
+    async def drain(self):
+        pass
+
+    def is_closing(self) -> bool:
+        return False
+
+    def abort(self):
+        pass
+
+    def close(self):
+        pass
+
+    async def wait_closed(self):
+        pass
+
+
+def load_records(path: str) -> list:
+    """Enregistrements de toute la capture rotative, dans l'ordre chronologique"""
+    files = capture_files(path)
+    if not files:
+        raise FileNotFoundError(path)
+    return [record for file in files for record in read_capture(file)]
+
+
+async def replay(records: list, speed: float = 1.0, show: bool = False) -> dict:
+    """Rejoue des enregistrements, speed = 0 pour enchaîner sans attendre"""
+    connection = RelayBoxConnection("replay", 0, "replay", "replay")
+    writer = _NullWriter()
+    connection.writer = writer
+    notifications = 0
+    current = 0.0
+
+    async def on_state(device: str, state: str):
+        nonlocal notifications
+        notifications += 1
+        if show:
+            print(f"{current:10.3f}  ← {device}={state}")
+
+    connection.register_callback(on_state)
+
+    loop = asyncio.get_running_loop()
+    origin = records[0][0] if records else 0.0
+    start = loop.time()
+    feed_cpu = 0.0
+    events = 0
+    for timestamp, direction, data in records:
+        current = timestamp - origin
+        if speed > 0:
+            delay = start + current / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        if direction == DIRECTION_IN:
+            cpu = time.process_time()
+            await connection._feed(data)
+            feed_cpu += time.process_time() - cpu
+        elif direction == DIRECTION_EVENT:
+            events += 1
+            event = data.decode("utf-8", "replace")
+            if show:
+                print(f"{current:10.3f}  • {event}")
+            if event == "connected":
+                # Même remise à zéro que RelayBoxConnection._connect
+                connection._seen_channels.clear()
+                connection._snapshot_event.clear()
+                connection.connected = True
+            else:
+                connection._set_disconnected(event.partition(":")[2] or "replay")
+                connection._framer.reset()
+        elif direction == DIRECTION_OUT and show:
+            for line in data.decode("utf-8", "replace").split("\r"):
+                if line:
+                    print(f"{current:10.3f}  → {line}")
+
+    elapsed = loop.time() - start
+    await connection.disconnect()
+    frames = connection.metrics.frames_parsed
+    return {
+        "records": len(records),
+        "events": events,
+        "bytes_in": connection.metrics.bytes_in,
+        "frames_parsed": frames,
+        "notifications": notifications,
+        "capture_span_s": round(records[-1][0] - origin, 3) if records else 0.0,
+        "replay_s": round(elapsed, 3),
+        "frames_per_cpu_s": round(frames / feed_cpu) if feed_cpu else None,
+        "final_states": {channel_name(key): state for key, state in sorted(connection.states.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("capture", help="fichier de capture (rmg_rio4_<entry_id>.cap)")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="facteur d'accélération (1 = vitesse d'origine, 0 = sans attente)")
+    parser.add_argument("--show", action="store_true", help="affiche trames et événements")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="nombre de rejeux (meilleur débit de parsing retenu)")
+    args = parser.parse_args()
+
+    # Les journaux de la connexion rejouée ne sont utiles qu'avec --show
+    if not args.show:
+        logging.disable(logging.CRITICAL)
+    records = load_records(args.capture)
+    best = None
+    for _ in range(max(1, args.repeat)):
+        result = asyncio.run(replay(records, args.speed, args.show))
+        if best is None or (result["frames_per_cpu_s"] or 0) > (best["frames_per_cpu_s"] or 0):
+            best = result
+    for key, value in best.items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+Simulateur local de boîtiers RMG Rio 4 (protocole décrit dans docs/PROTOCOL.md)
+
+Usage autonome :
+    python tools/rio4_simulator.py --boxes 4 --port 22023
+    python tools/rio4_simulator.py --latency 0.05 --fragment 3 --drop-probability 0.01 --di 3 4
+
+Usage en test (pytest + pytest-asyncio, avec tools/ dans sys.path) :
+    pytest_plugins = ["rio4_simulator"]
+
+    async def test_connect(rio4_box):
+        connection = RelayBoxConnection(rio4_box.host, rio4_box.port, "admin", "serial")
+        assert await connection.connect()
+
+    async def test_slow_box(rio4_box_factory):
+        box = await rio4_box_factory(latency=0.2, di_inputs=[1])
+"""
+import argparse
+import asyncio
+import logging
+import random
+import socket
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Iterable, List, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+NUM_RELAYS = 4
+NUM_DIOS = 4
+
+# Réponse du boîtier à une commande sur une DIO configurée en entrée
+DI_TYPE_ERROR = "TYPE DI ERROR"
+
+
+class _ClientSession:
+    """Envoi ordonné vers un client avec latence et fragmentation simulées"""
+
+    def __init__(self, box: "SimulatedBox", writer: asyncio.StreamWriter):
+        self.box = box
+        self.writer = writer
+        self.authenticated = False
+        self._outgoing: asyncio.Queue = asyncio.Queue()
+        self._sender = asyncio.create_task(self._send_loop())
+
+    def send(self, data: bytes):
+        # Chaque envoi part latency secondes après sa production, dans l'ordre
+        self._outgoing.put_nowait((time.monotonic() + self.box.latency, data))
+
+    async def _send_loop(self):
+        try:
+            while True:
+                deliver_at, data = await self._outgoing.get()
+                delay = deliver_at - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                size = self.box.fragment
+                if size <= 0:
+                    self.writer.write(data)
+                    await self.writer.drain()
+                    continue
+                # Fragmentation: un segment TCP par morceau (TCP_NODELAY côté serveur)
+                for i in range(0, len(data), size):
+                    self.writer.write(data[i:i + size])
+                    await self.writer.drain()
+                    await asyncio.sleep(0)
+        except (ConnectionError, RuntimeError):
+            pass
+
+    def close(self):
+        self._sender.cancel()
+        self.writer.close()
+
+
+class SimulatedBox:
+    """Un boîtier Rio 4 simulé écoutant sur un port TCP local
+
+    Options de simulation:
+    - latency: délai (s) avant chaque envoi du boîtier
+    - fragment: découpe chaque envoi en morceaux de N octets (0 = pas de découpe)
+    - drop_probability: probabilité de couper la connexion à chaque commande reçue
+    - drop_after: coupe la connexion après N commandes reçues (None = jamais)
+    - di_inputs: numéros des DIO configurées en entrée (commandes refusées: TYPE DI ERROR)
+    """
+
+    def __init__(self, username: str = "admin", password: str = "serial",
+                 host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 fragment: int = 0, drop_probability: float = 0.0,
+                 drop_after: Optional[int] = None, di_inputs: Iterable[int] = ()):
+        self.username = username
+        self.password = password
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.fragment = fragment
+        self.drop_probability = drop_probability
+        self.drop_after = drop_after
+        self.di_inputs = set(di_inputs)
+        self.states: Dict[str, str] = {f"RELAY{i}": "OFF" for i in range(1, NUM_RELAYS + 1)}
+        self.states.update({f"DIO{i}": "OFF" for i in range(1, NUM_DIOS + 1)})
+        self.received: List[str] = []  # Commandes reçues (après authentification)
+        self.connections = 0  # Connexions TCP acceptées
+        self.dropped = 0  # Connexions coupées volontairement (drop_*)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._sessions: List[_ClientSession] = []
+
+    async def start(self):
+        """Démarre l'écoute (port 0 = port libre choisi par le système)"""
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        """Ferme le serveur et tous les clients"""
+        if self._server:
+            self._server.close()
+            self.drop_clients()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def restart(self, outage: float = 0.0):
+        """Simule un redémarrage: coupe tout, refuse les connexions pendant outage secondes"""
+        await self.stop()
+        await asyncio.sleep(outage)
+        await self.start()
+
+    def drop_clients(self):
+        """Coupe brutalement toutes les connexions clientes"""
+        for session in self._sessions:
+            session.close()
+        self._sessions.clear()
+
+    def set_input(self, number: int, state: str):
+        """Change l'état d'une DIO côté boîtier (entrée physique) et le diffuse"""
+        name = f"DIO{number}"
+        self.states[name] = state
+        self._broadcast(f"{name}={state}")
+
+    def _broadcast(self, line: str):
+        data = f"{line}\r".encode()
+        for session in self._sessions:
+            if session.authenticated:
+                session.send(data)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.connections += 1
+        session = _ClientSession(self, writer)
+        self._sessions.append(session)
+        commands = 0
+        try:
+            session.send(b"LOGINREQUEST?\r")
+            credentials = (await reader.readuntil(b"\r")).decode().strip()
+            if credentials != f"{self.username};{self.password}":
+                session.send(b"AUTHENTICATION=Failed\r")
+                await asyncio.sleep(self.latency + 0.05)
+                return
+
+            # Authentification + snapshot de tous les canaux dans le même paquet
+            snapshot = "".join(f"{name}={state}\r" for name, state in self.states.items())
+            session.send(f"AUTHENTICATION=Successful\r{snapshot}".encode())
+            session.authenticated = True
+
+            while True:
+                line = await reader.readuntil(b"\r")
+                command = line.decode().strip()
+                if not command:
+                    continue
+                self.received.append(command)
+                commands += 1
+                if self._should_drop(commands):
+                    self.dropped += 1
+                    return
+                self._handle_command(session, command)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if session in self._sessions:
+                self._sessions.remove(session)
+            session.close()
+
+    def _should_drop(self, commands: int) -> bool:
+        if self.drop_after is not None and commands >= self.drop_after:
+            return True
+        return self.drop_probability > 0 and random.random() < self.drop_probability
+
+    def _handle_command(self, session: _ClientSession, command: str):
+        if command.endswith("?"):
+            name = command[:-1]
+            if name in self.states:
+                session.send(f"{name}={self.states[name]}\r".encode())
+            return
+
+        parts = command.split()
+        if len(parts) < 2 or parts[0] not in self.states:
+            return
+        name, action = parts[0], parts[1].upper()
+        if name.startswith("DIO") and int(name[3:]) in self.di_inputs:
+            # Une entrée digitale ne peut pas être commandée
+            session.send(f"{name}={DI_TYPE_ERROR}\r".encode())
+            return
+        if action in ("ON", "OFF"):
+            self.states[name] = action
+            self._broadcast(f"{name}={action}")
+        elif action == "PULSE" and len(parts) > 2:
+            self.states[name] = "ON"
+            self._broadcast(f"{name}=ON")
+            asyncio.get_running_loop().call_later(float(parts[2]), self._end_pulse, name)
+
+    def _end_pulse(self, name: str):
+        self.states[name] = "OFF"
+        self._broadcast(f"{name}=OFF")
+
+
+async def start_boxes(count: int, base_port: int = 0, **kwargs) -> List[SimulatedBox]:
+    """Démarre plusieurs boîtiers simulés, chacun sur son propre port
+
+    base_port = 0: ports libres choisis par le système, sinon base_port, base_port + 1...
+    """
+    return [
+        await SimulatedBox(port=base_port + i if base_port else 0, **kwargs).start()
+        for i in range(count)
+    ]
+
+
+@asynccontextmanager
+async def running_boxes(count: int = 1, **kwargs):
+    """Contexte asynchrone: boîtiers démarrés à l'entrée, arrêtés à la sortie"""
+    boxes = await start_boxes(count, **kwargs)
+    try:
+        yield boxes
+    finally:
+        for box in boxes:
+            await box.stop()
+
+
+try:
+    import pytest_asyncio
+except ImportError:  # Fixtures disponibles uniquement avec pytest-asyncio
+    pytest_asyncio = None
+
+if pytest_asyncio is not None:
+
+    @pytest_asyncio.fixture
+    async def rio4_box():
+        """Fixture pytest: un boîtier simulé, arrêté en fin de test"""
+        async with running_boxes(1) as boxes:
+            yield boxes[0]
+
+    @pytest_asyncio.fixture
+    async def rio4_box_factory():
+        """Fixture pytest: fabrique de boîtiers simulés configurables, tous arrêtés en fin de test"""
+        boxes: List[SimulatedBox] = []
+
+        async def factory(**kwargs) -> SimulatedBox:
+            box = await SimulatedBox(**kwargs).start()
+            boxes.append(box)
+            return box
+
+        yield factory
+        for box in boxes:
+            await box.stop()
+
+
+async def _serve(boxes: int, port: int, **kwargs):
+    started = await start_boxes(boxes, base_port=port, **kwargs)
+    for i, box in enumerate(started):
+        print(f"Boîtier simulé #{i + 1} sur {box.host}:{box.port}")
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--boxes", type=int, default=1, help="nombre de boîtiers simulés")
+    parser.add_argument("--port", type=int, default=22023, help="premier port (0 = ports libres)")
+    parser.add_argument("--latency", type=float, default=0.0, help="délai de réponse (s)")
+    parser.add_argument("--fragment", type=int, default=0,
+                        help="découpe les envois en morceaux de N octets")
+    parser.add_argument("--drop-probability", type=float, default=0.0,
+                        help="probabilité de coupure à chaque commande")
+    parser.add_argument("--di", type=int, nargs="*", default=[],
+                        help="DIO configurées en entrée (TYPE DI ERROR)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(
+            args.boxes, args.port, latency=args.latency, fragment=args.fragment,
+            drop_probability=args.drop_probability, di_inputs=args.di,
+        ))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()